@@ -0,0 +1,61 @@
+// 物种增量导入云函数
+// 应用 database/export_species.py 生成的 changes_NNNN.jsonl：每次调用传入一个分片的变更
+// 全部分片应用成功后在本地运行 python export_species.py --ack 确认
+//   { op: 'upsert', doc: {...} }  按 _id 整条覆盖写入
+//   { op: 'delete', _id: '...' }  删除物种及其养护建议
+const cloud = require('wx-server-sdk')
+
+cloud.init({
+  env: cloud.DYNAMIC_CURRENT_ENV
+})
+
+const db = cloud.database()
+
+exports.main = async (event, context) => {
+  const { action = 'preview', changes = [] } = event  // preview 或 apply
+  const results = {
+    action,
+    upsert: { found: 0, written: 0 },
+    delete: { found: 0, deleted: 0, careTips: 0 },
+    errors: []
+  }
+
+  for (const change of changes) {
+    if (change.op === 'upsert') results.upsert.found++
+    else if (change.op === 'delete') results.delete.found++
+    else results.errors.push({ change, message: '未知操作' })
+  }
+
+  if (action !== 'apply') {
+    return { code: 0, message: '预览完成', data: results }
+  }
+
+  for (const change of changes) {
+    try {
+      if (change.op === 'upsert') {
+        const { _id, ...data } = change.doc
+        await db.collection('fish_species').doc(_id).set({ data })
+        results.upsert.written++
+      } else if (change.op === 'delete') {
+        await db.collection('fish_species').doc(change._id).remove()
+        results.delete.deleted++
+
+        // 按条件批量删除（get() 每次最多返回 20 条，逐条删会漏删）
+        const removed = await db.collection('fish_care_tips')
+          .where({ speciesId: change._id })
+          .remove()
+        results.delete.careTips += removed.stats.removed
+      }
+    } catch (err) {
+      console.error('应用变更失败:', change.op, change._id || (change.doc && change.doc._id), err.message)
+      results.errors.push({ _id: change._id || (change.doc && change.doc._id), message: err.message })
+    }
+  }
+
+  console.log('增量导入完成:', JSON.stringify(results))
+  return {
+    code: results.errors.length ? 2001 : 0,
+    message: results.errors.length ? '部分变更失败' : '导入完成',
+    data: results
+  }
+}
@@ -0,0 +1,34 @@
+// 分类统计（由 database/category_stats.py 生成 category_stats.json）
+// 每个大分类 / 子分类：品种数、难度分布、食性分布、水温 / pH / 体长范围
+const path = require('path')
+const fs = require('fs')
+
+const STATS_FILE = path.join(__dirname, 'category_stats.json')
+
+let cached = null
+
+// 首次调用时加载，云函数实例复用期间常驻内存
+function loadStats() {
+  if (cached) return cached
+  if (!fs.existsSync(STATS_FILE)) return null
+  cached = JSON.parse(fs.readFileSync(STATS_FILE, 'utf8'))
+  return cached
+}
+
+// 按名称取某个大分类（可选子分类）的统计，不存在时返回 null
+function lookup(categoryName, subcategoryName) {
+  const stats = loadStats()
+  const category = stats && stats.categories[categoryName]
+  if (!category) return null
+  if (subcategoryName === undefined) return category
+  return category.subcategories[subcategoryName] || null
+}
+
+// 去掉子分类明细，只保留本级汇总
+function brief(stats) {
+  if (!stats) return null
+  const { subcategories, ...rest } = stats
+  return rest
+}
+
+module.exports = { loadStats, lookup, brief }
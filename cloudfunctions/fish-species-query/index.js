@@ -4,6 +4,8 @@ const cloud = require('wx-server-sdk')
 // 引入共享模块
 const { success, paramError, notFound, dbError } = require('./shared/auth')
 const { validatePagination } = require('./shared/validators')
+const searchIndex = require('./searchIndex')
+const categoryStats = require('./categoryStats')
 
 cloud.init({
   env: cloud.DYNAMIC_CURRENT_ENV
@@ -30,10 +32,14 @@ exports.main = async (event, context) => {
       return await listSubcategories(params)
     case 'getCategoriesTree':
       return await getCategoriesTree()
+    case 'getCategoryStats':
+      return getCategoryStats(params)
 
     // 鱼种相关
     case 'search':
       return await searchSpecies(params)
+    case 'suggest':
+      return suggestSpecies(params)
     case 'get':
       return await getSpecies(params)
     case 'list':
@@ -103,10 +109,13 @@ async function getCategoriesTree() {
       .orderBy('order', 'asc')
       .get()
 
-    // 组装树形结构
+    // 组装树形结构，附带预计算的分类统计
     const categories = categoriesRes.data.map(cat => ({
       ...cat,
-      subcategories: subcategoriesRes.data.filter(sub => sub.categoryId === cat._id)
+      stats: categoryStats.brief(categoryStats.lookup(cat.name)),
+      subcategories: subcategoriesRes.data
+        .filter(sub => sub.categoryId === cat._id)
+        .map(sub => ({ ...sub, stats: categoryStats.lookup(cat.name, sub.name) }))
     }))
 
     // 难度等级
@@ -143,6 +152,21 @@ async function getCategoriesTree() {
   }
 }
 
+// 分类统计：只查预计算的 category_stats.json，不访问数据库
+function getCategoryStats(params) {
+  const { categoryName, subcategoryName } = params
+
+  const stats = categoryStats.loadStats()
+  if (!stats) {
+    return notFound()
+  }
+  if (!categoryName) {
+    return success(stats)
+  }
+  const result = categoryStats.lookup(categoryName, subcategoryName)
+  return result ? success(result) : notFound()
+}
+
 // 搜索鱼种
 async function searchSpecies(params) {
   const { keyword, subcategoryId, categoryId, difficulty, temperament, origin, diet } = params
@@ -229,6 +253,20 @@ async function searchSpecies(params) {
       speciesRes.data = [...speciesRes.data, ...uniqueEnglish]
     }
 
+    // 正则无结果时（错别字、别名、拼音、学名），按搜索索引的模糊结果再查一次
+    if (speciesRes.data.length === 0 && page === 1) {
+      const names = searchIndex.search(keyword, pageSize).map(item => item.name)
+      if (names.length) {
+        const fuzzyWhereCondition = { ...whereCondition, name: _.in(names) }
+        const fuzzyRes = await db.collection('fish_species')
+          .where(fuzzyWhereCondition)
+          .limit(pageSize)
+          .get()
+        const rank = new Map(names.map((name, i) => [name, i]))
+        speciesRes.data = fuzzyRes.data.sort((a, b) => rank.get(a.name) - rank.get(b.name))
+      }
+    }
+
     // 关联子分类信息
     const species = await enrichSpeciesWithSubcategory(speciesRes.data)
 
@@ -245,6 +283,17 @@ async function searchSpecies(params) {
   }
 }
 
+// 搜索联想：只查内存中的搜索索引，不访问数据库
+function suggestSpecies(params) {
+  const { keyword, limit = 10 } = params
+
+  if (!keyword || keyword.length < 1) {
+    return paramError('搜索关键词太短')
+  }
+
+  return success({ list: searchIndex.search(keyword, Math.min(limit, 50)) })
+}
+
 // 获取单个鱼种详情
 async function getSpecies(params) {
   const { speciesId, includeCareTips = false } = params
@@ -0,0 +1,148 @@
+// 物种搜索索引（由 database/search_index.py 生成 search_index.json，部署前生成，不入库）
+// 索引文件不存在时 search() 返回空列表
+// 打分规则与 Python 端 SearchIndex.search 保持一致
+const path = require('path')
+const fs = require('fs')
+
+const INDEX_FILE = path.join(__dirname, 'search_index.json')
+
+const SCORE_EXACT = 1.0
+const SCORE_PREFIX = 0.9
+const SCORE_GRAMS = 0.8
+const SCORE_FUZZY = 0.6
+
+let cached = null
+
+function normalize(text) {
+  return (text || '').normalize('NFKC').toLowerCase().split(/\s+/).filter(Boolean).join(' ')
+}
+
+function cjkChars(text) {
+  return Array.from(text).filter(ch => ch >= '一' && ch <= '鿿').join('')
+}
+
+function queryGrams(query) {
+  const chars = cjkChars(query)
+  if (chars.length >= 2) {
+    const grams = []
+    for (let i = 0; i < chars.length - 1; i++) grams.push(chars.slice(i, i + 2))
+    return grams
+  }
+  return chars.split('')
+}
+
+function words(text) {
+  return normalize(text).match(/[a-z0-9]+/g) || []
+}
+
+function edgeBigrams(term) {
+  const padded = `^${term}$`
+  const grams = new Set()
+  for (let i = 0; i < padded.length - 1; i++) grams.add(padded.slice(i, i + 2))
+  return grams
+}
+
+function editDistance(a, b, limit) {
+  if (Math.abs(a.length - b.length) > limit) return limit + 1
+  let previous = Array.from({ length: b.length + 1 }, (_, j) => j)
+  for (let i = 1; i <= a.length; i++) {
+    const current = [i]
+    let best = i
+    for (let j = 1; j <= b.length; j++) {
+      const value = Math.min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] !== b[j - 1] ? 1 : 0))
+      current.push(value)
+      if (value < best) best = value
+    }
+    if (best > limit) return limit + 1
+    previous = current
+  }
+  return previous[b.length]
+}
+
+function maxDistance(query) {
+  return query.length <= 4 ? 1 : query.length <= 10 ? 2 : 3
+}
+
+// 首次调用时加载，云函数实例复用期间常驻内存
+function loadIndex() {
+  if (cached) return cached
+  if (!fs.existsSync(INDEX_FILE)) return null
+  const data = JSON.parse(fs.readFileSync(INDEX_FILE, 'utf8'))
+  const byBigram = new Map()
+  data.terms.forEach(([term], termId) => {
+    for (const gram of edgeBigrams(term)) {
+      if (!byBigram.has(gram)) byBigram.set(gram, [])
+      byBigram.get(gram).push(termId)
+    }
+  })
+  cached = { docs: data.docs, postings: data.postings, terms: data.terms, byBigram }
+  return cached
+}
+
+// 返回 [{ name, englishName, scientificName, score }]，按得分排序
+function search(keyword, limit = 10) {
+  const index = loadIndex()
+  const query = normalize(keyword)
+  if (!index || !query) return []
+  const scores = new Map()
+
+  const hit = (docIds, score) => {
+    for (const docId of docIds) {
+      if (score > (scores.get(docId) || 0)) scores.set(docId, score)
+    }
+  }
+
+  // 中文 n-gram 覆盖率
+  const grams = queryGrams(query)
+  if (grams.length) {
+    const counts = new Map()
+    for (const gram of grams) {
+      for (const docId of index.postings[gram] || []) counts.set(docId, (counts.get(docId) || 0) + 1)
+    }
+    for (const [docId, count] of counts) hit([docId], SCORE_GRAMS * count / grams.length)
+  }
+
+  // 英文/学名/拼音单词全部命中
+  const queryWords = words(query)
+  if (queryWords.length) {
+    let matched = null
+    for (const word of queryWords) {
+      const ids = new Set(index.postings[word] || [])
+      matched = matched === null ? ids : new Set([...matched].filter(id => ids.has(id)))
+    }
+    hit(matched, SCORE_GRAMS)
+  }
+
+  // 整名精确 / 前缀 / 编辑距离；共有二元组太少的词不可能在距离内
+  const limitDistance = maxDistance(query)
+  const queryBigrams = edgeBigrams(query)
+  const shared = new Map()
+  for (const gram of queryBigrams) {
+    for (const termId of index.byBigram.get(gram) || []) shared.set(termId, (shared.get(termId) || 0) + 1)
+  }
+  const need = queryBigrams.size - 2 * limitDistance
+  const prefixSize = queryBigrams.size - (queryBigrams.has(query[query.length - 1] + '$') ? 1 : 0)
+  for (const [termId, count] of shared) {
+    const [term, docIds] = index.terms[termId]
+    if (term === query) {
+      hit(docIds, SCORE_EXACT)
+    } else if (query.length >= 2 && count >= prefixSize && term.startsWith(query)) {
+      hit(docIds, SCORE_PREFIX)
+    } else if (count >= need) {
+      const distance = editDistance(query, term, limitDistance)
+      if (distance <= limitDistance) {
+        hit(docIds, SCORE_FUZZY * (1 - distance / Math.max(query.length, term.length)))
+      }
+    }
+  }
+
+  return [...scores.entries()]
+    .sort((a, b) => (b[1] - a[1]) || (index.docs[a[0]][0].length - index.docs[b[0]][0].length) || (a[0] - b[0]))
+    .slice(0, limit)
+    .map(([docId, score]) => {
+      const [name, englishName, scientificName] = index.docs[docId]
+      return { name, englishName, scientificName, score: Math.round(score * 10000) / 10000 }
+    })
+}
+
+module.exports = { search, loadIndex }
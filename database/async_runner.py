@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步并发执行 - 阻塞的网络任务放进线程并发执行, 结果按输入顺序流式交给调用方
+
+各下载脚本的网络代码 (HttpClient / ImageResolver) 都是同步的, 这里用 asyncio 调度:
+  - asyncio.to_thread 执行每个任务, 同时进行的任务数不超过 concurrency
+  - 每个任务有截止时间: 到期后置位传给任务的 cancel 事件, 任务不再开始新的尝试,
+    已发出的请求仍受其自身超时约束, 结果照常返回 (日志与输出保持一致)
+  - 结果按输入顺序产出: 第 i 个结果在前 i-1 个都完成后立即交给 on_result,
+    后续处理 (构建记录、写CSV) 与其余下载同时进行, 输出与串行执行完全相同
+每个主机的并发请求数由 HttpClient 的 HostConcurrencyLimiter 限制 (请求在工作线程中发出)。
+
+用法:
+    def work(item, cancel): ...          # 在线程中执行, 应定期检查 cancel.is_set()
+    run_ordered(items, work, on_result, concurrency=8, deadline=60)
+"""
+
+import asyncio
+import threading
+
+import run_report
+
+CONCURRENCY = 8
+
+async def _run_one(item, func, gate, deadline):
+    async with gate:
+        cancel = threading.Event()
+        task = asyncio.ensure_future(asyncio.to_thread(func, item, cancel))
+        if deadline is None:
+            return await task
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), deadline)
+        except asyncio.TimeoutError:
+            cancel.set()
+            run_report.count('deadline.expired')
+            return await task
+
+async def stream_ordered(items, func, concurrency=CONCURRENCY, deadline=None):
+    """异步生成器: 按输入顺序产出 (item, 结果); func(item, cancel) 在线程中执行"""
+    items = list(items)
+    gate = asyncio.Semaphore(concurrency)
+    tasks = [asyncio.ensure_future(_run_one(item, func, gate, deadline)) for item in items]
+    try:
+        for item, task in zip(items, tasks):
+            yield item, await task
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+def run_ordered(items, func, on_result, concurrency=CONCURRENCY, deadline=None):
+    """同步入口: 并发执行 func, 按输入顺序调用 on_result(item, 结果)"""
+    async def consume():
+        async for item, result in stream_ordered(items, func, concurrency, deadline):
+            on_result(item, result)
+    asyncio.run(consume())
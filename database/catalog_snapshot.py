@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+物种目录列式快照 - 比逐行解析CSV更快的二进制格式
+
+文件布局 (小端):
+    b'FSNP' | 版本 u16 | 头部长度 u32 | 头部JSON | 8字节对齐的各列数据
+列类型:
+    f64   数值列 (tempMin/tempMax/phMin/phMax, 以及 size/lifespan 拆出的上下限), 空值为 NaN
+    dict  低基数文本列 (分类/难度/食性等) 存 u16 编码, 字典在头部
+    str   其余文本列存 u32 编号, 指向去重后的字符串表
+数值格式化后与原文不一致的值记录在头部 exceptions 中, 保证与 CSV/JSON 无损互转。
+
+读取时 mmap 整个文件, 列直接以 memoryview 访问, 行在取用时才组装。
+column() 返回的列视图在 close() 时一并释放, 之后再访问会报 ValueError; 需要在关闭后保留的数据请先复制 (list / array)。
+
+用法:
+    python catalog_snapshot.py           # 由 v2 CSV 生成快照并校验往返
+    python catalog_snapshot.py --bench   # 与 csv.DictReader 对比加载耗时
+"""
+
+import io
+import os
+import sys
+import csv
+import json
+import math
+import mmap
+import time
+import struct
+from array import array
+
+BASE_DIR = "/Users/wanshuiwanqigaozhishang/Downloads/MINIAPP"
+DATABASE_DIR = f"{BASE_DIR}/database"
+CSV_FILE = f"{DATABASE_DIR}/Fish_Database_Enhanced_v2.csv"
+SNAPSHOT_FILE = f"{DATABASE_DIR}/Fish_Database_Enhanced_v2.snap"
+
+MAGIC = b'FSNP'
+VERSION = 1
+
+NUMERIC_COLUMNS = ['tempMin', 'tempMax', 'phMin', 'phMax']
+RANGE_COLUMNS = ['size', 'lifespan']
+DICT_COLUMNS = ['categoryName', 'subcategoryName', 'origin', 'difficulty',
+                'size', 'lifespan', 'diet', 'compatibility']
+
+def parse_number(text):
+    text = (text or '').strip()
+    if not text:
+        return math.nan
+    try:
+        return float(text)
+    except ValueError:
+        return math.nan
+
+def format_number(value):
+    if math.isnan(value):
+        return ''
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+def parse_range(text):
+    """'15-30' -> (15.0, 30.0); 单个数字时上下限相同; 无法解析时为 NaN"""
+    text = (text or '').strip()
+    if not text:
+        return math.nan, math.nan
+    low, _, high = text.partition('-')
+    low = parse_number(low)
+    high = parse_number(high) if high else low
+    return low, high
+
+def _align(buf):
+    buf.write(b'\0' * (-buf.tell() % 8))
+
+def build_snapshot(rows, fieldnames, path):
+    """把行列表写成列式快照"""
+    n = len(rows)
+    columns = []
+    body = io.BytesIO()
+    strings = {}
+    string_list = []
+
+    def intern(text):
+        sid = strings.get(text)
+        if sid is None:
+            sid = strings[text] = len(string_list)
+            string_list.append(text)
+        return sid
+
+    def add_array(name, kind, arr, **extra):
+        _align(body)
+        offset = body.tell()
+        if sys.byteorder != 'little':
+            arr.byteswap()
+        body.write(arr.tobytes())
+        columns.append(dict(name=name, kind=kind, offset=offset, **extra))
+
+    for field in fieldnames:
+        values = [row.get(field) or '' for row in rows]
+        if field in NUMERIC_COLUMNS:
+            numbers = array('d', (parse_number(v) for v in values))
+            exceptions = {str(i): v for i, v in enumerate(values) if format_number(numbers[i]) != v}
+            add_array(field, 'f64', numbers, exceptions=exceptions)
+        elif field in DICT_COLUMNS:
+            dictionary = sorted(set(values))
+            codes = {v: i for i, v in enumerate(dictionary)}
+            add_array(field, 'dict', array('H', (codes[v] for v in values)), dictionary=dictionary)
+        else:
+            add_array(field, 'str', array('I', (intern(v) for v in values)))
+
+    # 区间文本另存上下限数值列, 便于直接按数值筛选
+    for field in RANGE_COLUMNS:
+        if field in fieldnames:
+            ranges = [parse_range(row.get(field)) for row in rows]
+            add_array(f"{field}Min", 'f64', array('d', (r[0] for r in ranges)), derived=True)
+            add_array(f"{field}Max", 'f64', array('d', (r[1] for r in ranges)), derived=True)
+
+    # 字符串表: u32 偏移数组 (n+1 项) + UTF-8 数据
+    encoded = [s.encode('utf-8') for s in string_list]
+    offsets = array('I', [0])
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    _align(body)
+    strings_offset = body.tell()
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+    body.write(offsets.tobytes())
+    body.write(b''.join(encoded))
+
+    header = json.dumps({
+        'rows': n,
+        'fieldnames': list(fieldnames),
+        'columns': columns,
+        'strings': {'offset': strings_offset, 'count': len(string_list)},
+    }, ensure_ascii=False).encode('utf-8')
+
+    prefix = MAGIC + struct.pack('<HI', VERSION, len(header)) + header
+    prefix += b'\0' * (-len(prefix) % 8)
+    tmp_path = path + '.part'
+    with open(tmp_path, 'wb') as f:
+        f.write(prefix)
+        f.write(body.getvalue())
+    os.replace(tmp_path, path)
+
+class CatalogSnapshot:
+    """mmap 只读快照; column() 零拷贝取列, snapshot[i] 按需组装行"""
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mm[:4] != MAGIC:
+            raise ValueError(f"不是物种快照文件: {path}")
+        version, header_len = struct.unpack_from('<HI', self.mm, 4)
+        if version != VERSION:
+            raise ValueError(f"快照版本不支持: {version}")
+        header = json.loads(self.mm[10:10 + header_len].decode('utf-8'))
+        self.base = 10 + header_len + (-(10 + header_len) % 8)
+        self.rows = header['rows']
+        self.fieldnames = header['fieldnames']
+        self.meta = {c['name']: c for c in header['columns']}
+        self.view = memoryview(self.mm)
+        self._columns = {}
+        # 交给调用方的列视图, close() 时逐个释放
+        self._views = []
+
+        strings = header['strings']
+        start = self.base + strings['offset']
+        self.string_offsets = self._cast(start, 'I', strings['count'] + 1)
+        self.string_data = start + (strings['count'] + 1) * 4
+        self._string_cache = {}
+
+    def _cast(self, start, fmt, count):
+        size = array(fmt).itemsize
+        raw = self.view[start:start + size * count]
+        if sys.byteorder == 'little':
+            col = raw.cast(fmt)
+            raw.release()
+            self._views.append(col)
+            return col
+        arr = array(fmt, raw.tobytes())
+        raw.release()
+        arr.byteswap()
+        return arr
+
+    def column(self, name):
+        """原始列: f64 列为数值, dict 列为编码, str 列为字符串编号"""
+        col = self._columns.get(name)
+        if col is None:
+            meta = self.meta[name]
+            fmt = {'f64': 'd', 'dict': 'H', 'str': 'I'}[meta['kind']]
+            col = self._columns[name] = self._cast(self.base + meta['offset'], fmt, self.rows)
+        return col
+
+    def string(self, sid):
+        text = self._string_cache.get(sid)
+        if text is None:
+            start = self.string_data + self.string_offsets[sid]
+            end = self.string_data + self.string_offsets[sid + 1]
+            text = self._string_cache[sid] = bytes(self.view[start:end]).decode('utf-8')
+        return text
+
+    def value(self, i, name):
+        """第 i 行某列的文本值 (与CSV中一致)"""
+        meta = self.meta[name]
+        raw = self.column(name)[i]
+        if meta['kind'] == 'str':
+            return self.string(raw)
+        if meta['kind'] == 'dict':
+            return meta['dictionary'][raw]
+        exception = meta.get('exceptions', {}).get(str(i))
+        return exception if exception is not None else format_number(raw)
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.rows:
+            raise IndexError(i)
+        return {name: self.value(i, name) for name in self.fieldnames}
+
+    def values(self, name):
+        """整列文本值; 批量取用时比逐行 value() 快得多"""
+        meta = self.meta[name]
+        col = self.column(name)
+        if meta['kind'] == 'str':
+            return [self.string(sid) for sid in col]
+        if meta['kind'] == 'dict':
+            dictionary = meta['dictionary']
+            return [dictionary[code] for code in col]
+        values = [format_number(v) for v in col]
+        for i, text in meta.get('exceptions', {}).items():
+            values[int(i)] = text
+        return values
+
+    def __iter__(self):
+        """按列批量解码后组装为行"""
+        columns = [self.values(name) for name in self.fieldnames]
+        for values in zip(*columns):
+            yield dict(zip(self.fieldnames, values))
+
+    def to_csv(self, path):
+        with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=self.fieldnames)
+            writer.writeheader()
+            writer.writerows(self)
+
+    def to_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(list(self), f, ensure_ascii=False, indent=2)
+
+    def close(self):
+        """释放所有列视图并关闭映射; 可重复调用, 不抛 BufferError
+
+        调用方从列视图再导出了缓冲区 (如 numpy.frombuffer) 时该视图无法释放,
+        映射改由这些对象回收后自动解除。
+        """
+        self._columns.clear()
+        self.string_offsets = None
+        views, self._views = self._views, []
+        for view in views + [self.view]:
+            try:
+                view.release()
+            except BufferError:
+                pass
+        try:
+            self.mm.close()
+        except BufferError:
+            pass
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def snapshot_from_csv(csv_path=CSV_FILE, snapshot_path=SNAPSHOT_FILE):
+    with open(csv_path, 'r', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        rows = list(reader)
+    build_snapshot(rows, reader.fieldnames, snapshot_path)
+    return len(rows)
+
+def benchmark(csv_path=CSV_FILE, snapshot_path=SNAPSHOT_FILE, repeat=200):
+    """对比: DictReader 全量解析 vs 快照打开后取数值列 / 取全部行"""
+    def csv_numeric():
+        with open(csv_path, 'r', encoding='utf-8-sig') as f:
+            return [float(r['tempMin']) for r in csv.DictReader(f) if r['tempMin']]
+
+    def snap_numeric():
+        with CatalogSnapshot(snapshot_path) as snap:
+            return [v for v in snap.column('tempMin') if not math.isnan(v)]
+
+    def csv_rows():
+        with open(csv_path, 'r', encoding='utf-8-sig') as f:
+            return list(csv.DictReader(f))
+
+    def snap_rows():
+        with CatalogSnapshot(snapshot_path) as snap:
+            return list(snap)
+
+    results = {}
+    for label, func in (('CSV 取数值列', csv_numeric), ('快照 取数值列', snap_numeric),
+                        ('CSV 全部行', csv_rows), ('快照 全部行', snap_rows)):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        results[label] = (time.perf_counter() - start) / repeat * 1000
+    return results
+
+def main():
+    count = snapshot_from_csv()
+    check_path = SNAPSHOT_FILE + '.check.csv'
+    with CatalogSnapshot(SNAPSHOT_FILE) as snap:
+        snap.to_csv(check_path)
+    with open(CSV_FILE, 'rb') as a, open(check_path, 'rb') as b:
+        identical = a.read() == b.read()
+    os.remove(check_path)
+
+    print(f"快照: {SNAPSHOT_FILE} ({count} 条)")
+    print(f"  CSV {os.path.getsize(CSV_FILE) / 1024:.1f} KB -> 快照 {os.path.getsize(SNAPSHOT_FILE) / 1024:.1f} KB")
+    print(f"  往返CSV{'一致' if identical else '不一致!'}")
+
+    if '--bench' in sys.argv:
+        print("\n加载耗时 (每次, ms):")
+        for label, ms in benchmark().items():
+            print(f"  {label}: {ms:.3f}")
+
+if __name__ == '__main__':
+    main()
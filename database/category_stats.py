@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分类统计 - 每个大分类 / 子分类的预计算汇总
+
+每组给出: 品种数、难度分布、食性分布、水温范围 (最低 tempMin ~ 最高 tempMax)、pH 范围、体长范围 (cm)。
+写成 category_stats.json 随 fish-species-query 云函数部署, categoryStats.js 按分类名直接取用,
+列表页与分类树不必再扫描全部品种。
+
+汇总可增量维护: 每组对各取值保留计数 (而不只是最小/最大值), 行被删除或修改时减去旧行、加上新行,
+只需处理变化的行; 计数状态存进 enhance_fish_database 的增量构建缓存。
+
+用法:
+    stats = CategoryStats.from_rows(rows)
+    stats.apply_changes(old_rows, new_rows)   # {行键: 行}, 只处理内容不同的行
+    python category_stats.py           # 由 v2 CSV 生成并打印汇总
+    python category_stats.py --bench   # 改一行时增量更新与全量重算的耗时
+"""
+
+import sys
+import csv
+import json
+import time
+from collections import Counter
+
+from species_record import SpeciesRecord, DIFFICULTIES
+
+BASE_DIR = "/Users/wanshuiwanqigaozhishang/Downloads/MINIAPP"
+DATABASE_DIR = f"{BASE_DIR}/database"
+CSV_FILE = f"{DATABASE_DIR}/Fish_Database_Enhanced_v2.csv"
+STATS_FILE = f"{BASE_DIR}/cloudfunctions/fish-species-query/category_stats.json"
+
+VERSION = 1
+
+# 分布统计的字段
+HISTOGRAMS = ('difficulty', 'diet')
+# 范围统计: 水温、pH、体长
+BOUNDS = ('temp', 'ph', 'size')
+
+def _bounds(record):
+    """(名称, 下限, 上限); 无法解析的值为 None, 不计入范围"""
+    size = record.size if isinstance(getattr(record, 'size', None), tuple) else (None, None)
+    return (('temp', getattr(record, 'tempMin', None), getattr(record, 'tempMax', None)),
+            ('ph', getattr(record, 'phMin', None), getattr(record, 'phMax', None)),
+            ('size', size[0], size[1]))
+
+def _bump(counter, key, n):
+    counter[key] += n
+    if counter[key] <= 0:
+        del counter[key]
+
+class GroupStats:
+    """一个分类的汇总; 取值计数可加可减"""
+
+    __slots__ = ('count', 'histograms', 'lows', 'highs')
+
+    def __init__(self):
+        self.count = 0
+        self.histograms = {field: Counter() for field in HISTOGRAMS}
+        self.lows = {key: Counter() for key in BOUNDS}
+        self.highs = {key: Counter() for key in BOUNDS}
+
+    def add(self, record, n=1):
+        """n 为 -1 时减去该行"""
+        self.count += n
+        for field in HISTOGRAMS:
+            value = record.get(field, '')
+            if value:
+                _bump(self.histograms[field], value, n)
+        for key, low, high in _bounds(record):
+            if isinstance(low, (int, float)):
+                _bump(self.lows[key], low, n)
+            if isinstance(high, (int, float)):
+                _bump(self.highs[key], high, n)
+
+    def summary(self):
+        difficulty = self.histograms['difficulty']
+        order = {value: i for i, value in enumerate(DIFFICULTIES)}
+        result = {
+            'count': self.count,
+            'difficulty': dict(sorted(difficulty.items(), key=lambda item: (order.get(item[0], len(order)), item[0]))),
+            'diet': dict(sorted(self.histograms['diet'].items(), key=lambda item: (-item[1], item[0]))),
+        }
+        for key in BOUNDS:
+            lows, highs = self.lows[key], self.highs[key]
+            result[key] = [min(lows) if lows else None, max(highs) if highs else None]
+        return result
+
+    def state(self):
+        """完整计数, 用于增量构建缓存 (数值保留类型)"""
+        return {'count': self.count,
+                'histograms': {field: dict(counter) for field, counter in self.histograms.items()},
+                'lows': {key: list(counter.items()) for key, counter in self.lows.items()},
+                'highs': {key: list(counter.items()) for key, counter in self.highs.items()}}
+
+    @classmethod
+    def from_state(cls, state):
+        group = cls()
+        group.count = state['count']
+        for field, counts in state['histograms'].items():
+            group.histograms[field].update(counts)
+        for key, pairs in state['lows'].items():
+            group.lows[key].update(dict(pairs))
+        for key, pairs in state['highs'].items():
+            group.highs[key].update(dict(pairs))
+        return group
+
+class CategoryStats:
+    """按大分类与 (大分类, 子分类) 分组的汇总"""
+
+    def __init__(self):
+        self.categories = {}
+        self.subcategories = {}
+
+    @classmethod
+    def from_rows(cls, rows):
+        stats = cls()
+        for row in rows:
+            stats.add(row)
+        return stats
+
+    def add(self, row, n=1):
+        record = row if isinstance(row, SpeciesRecord) else SpeciesRecord.from_row(row)
+        category = record.get('categoryName', '')
+        keys = ((self.categories, category), (self.subcategories, (category, record.get('subcategoryName', ''))))
+        for groups, key in keys:
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = GroupStats()
+            group.add(record, n)
+            if group.count <= 0:
+                del groups[key]
+
+    def remove(self, row):
+        self.add(row, -1)
+
+    def apply_changes(self, old_rows, new_rows):
+        """old_rows / new_rows 为 {行键: 行}; 只对新增、删除、内容变化的行更新计数, 返回处理的行数"""
+        changed = 0
+        for key, row in old_rows.items():
+            if new_rows.get(key) != row:
+                self.remove(row)
+                changed += 1
+        for key, row in new_rows.items():
+            if old_rows.get(key) != row:
+                self.add(row)
+                changed += 1
+        return changed
+
+    def summary(self):
+        """写给云函数的汇总: categories[大分类] 含 subcategories[子分类]"""
+        categories = {}
+        for category in sorted(self.categories):
+            categories[category] = dict(self.categories[category].summary(), subcategories={})
+        for (category, subcategory) in sorted(self.subcategories):
+            categories[category]['subcategories'][subcategory] = self.subcategories[(category, subcategory)].summary()
+        return {'version': VERSION, 'total': sum(group.count for group in self.categories.values()),
+                'categories': categories}
+
+    def state(self):
+        return {'categories': [[category, group.state()] for category, group in self.categories.items()],
+                'subcategories': [[list(key), group.state()] for key, group in self.subcategories.items()]}
+
+    @classmethod
+    def from_state(cls, state):
+        stats = cls()
+        for category, group in state['categories']:
+            stats.categories[category] = GroupStats.from_state(group)
+        for key, group in state['subcategories']:
+            stats.subcategories[tuple(key)] = GroupStats.from_state(group)
+        return stats
+
+def write_stats(stats, path=STATS_FILE):
+    data = stats.summary()
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    return data
+
+def load_rows(csv_file=CSV_FILE):
+    with open(csv_file, 'r', encoding='utf-8-sig') as f:
+        return list(csv.DictReader(f))
+
+def _span(values):
+    low, high = values
+    return '-' if low is None else f"{low}~{high}"
+
+def format_summary(data):
+    lines = [f"{'分类':<14}{'品种':>5}{'水温':>10}{'pH':>10}{'体长cm':>10}  难度 / 食性"]
+    for category, stats in data['categories'].items():
+        groups = [(category, stats)] + [(f"  {name}", sub) for name, sub in stats['subcategories'].items()]
+        for label, group in groups:
+            mix = ' '.join(f"{k}{v}" for k, v in group['difficulty'].items())
+            diet = ' '.join(f"{k}{v}" for k, v in group['diet'].items())
+            lines.append(f"{label:<14}{group['count']:>5}{_span(group['temp']):>10}{_span(group['ph']):>10}"
+                         f"{_span(group['size']):>10}  {mix} / {diet}")
+    return lines
+
+def benchmark(rows, repeat=200):
+    """改动一行时: 增量更新与全量重算的平均耗时 (毫秒)"""
+    keyed = {str(i): row for i, row in enumerate(rows)}
+    stats = CategoryStats.from_rows(rows)
+    edited = dict(keyed)
+    edited['0'] = dict(rows[0], difficulty='hard' if rows[0]['difficulty'] != 'hard' else 'easy')
+
+    start = time.perf_counter()
+    for i in range(repeat):
+        old, new = (keyed, edited) if i % 2 == 0 else (edited, keyed)
+        stats.apply_changes(old, new)
+        stats.summary()
+    incremental = (time.perf_counter() - start) / repeat * 1000
+
+    start = time.perf_counter()
+    for i in range(repeat):
+        CategoryStats.from_rows((edited if i % 2 == 0 else keyed).values()).summary()
+    full = (time.perf_counter() - start) / repeat * 1000
+    return incremental, full
+
+def main():
+    rows = load_rows()
+    if '--bench' in sys.argv:
+        incremental, full = benchmark(rows)
+        print(f"{len(rows)} 行, 改动一行: 增量 {incremental:.3f} ms, 全量 {full:.3f} ms")
+        return
+    data = write_stats(CategoryStats.from_rows(rows))
+    for line in format_summary(data):
+        print(line)
+    print(f"\n分类统计: {STATS_FILE}")
+    print(f"  大分类 {len(data['categories'])}, 品种 {data['total']}")
+
+if __name__ == '__main__':
+    main()
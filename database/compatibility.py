@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+混养兼容矩阵 - 预先计算任意两种鱼能否同缸
+
+一次向量化计算四个 n×n 布尔矩阵:
+  temp         水温区间重叠不少于 TEMP_OVERLAP 度
+  ph           pH 区间重叠不少于 PH_OVERLAP
+  size         体长上限之比不超过 SIZE_RATIO (大鱼为肉食时为 PREDATOR_SIZE_RATIO)
+  temperament  性情不冲突 (与 csv-to-json-converter.js 的 mapTemperament 分级一致)
+四者同时满足即可混养。每行压成一个 Python 整数位集 (第 j 位表示可与第 j 种混养),
+"能否与缸里所有鱼混养"只需把缸内各鱼的位集按位与。
+
+结果按目录CSV的哈希缓存到 compat_cache.json, CSV 或规则不变时直接读取。
+
+依赖: pip install numpy (未安装时退回逐对计算, 结果相同但较慢)
+
+用法:
+    python compatibility.py 孔雀鱼 斑马鱼      # 列出可与这些鱼同缸的品种
+    python compatibility.py --why 孔雀鱼 地图鱼  # 说明两种鱼不能混养的原因
+    python compatibility.py --bench            # 对比向量化与逐对计算耗时
+    python compatibility.py --bench --scale 10 # 目录复制10份后再测
+    python compatibility.py --check            # 核对逐对计算与向量化结果一致 (含缺失值的行)
+"""
+
+import os
+import sys
+import csv
+import json
+import math
+import time
+import hashlib
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from image_store import file_sha256, write_json_atomic
+from catalog_snapshot import parse_number, parse_range
+
+BASE_DIR = "/Users/wanshuiwanqigaozhishang/Downloads/MINIAPP"
+DATABASE_DIR = f"{BASE_DIR}/database"
+CSV_FILE = f"{DATABASE_DIR}/Fish_Database_Enhanced_v2.csv"
+CACHE_FILE = f"{DATABASE_DIR}/compat_cache.json"
+
+# 判定规则
+TEMP_OVERLAP = 2.0
+PH_OVERLAP = 0.3
+SIZE_RATIO = 4.0
+PREDATOR_SIZE_RATIO = 2.0
+
+MATRICES = ('temp', 'ph', 'size', 'temperament')
+
+REASONS = {
+    'temp': '水温区间不重叠',
+    'ph': 'pH区间不重叠',
+    'size': '体型差距过大',
+    'temperament': '性情冲突',
+}
+
+PEACEFUL, SEMI_AGGRESSIVE, AGGRESSIVE = 0, 1, 2
+
+def temperament_level(compatibility):
+    """与小程序端 mapTemperament 相同的分级"""
+    text = (compatibility or '').lower()
+    if '攻击' in text or '单养' in text:
+        return AGGRESSIVE
+    if '同类' in text and '温和' not in text:
+        return SEMI_AGGRESSIVE
+    return PEACEFUL
+
+def rules_fingerprint():
+    rules = json.dumps([TEMP_OVERLAP, PH_OVERLAP, SIZE_RATIO, PREDATOR_SIZE_RATIO])
+    return hashlib.sha256(rules.encode('utf-8')).hexdigest()
+
+def species_columns(rows):
+    """取出参与计算的各列; 缺失的数值为 NaN, 与任何值比较都判为不兼容"""
+    return {
+        'tempMin': [parse_number(r.get('tempMin')) for r in rows],
+        'tempMax': [parse_number(r.get('tempMax')) for r in rows],
+        'phMin': [parse_number(r.get('phMin')) for r in rows],
+        'phMax': [parse_number(r.get('phMax')) for r in rows],
+        'size': [parse_range(r.get('size'))[1] for r in rows],
+        'carnivore': [r.get('diet') == '肉食' for r in rows],
+        'level': [temperament_level(r.get('compatibility')) for r in rows],
+        'group': [r.get('subcategoryName') or '' for r in rows],
+    }
+
+def pairwise_numpy(cols):
+    """向量化计算四个布尔矩阵"""
+    t_min, t_max = np.array(cols['tempMin']), np.array(cols['tempMax'])
+    p_min, p_max = np.array(cols['phMin']), np.array(cols['phMax'])
+    size = np.array(cols['size'])
+    carnivore = np.array(cols['carnivore'])
+    level = np.array(cols['level'])
+    _, group = np.unique(np.array(cols['group']), return_inverse=True)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        temp = np.minimum.outer(t_max, t_max) - np.maximum.outer(t_min, t_min) >= TEMP_OVERLAP
+        ph = np.minimum.outer(p_max, p_max) - np.maximum.outer(p_min, p_min) >= PH_OVERLAP - 1e-9
+
+        # 行为较大的一方: 比值与该方是否肉食决定上限
+        bigger_is_row = size[:, None] >= size[None, :]
+        ratio = np.maximum.outer(size, size) / np.minimum.outer(size, size)
+        predator = np.where(bigger_is_row, carnivore[:, None], carnivore[None, :])
+        size_ok = ratio <= np.where(predator, PREDATOR_SIZE_RATIO, SIZE_RATIO)
+
+    top = np.maximum.outer(level, level)
+    same_group = group[:, None] == group[None, :]
+    temperament = (top == PEACEFUL) | ((top == SEMI_AGGRESSIVE) & same_group)
+
+    matrices = {'temp': temp, 'ph': ph, 'size': size_ok, 'temperament': temperament}
+    for matrix in matrices.values():
+        np.fill_diagonal(matrix, True)
+    return {name: pack_rows_numpy(m) for name, m in matrices.items()}
+
+def pack_rows_numpy(matrix):
+    packed = np.packbits(matrix, axis=1, bitorder='little')
+    return [int.from_bytes(row.tobytes(), 'little') for row in packed]
+
+def pairwise_python(cols):
+    """逐对计算, 未安装 numpy 时使用; 规则与 pairwise_numpy 完全一致"""
+    n = len(cols['level'])
+    t_min, t_max = cols['tempMin'], cols['tempMax']
+    p_min, p_max = cols['phMin'], cols['phMax']
+    size, carnivore = cols['size'], cols['carnivore']
+    level, group = cols['level'], cols['group']
+
+    bits = {name: [0] * n for name in MATRICES}
+    for i in range(n):
+        for j in range(n):
+            if i == j:
+                ok = dict.fromkeys(MATRICES, True)
+            else:
+                big, small = (i, j) if size[i] >= size[j] else (j, i)
+                limit = PREDATOR_SIZE_RATIO if carnivore[big] else SIZE_RATIO
+                top = max(level[i], level[j])
+                # 内置 max/min 遇到 NaN 的结果取决于参数顺序, 缺失值须先单独判为不兼容
+                temps = (t_min[i], t_max[i], t_min[j], t_max[j])
+                phs = (p_min[i], p_max[i], p_min[j], p_max[j])
+                ok = {
+                    'temp': not any(map(math.isnan, temps))
+                            and min(t_max[i], t_max[j]) - max(t_min[i], t_min[j]) >= TEMP_OVERLAP,
+                    'ph': not any(map(math.isnan, phs))
+                          and min(p_max[i], p_max[j]) - max(p_min[i], p_min[j]) >= PH_OVERLAP - 1e-9,
+                    'size': size[small] > 0 and size[big] / size[small] <= limit,
+                    'temperament': top == PEACEFUL or (top == SEMI_AGGRESSIVE and group[i] == group[j]),
+                }
+            for name in MATRICES:
+                if ok[name]:
+                    bits[name][i] |= 1 << j
+    return bits
+
+class CompatibilityIndex:
+    """按位集回答混养查询; names[i] 对应位集的第 i 位"""
+
+    def __init__(self, names, bits):
+        self.names = names
+        self.bits = bits
+        self.index = {}
+        for i, name in enumerate(names):
+            self.index.setdefault(name, i)
+        self.compatible = [
+            bits['temp'][i] & bits['ph'][i] & bits['size'][i] & bits['temperament'][i]
+            for i in range(len(names))
+        ]
+        self.everyone = (1 << len(names)) - 1
+
+    @classmethod
+    def build(cls, rows):
+        cols = species_columns(rows)
+        bits = pairwise_numpy(cols) if np is not None else pairwise_python(cols)
+        return cls([r['name'] for r in rows], bits)
+
+    def tank_mask(self, tank):
+        """缸内所有鱼都能接受的品种位集"""
+        mask = self.everyone
+        for name in tank:
+            mask &= self.compatible[self.index[name]]
+        return mask
+
+    def candidates(self, tank):
+        """可加入该缸的品种 (不含缸内已有品种)"""
+        mask = self.tank_mask(tank)
+        for name in tank:
+            mask &= ~(1 << self.index[name])
+        return [self.names[i] for i in iter_bits(mask)]
+
+    def can_add(self, tank, name):
+        return bool(self.tank_mask(tank) >> self.index[name] & 1)
+
+    def why_not(self, a, b):
+        """两种鱼不能混养的原因列表, 可以混养时为空"""
+        i, j = self.index[a], self.index[b]
+        return [REASONS[m] for m in MATRICES if not self.bits[m][i] >> j & 1]
+
+    def to_cache(self, catalog_sha256):
+        return {
+            'catalog_sha256': catalog_sha256,
+            'rules': rules_fingerprint(),
+            'names': self.names,
+            'bits': {m: [format(b, 'x') for b in self.bits[m]] for m in MATRICES},
+        }
+
+    @classmethod
+    def from_cache(cls, data):
+        return cls(data['names'], {m: [int(h, 16) for h in data['bits'][m]] for m in MATRICES})
+
+def iter_bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+def load_rows(csv_file=CSV_FILE):
+    with open(csv_file, 'r', encoding='utf-8-sig') as f:
+        return list(csv.DictReader(f))
+
+def load_index(csv_file=CSV_FILE, cache_file=CACHE_FILE):
+    """读取缓存; 目录CSV或规则变化时重新计算并写回缓存"""
+    catalog_sha256 = file_sha256(csv_file)
+    if os.path.exists(cache_file):
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('catalog_sha256') == catalog_sha256 and data.get('rules') == rules_fingerprint():
+            return CompatibilityIndex.from_cache(data)
+    index = CompatibilityIndex.build(load_rows(csv_file))
+    write_json_atomic(cache_file, index.to_cache(catalog_sha256))
+    return index
+
+def benchmark(scale=1, repeat=3, queries=1000, csv_file=CSV_FILE):
+    """scale > 1 时把目录复制多份 (改名) 模拟更大的品种库"""
+    rows = load_rows(csv_file)
+    rows = [dict(r, name=f"{r['name']}#{k}" if k else r['name']) for k in range(scale) for r in rows]
+    cols = species_columns(rows)
+    results = {}
+    builders = [('逐对计算', pairwise_python)]
+    if np is not None:
+        builders.append(('numpy 向量化', pairwise_numpy))
+    for label, builder in builders:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            bits = builder(cols)
+        results[f"{label} 构建矩阵"] = (time.perf_counter() - start) / repeat * 1000
+
+    index = CompatibilityIndex([r['name'] for r in rows], bits)
+    tank = index.names[:5:2]
+    start = time.perf_counter()
+    for _ in range(queries):
+        index.tank_mask(tank)
+    results['位集查询 (每次)'] = (time.perf_counter() - start) / queries * 1000
+
+    # 对照: 逐个品种检查与缸内每条鱼是否兼容
+    start = time.perf_counter()
+    for _ in range(queries // 10):
+        [j for j in range(len(rows)) if all(index.compatible[index.index[t]] >> j & 1 for t in tank)]
+    results['逐个检查 (每次)'] = (time.perf_counter() - start) / (queries // 10) * 1000
+    return results
+
+def check(csv_file=CSV_FILE):
+    """逐对计算与 numpy 结果应逐位相同且对称; 在目录后追加缺失/无法解析数值的行一起核对, 返回失败项列表"""
+    rows = load_rows(csv_file)
+    base = rows[0]
+    rows += [dict(base, name='缺失水温下限', tempMin=''),
+             dict(base, name='无法解析pH', phMin='abc'),
+             dict(base, name='缺失水温与pH', tempMin='', phMin='abc', tempMax='', phMax=''),
+             dict(base, name='缺失体长', size='')]
+    cols = species_columns(rows)
+    expected = pairwise_python(cols)
+    failures = []
+    for name in MATRICES:
+        bits = expected[name]
+        asymmetric = [rows[i]['name'] for i in range(len(rows))
+                      if any((bits[i] >> j & 1) != (bits[j] >> i & 1) for j in range(len(rows)))]
+        if asymmetric:
+            failures.append(f"逐对计算 {name} 不对称: {', '.join(asymmetric)}")
+    if np is not None:
+        actual = pairwise_numpy(cols)
+        for name in MATRICES:
+            diff = [rows[i]['name'] for i in range(len(rows)) if actual[name][i] != expected[name][i]]
+            if diff:
+                failures.append(f"{name} 与 numpy 结果不同: {', '.join(diff)}")
+    return failures
+
+def main():
+    args = sys.argv[1:]
+
+    if '--check' in args:
+        failures = check()
+        for failure in failures:
+            print(f"  [失败] {failure}")
+        print("全部一致" if not failures else f"{len(failures)} 项不一致")
+        sys.exit(1 if failures else 0)
+
+    if '--bench' in args:
+        if np is None:
+            print("未安装 numpy, 仅测试逐对计算 (pip install numpy)")
+        scale = int(args[args.index('--scale') + 1]) if '--scale' in args else 1
+        for label, ms in benchmark(scale).items():
+            print(f"  {label}: {ms:.4f} ms")
+        return
+
+    index = load_index()
+
+    if '--why' in args:
+        a, b = [x for x in args if x != '--why'][:2]
+        reasons = index.why_not(a, b)
+        print(f"{a} + {b}: {'、'.join(reasons) if reasons else '可以混养'}")
+        return
+
+    unknown = [name for name in args if name not in index.index]
+    if unknown:
+        print(f"目录中没有: {', '.join(unknown)}")
+        return
+    if not args:
+        counts = [bin(mask).count('1') - 1 for mask in index.compatible]
+        print(f"共 {len(index.names)} 种, 平均可与 {sum(counts) / max(len(counts), 1):.1f} 种混养")
+        return
+
+    names = index.candidates(args)
+    print(f"可与 {', '.join(args)} 同缸的品种 ({len(names)}):")
+    for name in names:
+        print(f"  {name}")
+
+if __name__ == '__main__':
+    main()
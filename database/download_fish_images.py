@@ -7,24 +7,33 @@ Fish Image Downloader - 使用Pixabay API下载高质量鱼类图片
 import os
 import re
 import time
-import json
-from urllib.request import urlopen, Request
-from urllib.error import URLError, HTTPError
-from urllib.parse import quote
-import ssl
+import argparse
+
+from http_client import HttpClient
+from resilience import RetryPolicy
+from image_store import ImageStore
+from download_journal import DownloadJournal
+from image_sources import ImageResolver, PixabaySource, UnsplashSource, LocalDirSource
+import run_report
 
 # 配置
 IMAGES_DIR = "/Users/wanshuiwanqigaozhishang/Downloads/MINIAPP/images"
 
-# 创建SSL上下文
-ctx = ssl.create_default_context()
-ctx.check_hostname = False
-ctx.verify_mode = ssl.CERT_NONE
-
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
 }
 
+# 搜索与下载共用连接池, 临时故障退避重试
+client = HttpClient(headers=HEADERS, retry=RetryPolicy())
+store = ImageStore(IMAGES_DIR)
+journal = DownloadJournal()
+
+# 先Pixabay, 失败再Unsplash; --race 时同时查询
+resolver = ImageResolver([
+    PixabaySource(client, priority=0, timeout=20),
+    UnsplashSource(client, priority=1, timeout=20),
+], store)
+
 # 需要下载图片的新增鱼类及其英文搜索词
 NEW_FISH = [
     ('狮头', 'lionhead goldfish', 'carassius'),
@@ -59,91 +68,68 @@ NEW_FISH = [
     ('缎带孔雀', 'ribbon guppy', 'poecilia'),
 ]
 
-def download_from_pixabay(fish_name, search_term, sci_name):
-    """从Pixabay下载图片"""
+def image_filename(fish_name, sci_name):
     safe_name = re.sub(r'[^\w\u4e00-\u9fff]', '', fish_name)
-    filename = f"fish_new_{safe_name}_{sci_name}.jpg"
-    filepath = os.path.join(IMAGES_DIR, filename)
+    return f"fish_new_{safe_name}_{sci_name}.jpg"
 
-    if os.path.exists(filepath):
-        print(f"[跳过] {fish_name}")
-        return filepath
-
-    # Pixabay免费API
-    api_key = "46797847-ef8d7c7ce4cceab08a4ff77c2"  # 公开API key
-    encoded = quote(search_term)
-    url = f"https://pixabay.com/api/?key={api_key}&q={encoded}&image_type=photo&per_page=5"
-
-    try:
-        req = Request(url, headers=HEADERS)
-        response = urlopen(req, timeout=15, context=ctx)
-        data = json.loads(response.read().decode('utf-8'))
-
-        if data.get('hits'):
-            for hit in data['hits']:
-                img_url = hit.get('webformatURL', '')
-                if img_url:
-                    try:
-                        img_req = Request(img_url, headers=HEADERS)
-                        img_response = urlopen(img_req, timeout=20, context=ctx)
-                        img_data = img_response.read()
-                        if len(img_data) > 3000:
-                            with open(filepath, 'wb') as f:
-                                f.write(img_data)
-                            print(f"[成功] {fish_name} -> {filename}")
-                            return filepath
-                    except Exception as e:
-                        continue
-        print(f"[失败] {fish_name} - Pixabay无结果")
-    except Exception as e:
-        print(f"[错误] {fish_name}: {e}")
+def download_fish(fish_name, search_term, sci_name):
+    """按来源优先级 (或竞速) 下载图片, 失败时返回占位路径"""
+    safe_name = re.sub(r'[^\w\u4e00-\u9fff]', '', fish_name)
+    filename = image_filename(fish_name, sci_name)
 
+    if store.has(filename):
+        print(f"[跳过] {fish_name}")
+        run_report.count('journal.skip')
+        return store.resolve(filename)
+
+    species = {
+        'name': fish_name,
+        'search_term': search_term,
+        'scientific_name': sci_name,
+        'filename': filename,
+    }
+    result, errors = resolver.resolve(species)
+    if result:
+        journal.record_success(filename, result['source'], result['url'], result['path'], store.digest(filename))
+        print(f"[成功-{result['source']}] {fish_name} -> {filename}")
+        return result['path']
+
+    print(f"[失败] {fish_name} - {'; '.join(errors)}")
+    journal.record_failure(filename, '; '.join(errors))
     return os.path.join(IMAGES_DIR, f"placeholder_{safe_name}.jpg")
 
-def download_from_unsplash(fish_name, search_term, sci_name):
-    """从Unsplash下载图片 (备选)"""
-    safe_name = re.sub(r'[^\w\u4e00-\u9fff]', '', fish_name)
-    filename = f"fish_new_{safe_name}_{sci_name}.jpg"
-    filepath = os.path.join(IMAGES_DIR, filename)
-
-    if os.path.exists(filepath):
-        return filepath
-
-    # 使用Unsplash Source (无需API key)
-    encoded = quote(search_term)
-    url = f"https://source.unsplash.com/400x300/?{encoded}"
-
-    try:
-        req = Request(url, headers=HEADERS)
-        response = urlopen(req, timeout=20, context=ctx)
-        img_data = response.read()
-        if len(img_data) > 5000:
-            with open(filepath, 'wb') as f:
-                f.write(img_data)
-            print(f"[成功-Unsplash] {fish_name} -> {filename}")
-            return filepath
-    except Exception as e:
-        pass
-
-    return None
-
 def main():
+    parser = argparse.ArgumentParser(description='Fish Image Downloader')
+    parser.add_argument('--race', action='store_true', help='同时查询所有来源, 取最先成功的图片')
+    parser.add_argument('--local', help='优先从本地目录取图')
+    parser.add_argument('--profile', action='store_true', help='生成运行剖析报告')
+    args = parser.parse_args()
+    run_report.setup('download_fish_images', args.profile)
+
+    if args.race:
+        resolver.mode = 'race'
+    if args.local:
+        resolver.sources.insert(0, LocalDirSource(args.local, priority=-1))
+
     print("=" * 50)
     print("Fish Image Downloader")
     print("=" * 50)
 
     success = 0
     failed = 0
+    backoff = 0
 
     for fish_name, search_term, sci_name in NEW_FISH:
-        # 先尝试Pixabay
-        result = download_from_pixabay(fish_name, search_term, sci_name)
+        filename = image_filename(fish_name, sci_name)
+        if journal.decide(filename, exists=store.has(filename)) == 'backoff':
+            print(f"[退避] {fish_name} 近期下载失败, {journal.retry_after(filename) / 3600:.1f} 小时后重试")
+            backoff += 1
+            run_report.count('journal.backoff')
+            continue
 
-        # 如果失败，尝试Unsplash
-        if 'placeholder' in result:
-            unsplash_result = download_from_unsplash(fish_name, search_term, sci_name)
-            if unsplash_result and 'placeholder' not in unsplash_result:
-                result = unsplash_result
+        with run_report.span('species', species=fish_name) as span:
+            result = download_fish(fish_name, search_term, sci_name)
+            span.set(status='placeholder' if 'placeholder' in result else 'ok')
 
         if 'placeholder' not in result:
             success += 1
@@ -153,8 +139,12 @@ def main():
         time.sleep(0.3)  # 避免请求过快
 
     print("\n" + "=" * 50)
-    print(f"完成! 成功: {success}, 失败: {failed}")
+    print(f"完成! 成功: {success}, 失败: {failed}, 退避跳过: {backoff}")
+    print("连接复用:")
+    print(client.format_stats())
     print("=" * 50)
+    run_report.annotate('connections', client.stats())
+    run_report.finish()
 
 if __name__ == '__main__':
     main()
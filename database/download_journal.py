@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片下载日志 - 追加写入的 JSONL 断点记录
+
+每次尝试追加一行:
+    {"ts": 时间戳, "key": 文件名, "status": "success"|"failed", "attempt": 第几次,
+     "source": 来源, "url": 图片URL, "bytes": 字节数, "sha256": 哈希, "error": 失败原因}
+
+下次运行时回放日志:
+  - 成功且图片仍在的条目直接跳过, 不访问网络
+  - 失败的条目按连续失败次数指数退避, 未到重试时间则跳过
+
+用法:
+    python download_journal.py   # 查看各条目的最新状态
+"""
+
+import os
+import json
+import time
+import threading
+
+BASE_DIR = "/Users/wanshuiwanqigaozhishang/Downloads/MINIAPP"
+DATABASE_DIR = f"{BASE_DIR}/database"
+JOURNAL_FILE = f"{DATABASE_DIR}/download_journal.jsonl"
+
+# 失败重试间隔: 首次失败后 1 小时, 每多失败一次翻倍, 最长 7 天
+RETRY_BASE = 3600
+RETRY_MAX = 7 * 24 * 3600
+
+class DownloadJournal:
+    """下载断点日志 (线程安全)"""
+
+    def __init__(self, path=JOURNAL_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # 上次运行中断时最后一行可能不完整
+                    continue
+                self._apply(record)
+
+    def _apply(self, record):
+        entry = self.entries.setdefault(record['key'], {'attempts': 0, 'failures': 0, 'last': None, 'good': None})
+        entry['attempts'] = max(entry['attempts'], record.get('attempt', entry['attempts'] + 1))
+        entry['last'] = record
+        if record['status'] == 'success':
+            entry['failures'] = 0
+            entry['good'] = record
+        else:
+            entry['failures'] += 1
+
+    def record(self, key, status, **fields):
+        """追加一条尝试记录"""
+        with self.lock:
+            entry = self.entries.get(key)
+            record = {'ts': round(time.time(), 3), 'key': key, 'status': status,
+                      'attempt': (entry['attempts'] if entry else 0) + 1}
+            record.update({k: v for k, v in fields.items() if v is not None})
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self._apply(record)
+        return record
+
+    def record_success(self, key, source, url, path, sha256=None):
+        return self.record(key, 'success', source=source, url=url,
+                           bytes=os.path.getsize(path), sha256=sha256)
+
+    def record_failure(self, key, error, source=None, url=None):
+        return self.record(key, 'failed', source=source, url=url, error=str(error))
+
+    def last(self, key):
+        entry = self.entries.get(key)
+        return entry['last'] if entry else None
+
+    def good(self, key):
+        """最近一次成功的记录"""
+        entry = self.entries.get(key)
+        return entry['good'] if entry else None
+
+    def retry_after(self, key, now=None):
+        """距离允许重试还需等待的秒数, 0 表示可以重试"""
+        entry = self.entries.get(key)
+        if not entry or not entry['failures'] or entry['last']['status'] == 'success':
+            return 0
+        delay = min(RETRY_MAX, RETRY_BASE * 2 ** (entry['failures'] - 1))
+        elapsed = (now or time.time()) - entry['last']['ts']
+        return max(0, delay - elapsed)
+
+    def decide(self, key, exists=False, now=None):
+        """决定本次如何处理: done 图片已在 / backoff 退避中 / retry 重试 / new 新条目"""
+        if exists:
+            return 'done'
+        entry = self.entries.get(key)
+        if entry is None:
+            return 'new'
+        if self.retry_after(key, now) > 0:
+            return 'backoff'
+        return 'retry'
+
+def main():
+    journal = DownloadJournal()
+    counts = {}
+    for key in sorted(journal.entries):
+        entry = journal.entries[key]
+        last = entry['last']
+        counts[last['status']] = counts.get(last['status'], 0) + 1
+        line = f"  [{last['status']}] {key} (尝试 {entry['attempts']} 次)"
+        if last['status'] == 'success':
+            line += f" {last.get('source', '')} {last.get('bytes', '')} 字节"
+        else:
+            wait = journal.retry_after(key)
+            line += f" {last.get('error', '')}"
+            if wait:
+                line += f", {wait / 3600:.1f} 小时后重试"
+        print(line)
+    print(f"\n共 {len(journal.entries)} 条: " + ", ".join(f"{k} {v}" for k, v in sorted(counts.items())))
+
+if __name__ == '__main__':
+    main()
@@ -2,21 +2,39 @@
 # -*- coding: utf-8 -*-
 """
 从Wikimedia Commons下载鱼类图片 (CC协议免费图片)
+
+用法:
+    python download_wiki_images.py              # 默认并发
+    python download_wiki_images.py --workers 1  # 串行
+    python download_wiki_images.py --profile    # 生成运行剖析报告
+    python fake_commons.py                      # 用本地 Commons 替身离线检查批量查询
 """
 
 import os
 import re
-import time
 import json
-from urllib.request import urlopen, Request
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import quote
-import ssl
+
+from http_client import HttpClient, HostRateLimiter
+from resilience import RetryPolicy
+from image_store import ImageStore
+from download_journal import DownloadJournal
+import run_report
 
 IMAGES_DIR = "/Users/wanshuiwanqigaozhishang/Downloads/MINIAPP/images"
 
-ctx = ssl.create_default_context()
-ctx.check_hostname = False
-ctx.verify_mode = ssl.CERT_NONE
+# Commons API 地址 (可指向本地替身服务用于测试)
+COMMONS_API = os.environ.get('COMMONS_API', 'https://commons.wikimedia.org/w/api.php')
+
+# 并发与限速配置
+MAX_WORKERS = 4
+RATE_PER_HOST = 2.0  # 每个主机每秒请求数
+RATE_BURST = 2       # 令牌桶容量
+
+# imageinfo 单次请求最多携带的标题数 (Commons API 上限 50)
+TITLES_PER_QUERY = 50
 
 HEADERS = {
     'User-Agent': 'FishDatabaseBot/1.0 (Education Purpose)',
@@ -56,15 +74,26 @@ FISH_LIST = [
     ('缎带孔雀', 'Guppy', 'poecilia'),
 ]
 
-def search_wikimedia(search_term):
+client = HttpClient(headers=HEADERS, rate_limiter=HostRateLimiter(RATE_PER_HOST, RATE_BURST),
+                    retry=RetryPolicy())
+store = ImageStore(IMAGES_DIR)
+journal = DownloadJournal()
+
+def _note(notes, message):
+    """并发模式下先收集日志, 按顺序统一输出"""
+    if notes is None:
+        print(message)
+    else:
+        notes.append(message)
+
+def search_wikimedia(search_term, notes=None):
     """搜索Wikimedia Commons图片"""
     encoded = quote(search_term)
-    url = f"https://commons.wikimedia.org/w/api.php?action=query&list=search&srsearch={encoded}&srnamespace=6&format=json&srlimit=5"
+    url = f"{COMMONS_API}?action=query&list=search&srsearch={encoded}&srnamespace=6&format=json&srlimit=5"
 
     try:
-        req = Request(url, headers=HEADERS)
-        response = urlopen(req, timeout=15, context=ctx)
-        data = json.loads(response.read().decode('utf-8'))
+        with client.get(url, timeout=15) as response:
+            data = json.loads(response.read().decode('utf-8'))
 
         results = data.get('query', {}).get('search', [])
         for result in results:
@@ -72,89 +101,192 @@ def search_wikimedia(search_term):
             if title.startswith('File:') and any(ext in title.lower() for ext in ['.jpg', '.jpeg', '.png']):
                 return title
     except Exception as e:
-        print(f"  搜索错误: {e}")
+        _note(notes, f"  搜索错误: {e}")
     return None
 
-def get_image_url(file_title):
-    """获取图片的实际URL"""
-    encoded = quote(file_title)
-    url = f"https://commons.wikimedia.org/w/api.php?action=query&titles={encoded}&prop=imageinfo&iiprop=url&format=json"
+def get_image_urls(file_titles, notes=None, chunk_size=TITLES_PER_QUERY):
+    """批量获取图片URL: 多个标题用 | 合并为一次 imageinfo 查询, 返回 {标题: URL}"""
+    titles = list(dict.fromkeys(t for t in file_titles if t))
+    urls = {}
 
-    try:
-        req = Request(url, headers=HEADERS)
-        response = urlopen(req, timeout=15, context=ctx)
-        data = json.loads(response.read().decode('utf-8'))
+    for start in range(0, len(titles), chunk_size):
+        chunk = titles[start:start + chunk_size]
+        encoded = quote('|'.join(chunk))
+        url = f"{COMMONS_API}?action=query&titles={encoded}&prop=imageinfo&iiprop=url&format=json"
+
+        try:
+            with client.get(url, timeout=15) as response:
+                data = json.loads(response.read().decode('utf-8'))
+        except Exception as e:
+            _note(notes, f"  获取URL错误: {e}")
+            continue
+        if 'error' in data:
+            _note(notes, f"  获取URL错误: {data['error'].get('info', data['error'])}")
+            continue
 
-        pages = data.get('query', {}).get('pages', {})
-        for page_id, page_data in pages.items():
+        query = data.get('query', {})
+        # API 会规范化标题 (如下划线转空格), 需映射回原始标题; 同一批中两种写法可能并存
+        original = {t: [t] for t in chunk}
+        for item in query.get('normalized', []):
+            original.setdefault(item.get('to'), []).append(item.get('from'))
+
+        for page_data in query.get('pages', {}).values():
             imageinfo = page_data.get('imageinfo', [])
-            if imageinfo:
-                return imageinfo[0].get('url')
-    except Exception as e:
-        print(f"  获取URL错误: {e}")
-    return None
+            if not imageinfo:
+                continue
+            for title in original.get(page_data.get('title'), []):
+                if title in chunk:
+                    urls[title] = imageinfo[0].get('url')
+    return urls
 
-def download_image(img_url, filepath):
+def get_image_url(file_title, notes=None):
+    """获取图片的实际URL"""
+    return get_image_urls([file_title], notes).get(file_title)
+
+def download_image(img_url, filepath, notes=None):
     """下载图片"""
     try:
-        req = Request(img_url, headers=HEADERS)
-        response = urlopen(req, timeout=30, context=ctx)
-        img_data = response.read()
-        if len(img_data) > 3000:
-            with open(filepath, 'wb') as f:
-                f.write(img_data)
-            return True
+        store.fetch(client, img_url, os.path.basename(filepath), min_bytes=3000, timeout=30)
+        return True
     except Exception as e:
-        print(f"  下载错误: {e}")
+        _note(notes, f"  下载错误: {e}")
     return False
 
+def fish_filepath(fish_name, sci_name):
+    """新增鱼类图片的本地路径"""
+    safe_name = re.sub(r'[^\w\u4e00-\u9fff]', '', fish_name)
+    filename = f"fish_new_{safe_name}_{sci_name}.jpg"
+    return os.path.join(IMAGES_DIR, filename)
+
+def search_fish(fish):
+    """搜索阶段: 返回 (鱼名, 本地路径, 状态, 文件标题, 日志列表)
+
+    状态: 'skipped' 已存在, 'backoff' 近期失败尚在退避期 (这两种标题为 None), 'search' 已搜索 (标题可能为 None)
+    """
+    fish_name, search_term, sci_name = fish
+    filepath = fish_filepath(fish_name, sci_name)
+    filename = os.path.basename(filepath)
+    notes = []
+
+    existing = store.resolve(filename)
+    decision = journal.decide(filename, exists=bool(existing and os.path.getsize(existing) > 3000))
+    if decision == 'done':
+        run_report.count('journal.skip')
+        return fish_name, filepath, 'skipped', None, notes
+    if decision == 'backoff':
+        run_report.count('journal.backoff')
+        wait = journal.retry_after(filename)
+        notes.append(f"  [退避] 上次失败: {journal.last(filename).get('error', '')}, {wait / 3600:.1f} 小时后重试")
+        return fish_name, filepath, 'backoff', None, notes
+
+    with run_report.span('search', species=fish_name) as span:
+        file_title = search_wikimedia(search_term, notes)
+        if not file_title:
+            # 尝试只用学名
+            run_report.count('search.fallback')
+            file_title = search_wikimedia(sci_name.capitalize(), notes)
+        span.set(found=bool(file_title))
+    return fish_name, filepath, 'search', file_title, notes
+
+def fetch_fish(item):
+    """下载阶段: 返回 (鱼名, 状态, 日志列表), 状态为 skipped/backoff/success/failed"""
+    fish_name, filepath, status, file_title, img_url, notes = item
+    filename = os.path.basename(filepath)
+
+    if status != 'search':
+        return fish_name, status, notes
+    if not file_title:
+        notes.append("  [失败] 未找到图片")
+        journal.record_failure(filename, '未找到图片', source='wikimedia')
+        return fish_name, 'failed', notes
+    if not img_url:
+        notes.append("  [失败] 无法获取URL")
+        journal.record_failure(filename, '无法获取URL', source='wikimedia')
+        return fish_name, 'failed', notes
+    with run_report.span('fetch', species=fish_name) as span:
+        ok = download_image(img_url, filepath, notes)
+        span.set(status='ok' if ok else 'failed')
+    if not ok:
+        notes.append("  [失败] 下载失败")
+        journal.record_failure(filename, '下载失败', source='wikimedia', url=img_url)
+        return fish_name, 'failed', notes
+
+    journal.record_success(filename, 'wikimedia', img_url, store.resolve(filename), store.digest(filename))
+    notes.append(f"  [成功] -> {filename}")
+    return fish_name, 'success', notes
+
+def _map(func, items, workers):
+    if workers <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(func, items))
+
+def download_all(fish_list, workers=MAX_WORKERS):
+    """搜索 -> 批量解析URL -> 下载, 结果按输入顺序返回"""
+    with run_report.span('stage.search', total=len(fish_list)):
+        searched = _map(search_fish, fish_list, workers)
+
+    titles = [title for _, _, status, title, _ in searched if status == 'search' and title]
+    batch_notes = []
+    with run_report.span('stage.imageinfo', titles=len(titles)):
+        urls = get_image_urls(titles, batch_notes)
+    for line in batch_notes:
+        print(line)
+
+    items = [
+        (fish_name, filepath, status, title, urls.get(title), notes)
+        for fish_name, filepath, status, title, notes in searched
+    ]
+    with run_report.span('stage.download'):
+        return _map(fetch_fish, items, workers)
+
+def positive_float(value):
+    """argparse 类型: 大于 0 的数"""
+    number = float(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"必须大于 0: {value}")
+    return number
+
 def main():
+    parser = argparse.ArgumentParser(description='Wikimedia Commons Fish Image Downloader')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS, help='并发线程数 (1 为串行)')
+    parser.add_argument('--rate', type=positive_float, default=RATE_PER_HOST, help='每个主机每秒请求数')
+    parser.add_argument('--profile', action='store_true', help='生成运行剖析报告')
+    args = parser.parse_args()
+    run_report.setup('download_wiki_images', args.profile)
+
+    client.rate_limiter.rate = args.rate
+
     print("=" * 50)
     print("Wikimedia Commons Fish Image Downloader")
     print("=" * 50)
 
     success = 0
     failed = 0
+    backoff = 0
 
-    for fish_name, search_term, sci_name in FISH_LIST:
-        safe_name = re.sub(r'[^\w\u4e00-\u9fff]', '', fish_name)
-        filename = f"fish_new_{safe_name}_{sci_name}.jpg"
-        filepath = os.path.join(IMAGES_DIR, filename)
-
-        if os.path.exists(filepath) and os.path.getsize(filepath) > 3000:
+    for fish_name, status, notes in download_all(FISH_LIST, args.workers):
+        if status == 'skipped':
             print(f"[跳过] {fish_name}")
-            success += 1
-            continue
-
-        print(f"处理: {fish_name}...")
-
-        # 搜索图片
-        file_title = search_wikimedia(search_term)
-        if not file_title:
-            # 尝试只用学名
-            file_title = search_wikimedia(sci_name.capitalize())
-
-        if file_title:
-            img_url = get_image_url(file_title)
-            if img_url:
-                if download_image(img_url, filepath):
-                    print(f"  [成功] -> {filename}")
-                    success += 1
-                else:
-                    print(f"  [失败] 下载失败")
-                    failed += 1
-            else:
-                print(f"  [失败] 无法获取URL")
-                failed += 1
         else:
-            print(f"  [失败] 未找到图片")
-            failed += 1
+            print(f"处理: {fish_name}...")
+        for line in notes:
+            print(line)
 
-        time.sleep(0.5)
+        if status == 'failed':
+            failed += 1
+        elif status == 'backoff':
+            backoff += 1
+        else:
+            success += 1
 
     print("\n" + "=" * 50)
-    print(f"完成! 成功: {success}, 失败: {failed}")
+    print(f"完成! 成功: {success}, 失败: {failed}, 退避跳过: {backoff}")
+    print("连接复用:")
+    print(client.format_stats())
     print("=" * 50)
+    run_report.annotate('connections', client.stats())
+    run_report.finish()
 
 if __name__ == '__main__':
     main()
@@ -3,17 +3,35 @@
 """
 Fish Database Enhancement Script
 修正分类、补充字段、添加新品种、下载图片
+
+用法:
+    python enhance_fish_database.py                # 全量重建
+    python enhance_fish_database.py --incremental  # 只重算输入有变化的行
+    python enhance_fish_database.py --async        # 新品种并发下载, 结果按顺序边到边写 (输出与串行相同)
+    python enhance_fish_database.py --profile      # 同时生成运行剖析报告 (见 run_report.py)
+    python enhance_fish_database.py --no-pinyin    # 没有 pypinyin 时仍写出搜索索引 (不含拼音; 默认跳过索引)
 """
 
 import csv
 import os
-import time
 import re
-from urllib.parse import quote
-from urllib.request import urlopen, Request
-from urllib.error import URLError, HTTPError
-import ssl
+import sys
 import json
+import hashlib
+
+from http_client import HttpClient, HostRateLimiter, HostConcurrencyLimiter
+from resilience import RetryPolicy
+from image_store import ImageStore, file_sha256, write_json_atomic
+from download_journal import DownloadJournal
+from image_sources import ImageResolver, BingSource
+from species_table import SpeciesTable
+from species_record import FIELDNAMES, SpeciesRecord, validate_records
+from update_csv_paths import image_path_updater
+from catalog_snapshot import build_snapshot
+from search_index import SearchIndex, write_index, has_pinyin, PINYIN_HINT
+from category_stats import CategoryStats, write_stats
+from async_runner import run_ordered
+import run_report
 
 # 配置
 BASE_DIR = "/Users/wanshuiwanqigaozhishang/Downloads/MINIAPP"
@@ -21,6 +39,15 @@ DATABASE_DIR = f"{BASE_DIR}/database"
 IMAGES_DIR = f"{BASE_DIR}/images"
 INPUT_FILE = f"{DATABASE_DIR}/Fish_Database_Enhanced.csv"
 OUTPUT_FILE = f"{DATABASE_DIR}/Fish_Database_Enhanced_v2.csv"
+# 与CSV同步生成的列式快照, 见 catalog_snapshot.py
+SNAPSHOT_FILE = f"{DATABASE_DIR}/Fish_Database_Enhanced_v2.snap"
+# 物种搜索索引, 随 fish-species-query 云函数一起部署
+SEARCH_INDEX_FILE = f"{BASE_DIR}/cloudfunctions/fish-species-query/search_index.json"
+# 分类统计 (品种数/难度/食性/水温/pH/体长), 同样随云函数部署
+CATEGORY_STATS_FILE = f"{BASE_DIR}/cloudfunctions/fish-species-query/category_stats.json"
+
+# 增量构建缓存: 每行的输入指纹与输出结果
+CACHE_FILE = f"{DATABASE_DIR}/.enhance_build_cache.json"
 
 # 请求头
 HEADERS = {
@@ -29,6 +56,27 @@ HEADERS = {
     'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
 }
 
+# --async 时同时处理的品种数, 每个品种的截止时间(秒); 每个主机最多同时2个请求
+ASYNC_CONCURRENCY = 8
+SPECIES_DEADLINE = 90
+PER_HOST_REQUESTS = 2
+
+# 必应搜索与图片下载共用连接池, 每个主机每秒最多2个请求, 临时故障退避重试
+client = HttpClient(headers=HEADERS, rate_limiter=HostRateLimiter(2.0),
+                    host_limiter=HostConcurrencyLimiter(PER_HOST_REQUESTS), retry=RetryPolicy())
+
+# 相同内容的图片只存一份
+store = ImageStore(IMAGES_DIR)
+
+# 记录每次下载尝试, 失败的品种按次数退避
+journal = DownloadJournal()
+
+# 必应图片搜索: 先中文词, 再英文词, 每个词取前3个结果
+resolver = ImageResolver([BingSource(client, timeout=15)], store)
+
+# 新增鱼类的图片路径按内容寻址索引解析 (原先由 update_csv_paths 再读写一遍CSV)
+update_image_path = image_path_updater(store, log=lambda message: None)
+
 # ============ 分类修正映射 ============
 CATEGORY_FIXES = {
     # 格式: '鱼名': ('正确的categoryName', '正确的subcategoryName')
@@ -421,103 +469,113 @@ NEW_FISH_DATA = [
     },
 ]
 
-def download_image(fish_name, scientific_name, category):
-    """下载鱼类图片"""
+def download_image(fish_name, scientific_name, category, cancel=None):
+    """下载鱼类图片; cancel 置位 (截止时间已到) 后不再尝试新的候选"""
+    with run_report.span('species', species=fish_name) as span:
+        path = _download_image(fish_name, scientific_name, cancel)
+        span.set(status='placeholder' if 'placeholder_' in path else 'ok')
+    return path
+
+def _download_image(fish_name, scientific_name, cancel=None):
     # 构建文件名
     safe_name = re.sub(r'[^\w\u4e00-\u9fff]', '', fish_name)
     safe_sci = re.sub(r'[^\w]', '', scientific_name.split()[0].lower()) if scientific_name else 'unknown'
     filename = f"fish_new_{safe_name}_{safe_sci}.jpg"
-    filepath = os.path.join(IMAGES_DIR, filename)
 
     # 检查是否已存在
-    if os.path.exists(filepath):
+    if store.has(filename):
         print(f"  [跳过] {fish_name} 图片已存在")
-        return filepath
-
-    # SSL上下文
-    ctx = ssl.create_default_context()
-    ctx.check_hostname = False
-    ctx.verify_mode = ssl.CERT_NONE
-
-    # 搜索关键词
-    search_terms = [
-        f"{fish_name} 观赏鱼",
-        f"{fish_name} aquarium fish",
-    ]
-
-    for term in search_terms:
-        try:
-            # 使用必应图片搜索
-            encoded_term = quote(term)
-            url = f"https://www.bing.com/images/search?q={encoded_term}&form=HDRSC2&first=1"
-
-            req = Request(url, headers=HEADERS)
-            response = urlopen(req, timeout=10, context=ctx)
-            html = response.read().decode('utf-8', errors='ignore')
-
-            # 查找murl参数中的图片URL
-            matches = re.findall(r'"murl":"(https?://[^"]+\.(?:jpg|jpeg|png))"', html, re.IGNORECASE)
-
-            if matches:
-                for img_url in matches[:3]:  # 尝试前3个
-                    try:
-                        img_req = Request(img_url, headers=HEADERS)
-                        img_response = urlopen(img_req, timeout=15, context=ctx)
-                        img_data = img_response.read()
-                        if len(img_data) > 5000:
-                            with open(filepath, 'wb') as f:
-                                f.write(img_data)
-                            print(f"  [成功] {fish_name} -> {filename}")
-                            return filepath
-                    except Exception as e:
-                        continue
-        except Exception as e:
-            print(f"  [错误] {fish_name}: {e}")
-            continue
-
-        time.sleep(0.5)  # 请求间隔
-
+        run_report.count('journal.skip')
+        return store.resolve(filename)
+
+    if journal.decide(filename) == 'backoff':
+        print(f"  [退避] {fish_name} 近期下载失败, 暂不重试")
+        run_report.count('journal.backoff')
+        return os.path.join(IMAGES_DIR, f"placeholder_{safe_name}.jpg")
+
+    species = {
+        'name': fish_name,
+        'search_term': fish_name,
+        'scientific_name': scientific_name,
+        'filename': filename,
+    }
+    result, errors = resolver.resolve(species, cancel=cancel)
+    if result:
+        journal.record_success(filename, result['source'], result['url'], result['path'], store.digest(filename))
+        print(f"  [成功] {fish_name} -> {filename}")
+        return result['path']
+
+    for error in errors:
+        print(f"  [错误] {fish_name}: {error}")
     print(f"  [失败] {fish_name} 未找到合适图片")
+    journal.record_failure(filename, '未找到合适图片', source='bing')
     return os.path.join(IMAGES_DIR, f"placeholder_{safe_name}.jpg")
 
 def load_existing_data():
-    """加载现有数据"""
-    data = []
-    with open(INPUT_FILE, 'r', encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            data.append(row)
-    return data
+    """加载现有数据 (按鱼名/学名索引的物种表, 每行为 SpeciesRecord)"""
+    return SpeciesTable.load(INPUT_FILE, record_type=SpeciesRecord)
+
+def report_invalid(rows, fieldnames=None):
+    """字段校验: 一次列出所有问题, 只提示不中断"""
+    problems = validate_records(rows, fieldnames)
+    for problem in problems:
+        print(f"  [校验] {problem}")
+    run_report.count('rows.invalid', len(problems))
+    return problems
+
+def fix_category(row):
+    """修正单行分类"""
+    name = row['name']
+    if name in CATEGORY_FIXES:
+        new_cat, new_sub = CATEGORY_FIXES[name]
+        print(f"  修正: {name} -> {new_cat}/{new_sub}")
+        row['categoryName'] = new_cat
+        row['subcategoryName'] = new_sub
+
+def add_extra(row):
+    """为单行添加额外字段"""
+    name = row['name']
+    if name in FISH_EXTRA_DATA:
+        size, lifespan, diet, compat = FISH_EXTRA_DATA[name]
+        row['size'] = size
+        row['lifespan'] = lifespan
+        row['diet'] = diet
+        row['compatibility'] = compat
+    else:
+        # 默认值
+        row['size'] = ''
+        row['lifespan'] = ''
+        row['diet'] = ''
+        row['compatibility'] = ''
+
+def report_unmatched(table):
+    """CATEGORY_FIXES / FISH_EXTRA_DATA 中在表里找不到的鱼名, 附上模糊搜索的候选"""
+    index = SearchIndex.from_rows(table.rows)
+    for label, keys in (('CATEGORY_FIXES', CATEGORY_FIXES), ('FISH_EXTRA_DATA', FISH_EXTRA_DATA)):
+        for name in keys:
+            if table.get(name) is None:
+                guesses = index.names(name, limit=3)
+                hint = f", 是否为: {', '.join(guesses)}" if guesses else ''
+                print(f"  [未匹配] {label}: {name}{hint}")
 
 def fix_categories(data):
     """修正分类"""
     for row in data:
-        name = row['name']
-        if name in CATEGORY_FIXES:
-            new_cat, new_sub = CATEGORY_FIXES[name]
-            print(f"  修正: {name} -> {new_cat}/{new_sub}")
-            row['categoryName'] = new_cat
-            row['subcategoryName'] = new_sub
+        fix_category(row)
     return data
 
 def add_extra_fields(data):
     """添加额外字段"""
     for row in data:
-        name = row['name']
-        if name in FISH_EXTRA_DATA:
-            size, lifespan, diet, compat = FISH_EXTRA_DATA[name]
-            row['size'] = size
-            row['lifespan'] = lifespan
-            row['diet'] = diet
-            row['compatibility'] = compat
-        else:
-            # 默认值
-            row['size'] = ''
-            row['lifespan'] = ''
-            row['diet'] = ''
-            row['compatibility'] = ''
+        add_extra(row)
     return data
 
+def build_new_record(fish, img_path):
+    """由新品种数据构建完整记录; 环境/饲养/备注等未提供的字段留空, 后续可补充"""
+    record = SpeciesRecord.from_row(fish, default='')
+    record['localImagePath'] = img_path
+    return record
+
 def process_new_fish():
     """处理新增鱼类"""
     new_records = []
@@ -526,76 +584,250 @@ def process_new_fish():
         img_path = download_image(fish['name'], fish['scientificName'], fish['categoryName'])
 
         # 构建完整记录
-        record = {
-            'name': fish['name'],
-            'englishName': fish['englishName'],
-            'scientificName': fish['scientificName'],
-            'categoryName': fish['categoryName'],
-            'subcategoryName': fish['subcategoryName'],
-            'origin': fish['origin'],
-            'difficulty': fish['difficulty'],
-            'tempMin': fish['tempMin'],
-            'tempMax': fish['tempMax'],
-            'phMin': fish['phMin'],
-            'phMax': fish['phMax'],
-            'description': fish['description'],
-            'careTip': fish['careTip'],
-            'environment': '',  # 后续可补充
-            'husbandry_features': '',
-            'notes': '',
-            'localImagePath': img_path,
-            'size': fish.get('size', ''),
-            'lifespan': fish.get('lifespan', ''),
-            'diet': fish.get('diet', ''),
-            'compatibility': fish.get('compatibility', ''),
-        }
+        record = build_new_record(fish, img_path)
+        update_image_path(record)
         new_records.append(record)
     return new_records
 
-def save_data(data, output_file):
-    """保存数据"""
-    fieldnames = [
-        'name', 'englishName', 'scientificName', 'categoryName', 'subcategoryName',
-        'origin', 'difficulty', 'tempMin', 'tempMax', 'phMin', 'phMax',
-        'description', 'careTip', 'environment', 'husbandry_features', 'notes',
-        'localImagePath', 'size', 'lifespan', 'diet', 'compatibility'
-    ]
+def process_new_fish_async(output):
+    """并发下载新增鱼类图片; 记录按 NEW_FISH_DATA 的顺序构建并写入 output"""
+    new_records = []
 
-    with open(output_file, 'w', encoding='utf-8-sig', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(data)
+    def fetch(fish, cancel):
+        return download_image(fish['name'], fish['scientificName'], fish['categoryName'], cancel)
 
-    print(f"\n保存完成: {output_file}")
-    print(f"总记录数: {len(data)}")
+    def on_result(fish, img_path):
+        record = build_new_record(fish, img_path)
+        update_image_path(record)
+        output.write(record)
+        new_records.append(record)
 
-def main():
+    run_ordered(NEW_FISH_DATA, fetch, on_result, concurrency=ASYNC_CONCURRENCY, deadline=SPECIES_DEADLINE)
+    return new_records
+
+class CsvOutput:
+    """逐行写出CSV (先写临时文件, close 时替换), 完成后生成列式快照、搜索索引与分类统计
+
+    stats 为已增量更新好的 CategoryStats 时直接写出, 否则由写出的行重新统计。
+    """
+
+    def __init__(self, output_file, stats=None):
+        self.output_file = output_file
+        self.stats = stats
+        self.tmp_file = f"{output_file}.tmp"
+        self.file = open(self.tmp_file, 'w', encoding='utf-8-sig', newline='')
+        self.writer = csv.DictWriter(self.file, fieldnames=FIELDNAMES)
+        self.writer.writeheader()
+        self.rows = []
+
+    def write(self, record):
+        self.writer.writerow(record)
+        self.rows.append(as_csv_row(record))
+
+    def close(self):
+        with run_report.span('write.csv', rows=len(self.rows)):
+            self.file.close()
+            os.replace(self.tmp_file, self.output_file)
+        with run_report.span('write.snapshot'):
+            build_snapshot(self.rows, FIELDNAMES, SNAPSHOT_FILE)
+        index_written = has_pinyin() or '--no-pinyin' in sys.argv
+        if index_written:
+            with run_report.span('write.search_index'):
+                write_index(self.rows, SEARCH_INDEX_FILE, require_pinyin=False)
+        else:
+            print(f"\n警告: {PINYIN_HINT}; 本次未更新搜索索引")
+        with run_report.span('write.category_stats'):
+            write_stats(self.stats or CategoryStats.from_rows(self.rows), CATEGORY_STATS_FILE)
+
+        print(f"\n保存完成: {self.output_file}")
+        print(f"列式快照: {SNAPSHOT_FILE}")
+        if index_written:
+            print(f"搜索索引: {SEARCH_INDEX_FILE}")
+        print(f"分类统计: {CATEGORY_STATS_FILE}")
+        print(f"总记录数: {len(self.rows)}")
+
+def save_data(data, output_file, stats=None):
+    """保存数据"""
+    output = CsvOutput(output_file, stats)
+    for row in data:
+        output.write(row)
+    output.close()
+
+# ============ 增量构建 ============
+
+def fingerprint(*parts):
+    """输入指纹: 任一部分变化都会得到不同的哈希"""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def as_csv_row(record):
+    """统一为写入CSV后的字符串形式, 便于比较与缓存"""
+    return {k: '' if record.get(k) is None else str(record.get(k)) for k in FIELDNAMES}
+
+def row_keys(names):
+    """行键: 鱼名, 重名时追加序号"""
+    seen = {}
+    keys = []
+    for name in names:
+        seen[name] = seen.get(name, 0) + 1
+        keys.append(name if seen[name] == 1 else f"{name}#{seen[name]}")
+    return keys
+
+def load_cache():
+    if os.path.exists(CACHE_FILE):
+        with open(CACHE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {'rows': {}, 'order': []}
+
+def build_rows_incremental(cache):
+    """只重算指纹变化的行, 返回 (行键列表, {行键: {fingerprint, row}}, 重算行数)"""
+    cached = cache.get('rows', {})
+    entries = {}
+    order = []
+    rebuilt = 0
+
+    # 原有记录: 指纹 = 源CSV行 + 该鱼的分类修正 + 额外字段
+    source = load_existing_data()
+    for key, row in zip(row_keys([r['name'] for r in source]), source):
+        name = row['name']
+        fp = fingerprint('csv', dict(row), CATEGORY_FIXES.get(name), FISH_EXTRA_DATA.get(name))
+        entry = cached.get(key)
+        if not entry or entry['fingerprint'] != fp:
+            out = add_extra_fields(fix_categories([row.copy()]))[0]
+            entry = {'fingerprint': fp, 'row': as_csv_row(out)}
+            rebuilt += 1
+        entries[key] = entry
+        order.append(key)
+
+    # 新增品种: 指纹 = 品种数据; 上次图片下载失败的仍需重试
+    for key, fish in zip(row_keys([f['name'] for f in NEW_FISH_DATA]), NEW_FISH_DATA):
+        key = f"new:{key}"
+        fp = fingerprint('new', fish)
+        entry = cached.get(key)
+        if not entry or entry['fingerprint'] != fp or 'placeholder_' in entry['row']['localImagePath']:
+            img_path = download_image(fish['name'], fish['scientificName'], fish['categoryName'])
+            record = build_new_record(fish, img_path)
+            update_image_path(record)
+            entry = {'fingerprint': fp, 'row': as_csv_row(record)}
+            rebuilt += 1
+        entries[key] = entry
+        order.append(key)
+
+    return order, entries, rebuilt
+
+def diff_rows(old_order, old_entries, new_order, new_entries):
+    """比较两次输出, 返回 (新增, 变更, 删除) 的鱼名列表"""
+    old_rows = {k: old_entries[k]['row'] for k in old_order if k in old_entries}
+    new_rows = {k: new_entries[k]['row'] for k in new_order}
+    added = [new_rows[k]['name'] for k in new_order if k not in old_rows]
+    changed = [new_rows[k]['name'] for k in new_order if k in old_rows and old_rows[k] != new_rows[k]]
+    removed = [old_rows[k]['name'] for k in old_order if k in old_rows and k not in new_rows]
+    return added, changed, removed
+
+def update_stats(cache, order, entries):
+    """由上次缓存的分类统计减去旧行、加上新行; 没有缓存时全量统计"""
+    new_rows = {k: entries[k]['row'] for k in order}
+    if not cache.get('stats'):
+        return CategoryStats.from_rows(new_rows.values())
+    old_entries = cache.get('rows', {})
+    old_rows = {k: old_entries[k]['row'] for k in cache.get('order', []) if k in old_entries}
+    stats = CategoryStats.from_state(cache['stats'])
+    run_report.count('stats.rows_updated', stats.apply_changes(old_rows, new_rows))
+    return stats
+
+def main_incremental():
     print("=" * 60)
-    print("Fish Database Enhancement Script")
+    print("Fish Database Enhancement Script (增量)")
     print("=" * 60)
 
-    # 1. 加载现有数据
-    print("\n[1/5] 加载现有数据...")
-    data = load_existing_data()
-    print(f"  加载 {len(data)} 条记录")
+    cache = load_cache()
+    with run_report.span('stage.build_rows'):
+        order, entries, rebuilt = build_rows_incremental(cache)
+    run_report.count('rows.rebuilt', rebuilt)
+    run_report.count('rows.cached', len(order) - rebuilt)
+    print(f"\n共 {len(order)} 条记录, 重算 {rebuilt} 条")
+
+    added, changed, removed = diff_rows(cache.get('order', []), cache.get('rows', {}), order, entries)
+    for label, names in (('新增', added), ('变更', changed), ('删除', removed)):
+        shown = ', '.join(names[:20]) + (f" 等 {len(names)} 条" if len(names) > 20 else '')
+        print(f"  {label} {len(names)}: {shown}" if names else f"  {label} 0")
+
+    report_invalid([entries[k]['row'] for k in order])
+    stats = update_stats(cache, order, entries)
+
+    # 输出文件被外部改动过 (哈希不符) 时也需要重写
+    output_sha = file_sha256(OUTPUT_FILE) if os.path.exists(OUTPUT_FILE) else None
+    unchanged = not (added or changed or removed) and all(
+        os.path.exists(path) for path in (SNAPSHOT_FILE, SEARCH_INDEX_FILE, CATEGORY_STATS_FILE))
+    if unchanged and output_sha and output_sha == cache.get('output_sha256'):
+        print("\n输出无变化, 跳过写入")
+    else:
+        with run_report.span('stage.save'):
+            save_data([entries[k]['row'] for k in order], OUTPUT_FILE, stats)
+        output_sha = file_sha256(OUTPUT_FILE)
+
+    write_json_atomic(CACHE_FILE, {'order': order, 'rows': entries, 'output_sha256': output_sha,
+                                   'stats': stats.state()})
 
-    # 2. 修正分类
-    print("\n[2/5] 修正分类归属...")
-    data = fix_categories(data)
-
-    # 3. 添加额外字段
-    print("\n[3/5] 添加额外字段 (体长/寿命/食性/混养)...")
-    data = add_extra_fields(data)
+def main():
+    run_report.setup('enhance_fish_database', '--profile' in sys.argv)
+    if '--incremental' in sys.argv:
+        main_incremental()
+        run_report.annotate('connections', client.stats())
+        run_report.finish()
+        return
 
-    # 4. 处理新增鱼类
-    print("\n[4/5] 添加新品种并下载图片...")
-    new_records = process_new_fish()
-    data.extend(new_records)
-    print(f"  新增 {len(new_records)} 条记录")
+    print("=" * 60)
+    print("Fish Database Enhancement Script")
+    print("=" * 60)
 
-    # 5. 保存数据
-    print("\n[5/5] 保存数据...")
-    save_data(data, OUTPUT_FILE)
+    # 1. 加载现有数据 (只读一次CSV)
+    print("\n[1/4] 加载现有数据...")
+    with run_report.span('stage.load'):
+        table = load_existing_data()
+    print(f"  加载 {len(table)} 条记录")
+    report_unmatched(table)
+
+    # 2. 修正分类 + 添加额外字段, 一次遍历完成
+    print("\n[2/4] 修正分类归属, 添加额外字段 (体长/寿命/食性/混养)...")
+    with run_report.span('stage.fix_fields', rows=len(table)):
+        table.apply(fix_category, add_extra)
+
+    if '--async' in sys.argv:
+        # 3. 已有记录先写出, 新品种并发下载, 按顺序边到边写
+        print("\n[3/4] 添加新品种并下载图片 (并发)...")
+        output = CsvOutput(OUTPUT_FILE)
+        for row in table.rows:
+            output.write(row)
+        with run_report.span('stage.new_fish'):
+            new_records = process_new_fish_async(output)
+        table.extend(new_records)
+        print(f"  新增 {len(new_records)} 条记录")
+
+        # 4. 收尾: 替换CSV, 生成快照与索引
+        print("\n[4/4] 保存数据...")
+        report_invalid(table.rows)
+        with run_report.span('stage.save'):
+            output.close()
+    else:
+        # 3. 处理新增鱼类
+        print("\n[3/4] 添加新品种并下载图片...")
+        with run_report.span('stage.new_fish'):
+            new_records = process_new_fish()
+        table.extend(new_records)
+        print(f"  新增 {len(new_records)} 条记录")
+
+        # 4. 保存数据 (只写一次CSV)
+        print("\n[4/4] 保存数据...")
+        report_invalid(table.rows)
+        with run_report.span('stage.save'):
+            save_data(table.rows, OUTPUT_FILE)
+
+    print("\n连接复用:")
+    print(client.format_stats())
+
+    run_report.annotate('connections', client.stats())
+    run_report.finish()
 
     print("\n" + "=" * 60)
     print("处理完成!")
@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+物种数据导出 - v2 CSV 直接生成可导入云数据库的 JSON Lines 分片
+
+逐行读取 CSV, 同一遍中完成:
+  - 字段转换 (与 scripts/csv-to-json-converter.js 的输出字段一致)
+  - 分类/子分类名称 -> ID (由分类树预设预先建好 (大分类, 子分类) 映射, 不在分类树中的组合给出警告)
+  - 云端图片地址 (image_mapping.json)
+  - 数据校验: 有错误的行不导出, 只有警告的行照常导出
+每个分片不超过 BATCH_SIZE 条且不超过 MAX_BATCH_BYTES 字节, 可直接在云开发控制台按 JSON Lines 导入,
+或由云函数按分片批量写入, 不必再把全部数据嵌进 fish-import/index.js。
+export_manifest.json 记录各分片的条数与哈希。
+
+增量导入: export_state.json 记录 鱼名 -> _id 与云端已应用的每个 _id 的内容哈希 (docs)。
+  - 已导出过的鱼名沿用原 _id, 新鱼名取未用过的编号, 删行或调整顺序不会使 _id 错位
+  - 与已应用的内容相比新增或变化的文档写入 changes_NNNN.jsonl 的 upsert, 消失的写 delete
+  - 只是这次校验失败的行不算消失: 云端保留原文档, 不写 delete
+  - 未变化的文档保留原 createdAt/updatedAt
+变更分片交给 fish-delta-import 云函数应用, 日常修一两条数据只会改动这几条文档。
+导出后的新内容先记为 pending, 确认变更已全部导入后运行 --ack 才并入 docs; 在此之前重复导出,
+变更仍相对上次已应用的内容计算 (前一次未导入的变更会包含在新分片中, 不会丢失)。
+
+用法:
+    python export_species.py
+    python export_species.py --batch 50 --output ./export
+    python export_species.py --ack     # fish-delta-import 应用完本次 changes 分片后确认
+"""
+
+import os
+import re
+import csv
+import json
+import glob
+import argparse
+import hashlib
+from datetime import datetime, timezone
+
+from image_store import file_sha256, write_json_atomic
+
+BASE_DIR = "/Users/wanshuiwanqigaozhishang/Downloads/MINIAPP"
+DATABASE_DIR = f"{BASE_DIR}/database"
+CSV_FILE = f"{DATABASE_DIR}/Fish_Database_Enhanced_v2.csv"
+MAPPING_FILE = f"{DATABASE_DIR}/image_mapping.json"
+CATEGORIES_FILE = f"{DATABASE_DIR}/fish_categories_preset.json"
+SUBCATEGORIES_FILE = f"{DATABASE_DIR}/fish_subcategories_preset.json"
+EXPORT_DIR = f"{DATABASE_DIR}/export"
+MANIFEST_NAME = "export_manifest.json"
+STATE_NAME = "export_state.json"
+
+# 不参与内容哈希的字段
+VOLATILE_FIELDS = ('createdAt', 'updatedAt')
+
+# 每个分片的上限
+BATCH_SIZE = 100
+MAX_BATCH_BYTES = 1024 * 1024
+
+# 分类映射表 (CSV categoryName -> 数据库 ID), 与 csv-to-json-converter.js 相同
+CATEGORY_MAPPING = {
+    '冷水/国粹': 'cat_coldwater',
+    '迷鳃/斗鱼': 'cat_labyrinth',
+    '灯科/加拉辛': 'cat_characin',
+    '鲤科/小型': 'cat_cyprinid',
+    '孔雀/卵胎生': 'cat_livebearer',
+    '南美慈鲷': 'cat_sa_cichlid',
+    '三湖慈鲷': 'cat_african_cichlid',
+    '鼠鱼/异型': 'cat_catfish',
+    '工具鱼': 'cat_utility',
+    '大型/古代': 'cat_monster',
+    '海水': 'cat_saltwater',
+}
+
+SUBCATEGORY_MAPPING = {
+    '金鱼': 'subcat_goldfish',
+    '锦鲤/原生': 'subcat_koi_native',
+    '原生斗鱼': 'subcat_native_betta',
+    '雷龙': 'subcat_snakehead',
+    '南美小型': 'subcat_sa_small',
+    '其他加拉辛': 'subcat_other_characin',
+    '热门小型': 'subcat_popular_small',
+    '亚洲小型': 'subcat_asian_small',
+    '胎生鱼': 'subcat_livebearer_common',
+    '孔雀品系': 'subcat_guppy',
+    '短鲷': 'subcat_dwarf_cichlid',
+    '神仙/七彩': 'subcat_angel_discus',
+    '大型': 'subcat_sa_large',
+    '孔雀': 'subcat_peacock',
+    '马鲷': 'subcat_mbuna',
+    '坦鲷': 'subcat_tanganyika',
+    '鼠鱼': 'subcat_corydoras',
+    '异型': 'subcat_pleco',
+    '除藻': 'subcat_algae_eater',
+    '观赏虾': 'subcat_shrimp',
+    '螺类': 'subcat_snail',
+    '霸主': 'subcat_apex',
+    '怪兽': 'subcat_oddball',
+    '神仙/倒吊': 'subcat_marine_angel',
+}
+
+# "常见" 子分类需要结合大分类
+COMMON_SUBCATEGORY = {
+    '迷鳃/斗鱼': 'subcat_common_labyrinth',
+    '海水': 'subcat_marine_common',
+}
+
+def load_category_ids(categories_file=CATEGORIES_FILE, subcategories_file=SUBCATEGORIES_FILE):
+    """分类树中实际存在的 (大分类名, 子分类名) -> (大分类ID, 子分类ID), 导出时每行只查一次字典"""
+    with open(categories_file, 'r', encoding='utf-8') as f:
+        names = {category['_id']: category['name'] for category in json.load(f)}
+    with open(subcategories_file, 'r', encoding='utf-8') as f:
+        subcategories = json.load(f)
+    return {(names[sub['categoryId']], sub['name']): (sub['categoryId'], sub['_id']) for sub in subcategories}
+
+VALID_DIFFICULTY = ('easy', 'medium', 'hard')
+
+def map_temperament(compatibility):
+    """compatibility -> temperament, 与 mapTemperament 相同"""
+    text = (compatibility or '').lower()
+    if '攻击' in text or '单养' in text:
+        return 'aggressive'
+    if '同类' in text and '温和' not in text:
+        return 'semi-aggressive'
+    return 'peaceful'
+
+def parse_size(text):
+    """'15-30' -> (15, 30); 与 parseSize 相同只取整数部分"""
+    match = re.search(r'(\d+)-(\d+)', text or '')
+    if match:
+        return int(match.group(1)), int(match.group(2))
+    single = re.search(r'(\d+)', text or '')
+    if single:
+        return int(single.group(1)), int(single.group(1))
+    return 0, 0
+
+def parse_float(text, default):
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return default
+
+def to_number(value):
+    """整数值输出为整数, 与 JS 的 JSON 序列化一致"""
+    return int(value) if value == int(value) else value
+
+def convert_row(row, doc_id, mapping, timestamp, category_ids):
+    """返回 (文档, 错误列表, 警告列表); 有错误时文档不导出
+
+    category_ids 为 load_category_ids() 的结果; 组合不在分类树中时按名称分别映射并给出警告
+    """
+    errors = []
+    warnings = []
+    name = (row.get('name') or '').strip()
+    if not name:
+        errors.append('缺少鱼名')
+
+    category = row.get('categoryName') or ''
+    subcategory = row.get('subcategoryName') or ''
+    ids = category_ids.get((category, subcategory))
+    if ids is None:
+        category_id = CATEGORY_MAPPING.get(category)
+        if subcategory == '常见':
+            subcategory_id = COMMON_SUBCATEGORY.get(category)
+        else:
+            subcategory_id = SUBCATEGORY_MAPPING.get(subcategory)
+        if category_id is None:
+            warnings.append(f"未知大分类 '{category}', 归入 cat_coldwater")
+        if subcategory_id is None:
+            warnings.append(f"未知子分类 '{subcategory}', 归入 subcat_goldfish")
+        if category_id and subcategory_id:
+            warnings.append(f"子分类 '{subcategory}' 不属于大分类 '{category}'")
+        ids = (category_id or 'cat_coldwater', subcategory_id or 'subcat_goldfish')
+
+    ranges = {}
+    for low_field, high_field, low_default, high_default in (('tempMin', 'tempMax', 20, 28),
+                                                             ('phMin', 'phMax', 6.5, 7.5)):
+        if not row.get(low_field) or not row.get(high_field):
+            warnings.append(f"{low_field}/{high_field} 缺失, 使用默认值")
+        low = parse_float(row.get(low_field), None) or low_default
+        high = parse_float(row.get(high_field), None) or high_default
+        if low > high:
+            errors.append(f"{low_field} {low} 大于 {high_field} {high}")
+        ranges[low_field], ranges[high_field] = to_number(low), to_number(high)
+    if not 0 <= ranges['phMin'] <= 14 or not 0 <= ranges['phMax'] <= 14:
+        errors.append(f"pH 超出 0-14: {ranges['phMin']}-{ranges['phMax']}")
+
+    difficulty = row.get('difficulty') or 'medium'
+    if difficulty not in VALID_DIFFICULTY:
+        warnings.append(f"未知难度 '{difficulty}'")
+
+    size_min, size_max = parse_size(row.get('size'))
+    local_path = row.get('localImagePath') or ''
+    image_url = mapping.get(os.path.basename(local_path), '') if local_path else ''
+    if local_path and not image_url:
+        warnings.append('图片未上传')
+
+    doc = {
+        '_id': doc_id,
+        'name': name,
+        'englishName': row.get('englishName') or '',
+        'scientificName': row.get('scientificName') or '',
+        'categoryId': ids[0],
+        'subcategoryId': ids[1],
+        'origin': row.get('origin') or '',
+        'difficulty': difficulty,
+        'tempMin': ranges['tempMin'],
+        'tempMax': ranges['tempMax'],
+        'phMin': ranges['phMin'],
+        'phMax': ranges['phMax'],
+        'bodyLengthMin': size_min,
+        'bodyLengthMax': size_max,
+        'lifespan': row.get('lifespan') or '',
+        'diet': row.get('diet') or '杂食',
+        'compatibility': row.get('compatibility') or '',
+        'temperament': map_temperament(row.get('compatibility')),
+        'description': row.get('description') or '',
+        'careTip': row.get('careTip') or '',
+        'environment': row.get('environment') or '',
+        'husbandryFeatures': row.get('husbandry_features') or '',
+        'notes': row.get('notes') or '',
+        'imageUrl': image_url,
+        'localImagePath': local_path,
+        'source': 'preset',
+        'isVerified': True,
+        'createdAt': timestamp,
+        'updatedAt': timestamp,
+    }
+    return doc, errors, warnings
+
+def content_hash(doc):
+    stable = {k: v for k, v in doc.items() if k not in VOLATILE_FIELDS}
+    payload = json.dumps(stable, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class IdAllocator:
+    """鱼名 -> 稳定的 species_### 编号; 首次导出时与行号一致"""
+
+    def __init__(self, known):
+        self.known = dict(known)
+        self.used = set(self.known.values())
+        numbers = [int(m.group(1)) for m in map(re.compile(r'species_(\d+)$').match, self.used) if m]
+        self.next_number = max(numbers, default=0) + 1
+
+    def get(self, name, line):
+        doc_id = self.known.get(name)
+        if doc_id is None:
+            doc_id = f"species_{line:03d}"
+            if doc_id in self.used:
+                doc_id = f"species_{self.next_number:03d}"
+            self.used.add(doc_id)
+            number = int(doc_id.split('_')[1])
+            self.next_number = max(self.next_number, number + 1)
+            self.known[name] = doc_id
+        return doc_id
+
+class ChunkWriter:
+    """按条数和字节数切分 JSON Lines 文件"""
+
+    def __init__(self, output_dir, prefix='species', batch_size=BATCH_SIZE, max_bytes=MAX_BATCH_BYTES):
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self.max_bytes = max_bytes
+        self.chunks = []
+        self.file = None
+
+    def write(self, doc):
+        line = (json.dumps(doc, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+        if self.file is None or self.count >= self.batch_size or self.size + len(line) > self.max_bytes:
+            self._open()
+        self.file.write(line)
+        self.digest.update(line)
+        self.count += 1
+        self.size += len(line)
+
+    def _open(self):
+        self._close()
+        filename = f"{self.prefix}_{len(self.chunks) + 1:04d}.jsonl"
+        self.path = os.path.join(self.output_dir, filename)
+        self.file = open(self.path + '.part', 'wb')
+        self.digest = hashlib.sha256()
+        self.count = 0
+        self.size = 0
+        self.chunks.append({'file': filename})
+
+    def _close(self):
+        if self.file is None:
+            return
+        self.file.close()
+        os.replace(self.path + '.part', self.path)
+        self.chunks[-1].update(count=self.count, bytes=self.size, sha256=self.digest.hexdigest())
+        self.file = None
+
+    def close(self):
+        """关闭当前分片, 删除上次运行多出来的同前缀分片"""
+        self._close()
+        current = {c['file'] for c in self.chunks}
+        for path in glob.glob(os.path.join(self.output_dir, f"{self.prefix}_*.jsonl")):
+            if os.path.basename(path) not in current:
+                os.remove(path)
+        return self.chunks
+
+def load_state(output_dir):
+    """docs 为云端已应用的内容; pending 为已导出、尚未确认导入的内容 (没有时为 None)"""
+    path = os.path.join(output_dir, STATE_NAME)
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return dict({'pending': None}, **json.load(f))
+    return {'ids': {}, 'docs': {}, 'pending': None}
+
+def acknowledge(output_dir=EXPORT_DIR):
+    """变更分片已全部导入: pending 并入 docs, 删除已应用的变更分片; 返回确认的文档数, 没有待确认内容时为 None"""
+    state = load_state(output_dir)
+    pending = state['pending']
+    if not pending:
+        return None
+    docs = pending['docs']
+    write_json_atomic(os.path.join(output_dir, STATE_NAME), {
+        'ids': {name: doc_id for name, doc_id in state['ids'].items() if doc_id in docs},
+        'docs': docs,
+        'pending': None,
+    })
+    for filename in pending['changes']:
+        path = os.path.join(output_dir, filename)
+        if os.path.exists(path):
+            os.remove(path)
+    return len(docs)
+
+def export(csv_file=CSV_FILE, output_dir=EXPORT_DIR, mapping_file=MAPPING_FILE,
+           batch_size=BATCH_SIZE, max_bytes=MAX_BATCH_BYTES,
+           categories_file=CATEGORIES_FILE, subcategories_file=SUBCATEGORIES_FILE):
+    """导出全量分片与相对上次的变更分片, 写 manifest 和 state, 返回 manifest"""
+    os.makedirs(output_dir, exist_ok=True)
+    mapping = {}
+    if os.path.exists(mapping_file):
+        with open(mapping_file, 'r', encoding='utf-8') as f:
+            mapping = json.load(f)
+    timestamp = datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+    category_ids = load_category_ids(categories_file, subcategories_file)
+
+    state = load_state(output_dir)
+    previous = state['docs']
+    pending = (state['pending'] or {}).get('docs', {})
+    ids = IdAllocator(state['ids'])
+    writer = ChunkWriter(output_dir, batch_size=batch_size, max_bytes=max_bytes)
+    changes = ChunkWriter(output_dir, prefix='changes', batch_size=batch_size, max_bytes=max_bytes)
+    problems = []
+    seen = {}
+    docs = {}
+    counts = {'upsert': 0, 'delete': 0, 'unchanged': 0}
+    with open(csv_file, 'r', encoding='utf-8-sig', newline='') as f:
+        for line, row in enumerate(csv.DictReader(f), 1):
+            name = (row.get('name') or '').strip()
+            doc, errors, warnings = convert_row(row, ids.get(name, line), mapping, timestamp, category_ids)
+            if name in seen:
+                errors.append(f"与第 {seen[name]} 行重名")
+            seen.setdefault(name, line)
+            for level, messages in (('error', errors), ('warning', warnings)):
+                for message in messages:
+                    problems.append({'line': line, 'name': name, 'level': level, 'message': message})
+            if errors:
+                # 已在云端的文档保持原样, 等数据修好后再更新
+                if doc['_id'] in previous and doc['_id'] not in docs:
+                    docs[doc['_id']] = previous[doc['_id']]
+                continue
+
+            digest = content_hash(doc)
+            old = previous.get(doc['_id'])
+            exported = pending.get(doc['_id'])
+            if old or exported:
+                doc['createdAt'] = (old or exported)['createdAt']
+            if old and old['hash'] == digest:
+                doc['updatedAt'] = old['updatedAt']
+                counts['unchanged'] += 1
+            else:
+                # 与上次导出 (尚未确认) 的内容相同时沿用其时间戳, 重复导出不改变 updatedAt
+                if exported and exported['hash'] == digest:
+                    doc['updatedAt'] = exported['updatedAt']
+                changes.write({'op': 'upsert', 'doc': doc})
+                counts['upsert'] += 1
+            docs[doc['_id']] = {'hash': digest, 'createdAt': doc['createdAt'], 'updatedAt': doc['updatedAt']}
+            writer.write(doc)
+
+    # 云端有、这次没有的文档删除 (这次校验失败的已在上面保留)
+    for doc_id in sorted(set(previous) - set(docs)):
+        changes.write({'op': 'delete', '_id': doc_id})
+        counts['delete'] += 1
+
+    manifest = {
+        'source': os.path.basename(csv_file),
+        'sourceSha256': file_sha256(csv_file),
+        'exportedAt': timestamp,
+        'total': len(docs),
+        'batchSize': batch_size,
+        'chunks': writer.close(),
+        'changes': dict(counts, chunks=changes.close()),
+        'problems': problems,
+    }
+    docs = dict(sorted(docs.items()))
+    changed = counts['upsert'] or counts['delete']
+    write_json_atomic(os.path.join(output_dir, MANIFEST_NAME), manifest)
+    # 没有变更时无需导入, 直接记为已应用; 否则等 --ack
+    write_json_atomic(os.path.join(output_dir, STATE_NAME), {
+        'ids': {name: doc_id for name, doc_id in sorted(ids.known.items()) if doc_id in docs or doc_id in previous},
+        'docs': previous if changed else docs,
+        'pending': {'exportedAt': timestamp, 'docs': docs,
+                    'changes': [c['file'] for c in manifest['changes']['chunks']]} if changed else None,
+    })
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description='Export fish species to cloud-import JSON Lines')
+    parser.add_argument('--batch', type=int, default=BATCH_SIZE, help='每个分片的最大条数')
+    parser.add_argument('--output', default=EXPORT_DIR, help='输出目录')
+    parser.add_argument('--ack', action='store_true', help='确认上次导出的变更分片已全部导入')
+    args = parser.parse_args()
+
+    if args.ack:
+        confirmed = acknowledge(args.output)
+        if confirmed is None:
+            print("没有待确认的导出")
+        else:
+            print(f"已确认导入, 云端现有 {confirmed} 条")
+        return
+
+    manifest = export(output_dir=args.output, batch_size=args.batch)
+    errors = [p for p in manifest['problems'] if p['level'] == 'error']
+    warnings = [p for p in manifest['problems'] if p['level'] == 'warning']
+
+    print(f"导出 {manifest['total']} 条, {len(manifest['chunks'])} 个分片 -> {args.output}")
+    for chunk in manifest['chunks']:
+        print(f"  {chunk['file']}: {chunk['count']} 条, {chunk['bytes'] / 1024:.1f} KB")
+    for problem in errors + warnings[:20]:
+        tag = '错误' if problem['level'] == 'error' else '警告'
+        print(f"  [{tag}] 第 {problem['line']} 行 {problem['name']}: {problem['message']}")
+    if len(warnings) > 20:
+        print(f"  ... 另有 {len(warnings) - 20} 条警告, 见 {MANIFEST_NAME}")
+    print(f"错误 {len(errors)} 条 (未导出), 警告 {len(warnings)} 条")
+
+    changes = manifest['changes']
+    print(f"\n相对上次导出: 新增/修改 {changes['upsert']}, 删除 {changes['delete']}, 未变 {changes['unchanged']}")
+    for chunk in changes['chunks']:
+        print(f"  {chunk['file']}: {chunk['count']} 条")
+    if changes['chunks']:
+        print("用 fish-delta-import 应用以上分片后运行: python export_species.py --ack")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Commons API 本地替身 - 离线检查 download_wiki_images 的搜索与批量 imageinfo 查询
+
+FakeCommons 在本机启动 HTTP 服务, 按真实 API 的方式应答:
+  list=search      返回 files 中标题包含搜索词的文件 (最多 srlimit 个)
+  prop=imageinfo   titles 用 | 分隔, 超过 50 个时返回 toomanyvalues 错误;
+                   含下划线的标题在 normalized 中给出 from -> to,
+                   不存在的文件作为 missing 页返回 (负数 id, 没有 imageinfo)
+每次 imageinfo 请求的标题列表记在 queries 中, 便于核对分批情况。
+
+用法:
+    with FakeCommons({'File:Betta splendens.jpg': 'https://.../Betta.jpg'}) as fake:
+        download_wiki_images.COMMONS_API = fake.url
+    python fake_commons.py     # 检查 get_image_urls 的分批、标题映射与缺失页
+"""
+
+import sys
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+# 真实 API 对普通用户的 titles 上限
+MAX_TITLES = 50
+
+class FakeCommons:
+    """files 为 {规范标题: 图片URL}"""
+
+    def __init__(self, files):
+        self.files = dict(files)
+        self.queries = []
+        self.searches = []
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/w/api.php"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def search(self, params):
+        term = params['srsearch'][0].lower()
+        limit = int(params.get('srlimit', ['10'])[0])
+        with self.lock:
+            self.searches.append(term)
+        hits = [{'ns': 6, 'title': title} for title in self.files if term in title.lower()]
+        return {'query': {'search': hits[:limit]}}
+
+    def imageinfo(self, params):
+        titles = params['titles'][0].split('|')
+        with self.lock:
+            self.queries.append(titles)
+        if len(titles) > MAX_TITLES:
+            return {'error': {'code': 'toomanyvalues',
+                              'info': f'Too many values supplied for parameter "titles". The limit is {MAX_TITLES}.'}}
+        normalized = []
+        pages = {}
+        for i, title in enumerate(titles):
+            canonical = title.replace('_', ' ')
+            if canonical != title:
+                normalized.append({'from': title, 'to': canonical})
+            if canonical in self.files:
+                pages[str(1000 + i)] = {'pageid': 1000 + i, 'ns': 6, 'title': canonical,
+                                        'imageinfo': [{'url': self.files[canonical]}]}
+            else:
+                pages[str(-1 - i)] = {'ns': 6, 'title': canonical, 'missing': ''}
+        query = {'pages': pages}
+        if normalized:
+            query['normalized'] = normalized
+        return {'batchcomplete': '', 'query': query}
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                params = parse_qs(urlsplit(self.path).query)
+                if params.get('list') == ['search']:
+                    data = fake.search(params)
+                elif params.get('prop') == ['imageinfo']:
+                    data = fake.imageinfo(params)
+                else:
+                    data = {'error': {'code': 'badvalue', 'info': 'unsupported request'}}
+                body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+# ============ 离线检查 ============
+
+def check():
+    """用替身服务检查 download_wiki_images 的批量查询, 返回失败项列表"""
+    import download_wiki_images as wiki
+
+    files = {f"File:Fish {i}.jpg": f"https://upload.example/fish_{i}.jpg" for i in range(120)}
+    failures = []
+
+    def expect(label, ok):
+        print(f"  [{'通过' if ok else '失败'}] {label}")
+        if not ok:
+            failures.append(label)
+
+    with FakeCommons(files) as fake:
+        wiki.COMMONS_API = fake.url
+
+        # 120 个标题 + 重复标题 + 下划线写法 + 不存在的文件
+        titles = list(files) + ['File:Fish 0.jpg', 'File:Fish_7.jpg', 'File:Missing 1.jpg', 'File:Missing_2.jpg']
+        urls = wiki.get_image_urls(titles)
+        sizes = [len(query) for query in fake.queries]
+        expect(f"124 个标题 (去重后 123) 分 3 批查询: {sizes}", sizes == [50, 50, 23])
+        expect("每个存在的标题都取得 URL", all(urls.get(title) == url for title, url in files.items()))
+        expect("下划线标题按原写法映射回 URL", urls.get('File:Fish_7.jpg') == files['File:Fish 7.jpg'])
+        expect("不存在的文件不出现在结果中", 'File:Missing 1.jpg' not in urls and 'File:Missing_2.jpg' not in urls)
+
+        fake.queries.clear()
+        urls = wiki.get_image_urls(list(files)[:20], chunk_size=7)
+        sizes = [len(query) for query in fake.queries]
+        expect(f"chunk_size=7 时 20 个标题分批: {sizes}", sizes == [7, 7, 6] and len(urls) == 20)
+
+        fake.queries.clear()
+        urls = wiki.get_image_urls(['File:Fish 3.jpg', 'File:Fish_3.jpg'])
+        expect("同一批中两种写法都取得 URL", urls.get('File:Fish 3.jpg') == urls.get('File:Fish_3.jpg') == files['File:Fish 3.jpg'])
+
+        fake.queries.clear()
+        expect("空标题列表不发请求", wiki.get_image_urls([None, '']) == {} and not fake.queries)
+
+        expect("搜索返回第一个图片文件", wiki.search_wikimedia('Fish 12') == 'File:Fish 12.jpg')
+    return failures
+
+def main():
+    print("Commons 替身服务检查 download_wiki_images:")
+    failures = check()
+    print(f"\n{'全部通过' if not failures else f'{len(failures)} 项失败'}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
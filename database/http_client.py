@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享HTTP客户端 - 按主机维护 keep-alive 连接池
+
+各下载脚本原先每次请求都 urlopen 一次, 每次都要重新握手 TCP+TLS。
+HttpClient 对同一主机复用已建立的连接, 并统计连接复用情况。
+
+用法:
+    client = HttpClient(headers=HEADERS)
+    with client.get(url, timeout=15) as response:
+        data = response.read()
+    print(client.format_stats())
+
+retry=RetryPolicy() 时 429/5xx 与网络错误自动退避重试; get(hedge_after=秒) 为慢主机发对冲请求 (见 resilience.py)。
+"""
+
+import io
+import os
+import ssl
+import time
+import socket
+import threading
+import tempfile
+import http.client
+from urllib.parse import urlsplit, urljoin
+from urllib.error import HTTPError, URLError
+
+import run_report
+from resilience import hedged
+
+# 每个主机保留的空闲连接数
+POOL_SIZE = 4
+
+# 最多跟随的重定向次数
+MAX_REDIRECTS = 5
+
+# 与原脚本一致: 不校验证书
+ctx = ssl.create_default_context()
+ctx.check_hostname = False
+ctx.verify_mode = ssl.CERT_NONE
+
+# 流式下载: 每次读取的块大小与单张图片的大小上限
+CHUNK_SIZE = 64 * 1024
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+
+# 图片文件头
+IMAGE_MAGIC = {
+    b'\xff\xd8\xff': 'jpeg',
+    b'\x89PNG\r\n\x1a\n': 'png',
+}
+
+# 复用的连接可能已被服务端关闭, 这些错误时换新连接重试一次
+STALE_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine,
+                ConnectionResetError, BrokenPipeError)
+
+class TokenBucket:
+    """令牌桶限速器 (线程安全)"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """取一个令牌, 不足时阻塞等待"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class HostRateLimiter:
+    """按主机分别限速, 替代固定的 time.sleep"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def wait(self, url):
+        host = urlsplit(url).netloc
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = self.buckets[host] = TokenBucket(self.rate, self.capacity)
+        bucket.acquire()
+
+class HostConcurrencyLimiter:
+    """按主机限制同时进行的请求数; 名额从发出请求起占用, 到响应读完或关闭为止"""
+
+    def __init__(self, per_host):
+        self.per_host = per_host
+        self.slots = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, url):
+        """阻塞到有空闲名额, 返回释放函数 (只生效一次)"""
+        host = urlsplit(url).netloc
+        with self.lock:
+            slot = self.slots.get(host)
+            if slot is None:
+                slot = self.slots[host] = threading.BoundedSemaphore(self.per_host)
+        if not slot.acquire(blocking=False):
+            with run_report.span('http.queue', host=host):
+                slot.acquire()
+        released = []
+
+        def release():
+            if not released:
+                released.append(True)
+                slot.release()
+        return release
+
+class DownloadError(Exception):
+    """下载内容不合格 (非图片 / 过大 / 过小)"""
+
+def sniff_image_type(head):
+    """根据文件头判断图片格式, 不是 JPEG/PNG 时返回 None"""
+    for magic, kind in IMAGE_MAGIC.items():
+        if head.startswith(magic):
+            return kind
+    return None
+
+class Response:
+    """响应包装: 读完或关闭后把连接归还连接池"""
+
+    def __init__(self, client, key, conn, resp, url):
+        self.client = client
+        self.key = key
+        self.conn = conn
+        self.resp = resp
+        self.url = url
+        self.status = resp.status
+        self.reason = resp.reason
+        self.headers = resp.headers
+        self.released = False
+        self.on_close = None
+
+    def read(self, amt=None):
+        data = self.resp.read() if amt is None else self.resp.read(amt)
+        if self.resp.isclosed():
+            self._release()
+        return data
+
+    def getheader(self, name, default=None):
+        return self.resp.getheader(name, default)
+
+    def _release(self):
+        if not self.released:
+            self.released = True
+            self.client._release(self.key, self.conn)
+            self._finish()
+
+    def _finish(self):
+        if self.on_close:
+            on_close, self.on_close = self.on_close, None
+            on_close()
+
+    def close(self):
+        """未读完的响应无法复用连接, 直接断开"""
+        if self.released:
+            return
+        if not self.resp.isclosed():
+            self.released = True
+            self.conn.close()
+            self._finish()
+            return
+        self._release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class HttpClient:
+    """带连接池的HTTP客户端 (线程安全, 仅支持GET)"""
+
+    def __init__(self, headers=None, pool_size=POOL_SIZE, context=ctx, rate_limiter=None, host_limiter=None,
+                 retry=None):
+        self.headers = dict(headers or {})
+        self.pool_size = pool_size
+        self.context = context
+        self.rate_limiter = rate_limiter
+        self.host_limiter = host_limiter
+        self.retry = retry
+        self.pools = {}
+        self.lock = threading.Lock()
+        self.counters = {}
+
+    def _count(self, host, name):
+        with self.lock:
+            counters = self.counters.setdefault(host, {'requests': 0, 'opened': 0, 'reused': 0})
+            counters[name] += 1
+
+    def _acquire(self, key):
+        with self.lock:
+            pool = self.pools.get(key)
+            if pool:
+                return pool.pop()
+        scheme, host, port = key
+        if scheme == 'https':
+            return http.client.HTTPSConnection(host, port, context=self.context)
+        return http.client.HTTPConnection(host, port)
+
+    def _connect(self, conn, host):
+        """剖析时代替 conn.connect(): 分别计时 DNS / TCP / TLS"""
+        start = time.perf_counter()
+        family, socktype, proto, _, address = socket.getaddrinfo(conn.host, conn.port, 0, socket.SOCK_STREAM)[0]
+        resolved = time.perf_counter()
+        sock = socket.socket(family, socktype, proto)
+        try:
+            sock.settimeout(conn.timeout)
+            sock.connect(address)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            connected = time.perf_counter()
+            if isinstance(conn, http.client.HTTPSConnection):
+                sock = conn._context.wrap_socket(sock, server_hostname=conn.host)
+                run_report.record('http.tls', connected, time.perf_counter() - connected, host=host)
+        except BaseException:
+            sock.close()
+            raise
+        run_report.record('http.dns', start, resolved - start, host=host)
+        run_report.record('http.tcp', resolved, connected - resolved, host=host)
+        conn.sock = sock
+
+    def _release(self, key, conn):
+        # 服务端要求关闭 (Connection: close) 时 sock 已被置空, 不再放回
+        if conn.sock is None:
+            conn.close()
+            return
+        with self.lock:
+            pool = self.pools.setdefault(key, [])
+            if len(pool) < self.pool_size:
+                pool.append(conn)
+                return
+        conn.close()
+
+    def _request(self, url, headers, timeout):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise URLError(f"unsupported scheme: {parts.scheme}")
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        key = (parts.scheme, parts.hostname, port)
+        path = parts.path or '/'
+        if parts.query:
+            path = f"{path}?{parts.query}"
+
+        request_headers = dict(self.headers)
+        request_headers.update(headers or {})
+
+        for attempt in range(2):
+            conn = self._acquire(key)
+            reused = conn.sock is not None
+            conn.timeout = timeout
+            if reused:
+                conn.sock.settimeout(timeout)
+            try:
+                if not reused and run_report.enabled():
+                    self._connect(conn, parts.netloc)
+                with run_report.span('http.ttfb', host=parts.netloc, reused=reused):
+                    conn.request('GET', path, headers=request_headers)
+                    resp = conn.getresponse()
+            except STALE_ERRORS:
+                conn.close()
+                if reused and attempt == 0:
+                    run_report.count('http.stale_retry')
+                    continue
+                raise
+            except Exception:
+                conn.close()
+                raise
+            self._count(parts.netloc, 'requests')
+            self._count(parts.netloc, 'reused' if reused else 'opened')
+            return Response(self, key, conn, resp, url)
+
+    def get(self, url, headers=None, timeout=15, hedge_after=None, budget=None):
+        """GET请求, 自动跟随重定向; 4xx/5xx 与 urlopen 一样抛出 HTTPError
+
+        设置了 retry 时按重试策略重试, budget (resilience.Budget) 限制重试等待的总时长并可取消;
+        hedge_after 秒内没有响应时再发一份, 取先返回者。
+        """
+        if hedge_after is not None:
+            return hedged(lambda: self._get_with_retry(url, headers, timeout, budget), hedge_after,
+                          discard=lambda response: response.close())
+        return self._get_with_retry(url, headers, timeout, budget)
+
+    def _get_with_retry(self, url, headers, timeout, budget=None):
+        if self.retry is None:
+            return self._get(url, headers, timeout)
+        return self.retry.call(self._get, url, headers, timeout, budget=budget)
+
+    def _get(self, url, headers, timeout):
+        for _ in range(MAX_REDIRECTS + 1):
+            release = self.host_limiter.acquire(url) if self.host_limiter else None
+            if self.rate_limiter:
+                self.rate_limiter.wait(url)
+            try:
+                response = self._request(url, headers, timeout)
+            except BaseException:
+                if release:
+                    release()
+                raise
+            response.on_close = release
+
+            location = response.getheader('Location')
+            if response.status in (301, 302, 303, 307, 308) and location:
+                response.read()
+                url = urljoin(url, location)
+                continue
+
+            if response.status >= 400:
+                body = response.read()
+                raise HTTPError(url, response.status, response.reason, response.headers, io.BytesIO(body))
+            return response
+
+        raise URLError(f"too many redirects: {url}")
+
+    def download(self, url, filepath, min_bytes=3000, max_bytes=MAX_IMAGE_BYTES, timeout=30, budget=None):
+        """流式下载图片到 filepath, 返回 (格式, 字节数)
+
+        分块写入同目录的临时文件, 成功后原子重命名; 首块校验文件头,
+        遇到 HTML 错误页、Content-Length 过小或超过 max_bytes 时提前中止,
+        失败时不会留下残缺文件。
+        """
+        with run_report.span('http.download', host=urlsplit(url).netloc) as span, \
+                self.get(url, timeout=timeout, budget=budget) as response:
+            content_type = (response.getheader('Content-Type') or '').lower()
+            if 'text/html' in content_type:
+                raise DownloadError(f"返回的是网页而非图片: {content_type}")
+
+            length = response.getheader('Content-Length')
+            if length and length.isdigit():
+                if int(length) < min_bytes:
+                    raise DownloadError(f"文件过小: {length} 字节")
+                if int(length) > max_bytes:
+                    raise DownloadError(f"文件过大: {length} 字节")
+
+            directory = os.path.dirname(filepath) or '.'
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.download_', suffix='.part')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    kind = None
+                    total = 0
+                    while True:
+                        chunk = response.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        if kind is None:
+                            kind = sniff_image_type(chunk)
+                            if kind is None:
+                                raise DownloadError(f"不是 JPEG/PNG 图片: {chunk[:16]!r}")
+                        total += len(chunk)
+                        if total > max_bytes:
+                            raise DownloadError(f"文件过大: 超过 {max_bytes} 字节")
+                        f.write(chunk)
+
+                if total < min_bytes:
+                    raise DownloadError(f"文件过小: {total} 字节")
+                os.replace(tmp_path, filepath)
+                span.set(bytes=total)
+                return kind, total
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+
+    def stats(self):
+        """各主机的请求数 / 新建连接数 / 复用连接数"""
+        with self.lock:
+            return {host: dict(counters) for host, counters in self.counters.items()}
+
+    def format_stats(self):
+        lines = []
+        for host, counters in sorted(self.stats().items()):
+            lines.append(f"  {host}: 请求 {counters['requests']}, "
+                         f"新建连接 {counters['opened']}, 复用 {counters['reused']}")
+        return "\n".join(lines)
+
+    def close(self):
+        with self.lock:
+            pools, self.pools = self.pools, {}
+        for pool in pools.values():
+            for conn in pool:
+                conn.close()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片质量审核 - 感知哈希 / 尺寸 / 清晰度 / 对比度 / 近似重复
+
+对 images/ 中每张图片 (含内容寻址库中登记的图片) 多进程计算:
+  - dHash 64 位感知哈希, 汉明距离 <= DUPLICATE_DISTANCE 视为近似重复
+  - 宽高, 清晰度 (边缘图方差), 对比度 (灰度标准差), 颜色数 (判断是否为 logo/图标)
+结果按文件内容 SHA-256 缓存到 image_audit_cache.json, 内容不变时不再计算。
+
+报告 image_audit_report.json:
+  images    每张图片的指标与问题
+  clusters  近似重复的图片组 (不同品种用了同一张照片时需要人工处理)
+  rejected  应拒绝上传的图片: 无法解码、尺寸过小、疑似 logo/图标
+清晰度、对比度偏低以及近似重复只标记, 不自动拒绝。
+
+依赖: pip install Pillow
+
+用法:
+    python image_audit.py
+    python image_audit.py --workers 8
+"""
+
+import os
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image, ImageFilter, ImageOps, ImageStat
+except ImportError:
+    Image = None
+
+from image_store import ImageStore, file_sha256, write_json_atomic
+from image_normalize import collect_sources
+
+BASE_DIR = "/Users/wanshuiwanqigaozhishang/Downloads/MINIAPP"
+DATABASE_DIR = f"{BASE_DIR}/database"
+IMAGES_DIR = f"{BASE_DIR}/images"
+CACHE_FILE = f"{DATABASE_DIR}/image_audit_cache.json"
+REPORT_FILE = f"{DATABASE_DIR}/image_audit_report.json"
+
+# 判定阈值
+MIN_EDGE = 200
+BLUR_MIN = 100.0
+CONTRAST_MIN = 25.0
+LOGO_MAX_COLORS = 64
+DUPLICATE_DISTANCE = 6
+
+# 指标算法有变化时改版本号, 旧缓存自动失效
+METRICS_VERSION = 1
+
+def dhash(gray):
+    """差值哈希: 缩到 9x8, 每行相邻像素比较得到 64 位"""
+    small = gray.resize((9, 8), Image.LANCZOS)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return f"{bits:016x}"
+
+def measure(path):
+    """单张图片的指标; 子进程中执行"""
+    with Image.open(path) as img:
+        img = ImageOps.exif_transpose(img)
+        width, height = img.size
+        rgb = img.convert('RGB')
+    # 统一缩到长边 256 再计算, 指标不受原图分辨率影响
+    work = rgb.copy()
+    work.thumbnail((256, 256), Image.LANCZOS)
+    gray = work.convert('L')
+    edges = gray.filter(ImageFilter.FIND_EDGES)
+    colors = work.getcolors(maxcolors=LOGO_MAX_COLORS * 4)
+    return {
+        'version': METRICS_VERSION,
+        'width': width,
+        'height': height,
+        'dhash': dhash(gray),
+        'blur': round(ImageStat.Stat(edges).var[0], 1),
+        'contrast': round(ImageStat.Stat(gray).stddev[0], 1),
+        'colors': len(colors) if colors else LOGO_MAX_COLORS * 4 + 1,
+    }
+
+def analyze_one(task):
+    """task 为 (内容哈希, 路径), 返回 (内容哈希, 指标, 错误)"""
+    digest, path = task
+    try:
+        return digest, measure(path), None
+    except Exception as e:
+        return digest, None, str(e)
+
+def problems_of(metrics):
+    """返回 (拒绝原因列表, 提示列表)"""
+    if metrics is None or 'error' in metrics:
+        return [f"无法解码: {metrics.get('error') if metrics else '未知错误'}"], []
+    reject, warn = [], []
+    if min(metrics['width'], metrics['height']) < MIN_EDGE:
+        reject.append(f"尺寸过小 {metrics['width']}x{metrics['height']}")
+    if metrics['colors'] <= LOGO_MAX_COLORS:
+        reject.append(f"颜色仅 {metrics['colors']} 种, 疑似 logo/图标")
+    if metrics['blur'] < BLUR_MIN:
+        warn.append(f"清晰度低 ({metrics['blur']})")
+    if metrics['contrast'] < CONTRAST_MIN:
+        warn.append(f"对比度低 ({metrics['contrast']})")
+    return reject, warn
+
+def hamming(a, b):
+    return bin(int(a, 16) ^ int(b, 16)).count('1')
+
+def duplicate_clusters(hashes, distance=DUPLICATE_DISTANCE):
+    """hashes 为 {文件名: dhash}; 返回近似重复的文件名分组
+
+    64 位分成 distance + 1 段, 距离不超过 distance 的两个哈希至少有一段完全相同,
+    只在同段相同的图片之间比较汉明距离。
+    """
+    names = sorted(hashes)
+    bands = distance + 1
+    width = 64 // bands
+    buckets = {}
+    for name in names:
+        bits = int(hashes[name], 16)
+        for band in range(bands):
+            shift = band * width
+            size = width if band < bands - 1 else 64 - shift
+            key = (band, (bits >> shift) & ((1 << size) - 1))
+            buckets.setdefault(key, []).append(name)
+
+    parent = {name: name for name in names}
+
+    def find(name):
+        while parent[name] != name:
+            parent[name] = parent[parent[name]]
+            name = parent[name]
+        return name
+
+    checked = set()
+    for members in buckets.values():
+        for i, a in enumerate(members):
+            for b in members[i + 1:]:
+                if (a, b) in checked:
+                    continue
+                checked.add((a, b))
+                if hamming(hashes[a], hashes[b]) <= distance:
+                    parent[find(b)] = find(a)
+
+    groups = {}
+    for name in names:
+        groups.setdefault(find(name), []).append(name)
+    return [members for members in groups.values() if len(members) > 1]
+
+def audit(sources, cache, workers=None):
+    """sources 为 {文件名: 路径}, 原地更新 cache; 返回 (报告, 新计算数)"""
+    digests = {name: file_sha256(path) for name, path in sources.items()}
+    todo = {}
+    for name, digest in digests.items():
+        cached = cache.get(digest)
+        if digest not in todo and (cached is None or cached.get('version') != METRICS_VERSION):
+            todo[digest] = sources[name]
+
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for digest, metrics, error in executor.map(analyze_one, todo.items(), chunksize=4):
+                cache[digest] = metrics if metrics else {'version': METRICS_VERSION, 'error': error}
+
+    images = {}
+    rejected = []
+    for name, digest in sorted(digests.items()):
+        metrics = cache[digest]
+        reject, warn = problems_of(metrics)
+        images[name] = dict(metrics, sha256=digest, reject=reject, warnings=warn)
+        if reject:
+            rejected.append(name)
+
+    # 内容完全相同 (多个品种共用一张图) 与画面相近的图片都会归入同一组
+    hashes = {name: info['dhash'] for name, info in images.items()
+              if 'dhash' in info and name not in rejected}
+    clusters = duplicate_clusters(hashes)
+    for members in clusters:
+        for name in members:
+            others = [m for m in members if m != name]
+            images[name]['warnings'].append(f"与 {', '.join(others)} 近似重复")
+
+    report = {'images': images, 'clusters': clusters, 'rejected': rejected}
+    return report, len(todo)
+
+def load_rejected(report_file=REPORT_FILE):
+    """上传等后续步骤使用: 审核报告中被拒绝的文件名集合 (未审核时为空)"""
+    if not os.path.exists(report_file):
+        return set()
+    with open(report_file, 'r', encoding='utf-8') as f:
+        return set(json.load(f).get('rejected', []))
+
+def main():
+    parser = argparse.ArgumentParser(description='Audit fish image quality and near-duplicates')
+    parser.add_argument('--workers', type=int, default=None, help='进程数 (默认CPU核数)')
+    args = parser.parse_args()
+
+    if Image is None:
+        print("请先安装 Pillow: pip install Pillow")
+        return
+
+    cache = {}
+    if os.path.exists(CACHE_FILE):
+        with open(CACHE_FILE, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+
+    sources = collect_sources(IMAGES_DIR, ImageStore(IMAGES_DIR))
+    sources = {name: path for name, path in sources.items() if not name.startswith('placeholder_')}
+    print(f"图片 {len(sources)} 张")
+
+    report, computed = audit(sources, cache, workers=args.workers)
+    write_json_atomic(CACHE_FILE, cache)
+    write_json_atomic(REPORT_FILE, report)
+
+    print(f"新计算 {computed} 张, 其余来自缓存")
+    for name in report['rejected']:
+        print(f"  [拒绝] {name}: {'; '.join(report['images'][name]['reject'])}")
+    for members in report['clusters']:
+        print(f"  [近似重复] {', '.join(members)}")
+    flagged = sum(1 for info in report['images'].values() if info['warnings'])
+    print(f"\n拒绝 {len(report['rejected'])}, 需人工查看 {flagged}, 近似重复组 {len(report['clusters'])}")
+    print(f"报告: {REPORT_FILE}")
+
+if __name__ == '__main__':
+    main()
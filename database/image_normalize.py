@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片规格化 - 为小程序生成限定尺寸的主图与列表缩略图
+
+对 images/ 中每张原图 (含内容寻址库中登记的图片):
+  - 主图: 长边不超过 MAIN_MAX_EDGE, 重新压缩为 JPEG
+  - 缩略图: 长边不超过 THUMB_MAX_EDGE, 用于列表页
+  - 可选 WebP 版本 (--webp)
+重新编码时不写入 EXIF (同时按 EXIF 方向先摆正图片)。
+多进程并行处理, 输出已是最新的图片会跳过。
+输出文件名保留原图扩展名 (a.png -> a.png.jpg), 同名不同格式的原图不会互相覆盖。
+结果 (尺寸/字节数) 记录在 image_variants.json, 键为原图文件名;
+upload_planner 与 scripts/upload-images.js 优先上传其中的主图。
+
+依赖: pip install Pillow
+
+用法:
+    python image_normalize.py
+    python image_normalize.py --webp --workers 8
+"""
+
+import os
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+from image_store import ImageStore, write_json_atomic
+
+BASE_DIR = "/Users/wanshuiwanqigaozhishang/Downloads/MINIAPP"
+DATABASE_DIR = f"{BASE_DIR}/database"
+IMAGES_DIR = f"{BASE_DIR}/images"
+OUTPUT_DIR = f"{IMAGES_DIR}/normalized"
+VARIANTS_FILE = f"{DATABASE_DIR}/image_variants.json"
+
+# 输出规格
+MAIN_MAX_EDGE = 800
+MAIN_QUALITY = 82
+THUMB_MAX_EDGE = 240
+THUMB_QUALITY = 75
+WEBP_QUALITY = 80
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+def _save(img, path, max_edge, fmt, quality):
+    """缩放并保存, 返回 {'path', 'width', 'height', 'bytes'}"""
+    out = img.copy()
+    out.thumbnail((max_edge, max_edge), Image.LANCZOS)
+    tmp_path = path + '.part'
+    if fmt == 'JPEG':
+        out.save(tmp_path, 'JPEG', quality=quality, optimize=True, progressive=True)
+    else:
+        out.save(tmp_path, fmt, quality=quality, method=6)
+    os.replace(tmp_path, path)
+    return {'path': path, 'width': out.width, 'height': out.height, 'bytes': os.path.getsize(path)}
+
+def output_paths(name, output_dir):
+    """原图文件名 -> 主图 / 缩略图 / WebP 路径; 保留原扩展名, a.jpg 与 a.png 各有各的输出"""
+    return {'main': os.path.join(output_dir, f"{name}.jpg"),
+            'thumb': os.path.join(output_dir, 'thumbs', f"{name}_thumb.jpg"),
+            'webp': os.path.join(output_dir, 'webp', f"{name}.webp")}
+
+def main_variant(variants, name, src_path=None):
+    """name 的主图路径; 没有记录、输出已不存在或比原图旧时返回 None (调用方改用原图)"""
+    record = variants.get(name)
+    if not record:
+        return None
+    path = record['main']['path']
+    if not os.path.exists(path):
+        return None
+    if src_path and os.path.getmtime(path) < os.path.getmtime(src_path):
+        return None
+    return path
+
+def normalize_one(task):
+    """子进程中处理单张图片: task 为 (文件名, 原图路径, 输出目录, 是否生成WebP)"""
+    name, src_path, output_dir, webp = task
+    paths = output_paths(name, output_dir)
+    main_path, thumb_path, webp_path = paths['main'], paths['thumb'], paths['webp']
+
+    try:
+        with Image.open(src_path) as img:
+            # 按 EXIF 方向摆正后丢弃 EXIF
+            img = ImageOps.exif_transpose(img)
+            if img.mode not in ('RGB', 'L'):
+                background = Image.new('RGB', img.size, (255, 255, 255))
+                background.paste(img, mask=img.convert('RGBA').split()[-1])
+                img = background
+            elif img.mode == 'L':
+                img = img.convert('RGB')
+
+            record = {
+                'source': {'width': img.width, 'height': img.height, 'bytes': os.path.getsize(src_path)},
+                'main': _save(img, main_path, MAIN_MAX_EDGE, 'JPEG', MAIN_QUALITY),
+                'thumb': _save(img, thumb_path, THUMB_MAX_EDGE, 'JPEG', THUMB_QUALITY),
+            }
+            if webp:
+                record['webp'] = _save(img, webp_path, MAIN_MAX_EDGE, 'WEBP', WEBP_QUALITY)
+        return name, record, None
+    except Exception as e:
+        return name, None, str(e)
+
+def collect_sources(images_dir=IMAGES_DIR, store=None):
+    """原图列表 {文件名: 路径}: images/ 顶层图片 + 内容寻址库中登记的图片"""
+    sources = {}
+    for filename in sorted(os.listdir(images_dir)):
+        path = os.path.join(images_dir, filename)
+        if os.path.isfile(path) and filename.lower().endswith(IMAGE_EXTENSIONS):
+            sources[filename] = path
+    if store is not None:
+        for name in sorted(store.names):
+            path = store.resolve(name)
+            if path:
+                sources[name] = path
+    return sources
+
+def is_fresh(record, src_path, webp, paths):
+    """已有输出 (且是按当前命名规则生成的) 并比原图新时跳过"""
+    if not record:
+        return False
+    if webp and 'webp' not in record:
+        return False
+    outputs = [record['main'], record['thumb']] + ([record['webp']] if webp else [])
+    if any(o['path'] != paths[kind] for kind, o in zip(('main', 'thumb', 'webp'), outputs)):
+        return False
+    src_mtime = os.path.getmtime(src_path)
+    return all(os.path.exists(o['path']) and os.path.getmtime(o['path']) >= src_mtime for o in outputs)
+
+def normalize_all(sources, variants, output_dir=OUTPUT_DIR, webp=False, workers=None, force=False):
+    """并行规格化, 原地更新 variants, 返回 (处理数, 跳过数, 错误列表)"""
+    os.makedirs(os.path.join(output_dir, 'thumbs'), exist_ok=True)
+    if webp:
+        os.makedirs(os.path.join(output_dir, 'webp'), exist_ok=True)
+
+    tasks = [
+        (name, path, output_dir, webp)
+        for name, path in sources.items()
+        if force or not is_fresh(variants.get(name), path, webp, output_paths(name, output_dir))
+    ]
+    skipped = len(sources) - len(tasks)
+    errors = []
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for name, record, error in executor.map(normalize_one, tasks, chunksize=4):
+            if error:
+                errors.append(f"{name}: {error}")
+            else:
+                variants[name] = record
+    return len(tasks) - len(errors), skipped, errors
+
+def main():
+    parser = argparse.ArgumentParser(description='Normalize fish images for the mini program')
+    parser.add_argument('--webp', action='store_true', help='同时生成 WebP')
+    parser.add_argument('--workers', type=int, default=None, help='进程数 (默认CPU核数)')
+    parser.add_argument('--force', action='store_true', help='忽略已有输出, 全部重新生成')
+    args = parser.parse_args()
+
+    if Image is None:
+        print("请先安装 Pillow: pip install Pillow")
+        return
+
+    variants = {}
+    if os.path.exists(VARIANTS_FILE):
+        with open(VARIANTS_FILE, 'r', encoding='utf-8') as f:
+            variants = json.load(f)
+
+    sources = collect_sources(IMAGES_DIR, ImageStore(IMAGES_DIR))
+    print(f"原图 {len(sources)} 张, 输出目录: {OUTPUT_DIR}")
+
+    done, skipped, errors = normalize_all(sources, variants, webp=args.webp,
+                                          workers=args.workers, force=args.force)
+    for error in errors:
+        print(f"  [失败] {error}")
+
+    write_json_atomic(VARIANTS_FILE, dict(sorted(variants.items())))
+
+    src_bytes = sum(v['source']['bytes'] for v in variants.values())
+    main_bytes = sum(v['main']['bytes'] for v in variants.values())
+    thumb_bytes = sum(v['thumb']['bytes'] for v in variants.values())
+    print(f"\n完成! 处理 {done}, 跳过 {skipped}, 失败 {len(errors)}")
+    if src_bytes:
+        print(f"原图 {src_bytes / 1024 / 1024:.1f} MB -> 主图 {main_bytes / 1024 / 1024:.1f} MB "
+              f"({main_bytes / src_bytes:.0%}), 缩略图 {thumb_bytes / 1024 / 1024:.1f} MB")
+    print(f"记录文件: {VARIANTS_FILE}")
+
+if __name__ == '__main__':
+    main()
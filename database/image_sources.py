@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多来源图片解析 - 可插拔的图片来源与回退/竞速策略
+
+每个来源适配器只负责两件事:
+  - search(species): 返回候选图片地址列表
+  - fetch(candidate, tmp_path): 把候选图片写入临时文件
+ImageResolver 按优先级依次尝试 (fallback), 或同时查询所有来源并取最先成功的结果 (race),
+胜出的图片写入 ImageStore, 其余来源的临时文件直接丢弃。
+
+species 为字典: name / search_term / scientific_name / filename
+各来源的接口地址都可替换为本地替身服务, LocalDirSource 则直接从本地目录取图。
+"""
+
+import os
+import re
+import html
+import json
+import time
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import quote
+
+from http_client import sniff_image_type, DownloadError
+from resilience import Budget, CircuitBreaker, is_transient
+import run_report
+
+# Pixabay免费API
+PIXABAY_API = os.environ.get('PIXABAY_API', 'https://pixabay.com/api/')
+PIXABAY_KEY = "46797847-ef8d7c7ce4cceab08a4ff77c2"  # 公开API key
+UNSPLASH_SOURCE = os.environ.get('UNSPLASH_SOURCE', 'https://source.unsplash.com')
+BING_SEARCH = os.environ.get('BING_SEARCH', 'https://www.bing.com/images/search')
+COMMONS_API = os.environ.get('COMMONS_API', 'https://commons.wikimedia.org/w/api.php')
+
+# 必应结果页: m 属性中的 "murl":"原图地址" (也接受 HTML 转义的 &quot; 形式),
+# 其后的 "1024 x 768 · jpeg" 为声明的尺寸与格式。
+# 两个模式都以固定字节开头且不用 IGNORECASE, 正则引擎可以按字面量快速跳过无关内容。
+MURL_PATTERN = re.compile(
+    rb'murl(?:"|&quot;):(?:"|&quot;)(https?://(?:[^"&]|&(?!quot;))+?\.(?:[jJ][pP][eE]?[gG]|[pP][nN][gG]))(?:"|&quot;)')
+SIZE_PATTERN = re.compile(rb' x (\d{2,5}) \xc2\xb7 (\w+)')
+WIDTH_PATTERN = re.compile(rb'(\d{2,5})$')
+
+# 流式扫描: 每次读取的块大小, 以及块之间保留的重叠部分 (地址或尺寸可能跨块)
+SCAN_CHUNK = 16 * 1024
+SCAN_OVERLAP = 2048
+
+# 候选排序: 短边过小的排最后, 面积超过上限的不再加分, 同等条件下 JPEG 优先
+RANK_MIN_EDGE = 200
+RANK_MAX_AREA = 1600 * 1200
+FORMAT_RANK = {'jpg': 0, 'jpeg': 0, 'png': 1}
+
+class MurlScanner:
+    """增量提取必应结果页中的候选图片; feed() 返回 True 表示已够数, 可以停止读取"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.buffer = b''
+        self.found = []
+        self.pending = None  # 尚未找到尺寸说明的最后一个候选
+
+    def feed(self, chunk):
+        buffer = self.buffer + chunk
+        pos = 0
+        for match in MURL_PATTERN.finditer(buffer):
+            self._size_for(buffer[pos:match.start()], complete=True)
+            if len(self.found) >= self.limit:
+                self.pending = None
+                return True
+            url = html.unescape(match.group(1).decode('utf-8', errors='ignore'))
+            self.pending = {'url': url, 'order': len(self.found), 'width': 0, 'height': 0, 'format': ''}
+            self.found.append(self.pending)
+            pos = match.end()
+        self._size_for(buffer[pos:], complete=False)
+        if len(self.found) >= self.limit and self.pending is None:
+            return True
+        self.buffer = buffer[max(pos, len(buffer) - SCAN_OVERLAP):]
+        return False
+
+    def finish(self):
+        """页面读完: 缓冲区末尾的尺寸说明不会再被截断"""
+        self._size_for(self.buffer, complete=True)
+        self.buffer = b''
+
+    def _size_for(self, segment, complete):
+        """complete 为 False 时片段后面还有未读内容, 紧贴末尾的匹配可能是被截断的格式词 (jp|eg), 留到下一块再看"""
+        if self.pending is None:
+            return
+        match = SIZE_PATTERN.search(segment)
+        if match and (complete or match.end() < len(segment)):
+            width = WIDTH_PATTERN.search(segment, max(0, match.start() - 5), match.start())
+            self.pending.update(width=int(width.group(1)) if width else 0, height=int(match.group(1)),
+                                format=match.group(2).decode('ascii').lower())
+            self.pending = None
+
+def scan_bing_page(response, limit, chunk_size=SCAN_CHUNK):
+    """边读边扫描, 找到 limit 个候选 (及最后一个的尺寸) 后即停止; 返回 (候选列表, 已读字节数)"""
+    scanner = MurlScanner(limit)
+    total = 0
+    while True:
+        chunk = response.read(chunk_size)
+        if not chunk:
+            scanner.finish()
+            break
+        total += len(chunk)
+        if scanner.feed(chunk):
+            break
+    return scanner.found, total
+
+def rank_candidates(candidates):
+    """按声明的尺寸与格式排序; 没有尺寸说明的排在尺寸合格者之后"""
+    def key(c):
+        known = c['width'] > 0 and c['height'] > 0
+        small = known and min(c['width'], c['height']) < RANK_MIN_EDGE
+        area = min(c['width'] * c['height'], RANK_MAX_AREA)
+        fmt = c['format'] or c['url'].rsplit('.', 1)[-1].lower()
+        return (small, -area, FORMAT_RANK.get(fmt, 2), c['order'])
+    return sorted(candidates, key=key)
+
+class ImageSource:
+    """来源适配器基类; priority 越小越优先, timeout 为该来源的总耗时上限(秒)
+
+    breaker 为该来源的熔断器 (默认连续失败 3 次熔断); hedge_after 设置后搜索请求在该秒数内
+    未响应时发对冲请求。own_hosts 表示候选图片在来源自己的主机上, 下载失败也计入熔断。
+    """
+
+    name = 'base'
+    own_hosts = True
+
+    def __init__(self, client=None, priority=0, timeout=30, min_bytes=3000, max_candidates=3,
+                 breaker=None, hedge_after=None):
+        self.client = client
+        self.priority = priority
+        self.timeout = timeout
+        self.min_bytes = min_bytes
+        self.max_candidates = max_candidates
+        self.breaker = breaker or CircuitBreaker(self.name)
+        self.hedge_after = hedge_after
+
+    def search(self, species, budget=None):
+        """返回 (或逐个产出) 候选图片地址; budget 为本次解析在该来源上剩余的时间 (resilience.Budget)"""
+        raise NotImplementedError
+
+    def fetch(self, candidate, tmp_path, budget=None):
+        self.client.download(candidate, tmp_path, min_bytes=self.min_bytes, timeout=self.timeout, budget=budget)
+
+class BingSource(ImageSource):
+    """必应图片搜索, 从结果页的 murl 字段提取原图地址
+
+    结果页边下载边扫描, 取到前 scan 个候选即断开连接, 不读整页;
+    再按页面中声明的尺寸/格式排序, 取前 max_candidates 个尝试下载。
+    """
+
+    name = 'bing'
+    own_hosts = False  # 原图分散在各个网站, 个别网站失败不代表必应不可用
+
+    def __init__(self, client=None, terms=("{name} 观赏鱼", "{name} aquarium fish"), scan=10, **kwargs):
+        kwargs.setdefault('min_bytes', 5000)
+        super().__init__(client, **kwargs)
+        self.terms = terms
+        self.scan = scan
+
+    def search(self, species, budget=None):
+        """逐个搜索词产出候选, 前一个词的候选都失败才搜索下一个"""
+        for term in self.terms:
+            url = f"{BING_SEARCH}?q={quote(term.format(**species))}&form=HDRSC2&first=1"
+            try:
+                with self.client.get(url, timeout=min(10, self.timeout), hedge_after=self.hedge_after,
+                                     budget=budget) as response, \
+                        run_report.span('bing.scan') as span:
+                    found, read = scan_bing_page(response, self.scan)
+                    span.set(bytes=read, candidates=len(found))
+            except Exception as e:
+                # 必应本身的故障交给熔断器, 其他错误 (如该词被拦截) 换下一个词
+                if is_transient(e):
+                    raise
+                continue
+            for candidate in rank_candidates(found)[:self.max_candidates]:
+                yield candidate['url']
+
+class PixabaySource(ImageSource):
+    name = 'pixabay'
+
+    def __init__(self, client=None, api_key=PIXABAY_KEY, **kwargs):
+        super().__init__(client, **kwargs)
+        self.api_key = api_key
+
+    def search(self, species, budget=None):
+        url = f"{PIXABAY_API}?key={self.api_key}&q={quote(species['search_term'])}&image_type=photo&per_page=5"
+        with self.client.get(url, timeout=min(15, self.timeout), hedge_after=self.hedge_after,
+                             budget=budget) as response:
+            data = json.loads(response.read().decode('utf-8'))
+        return [hit['webformatURL'] for hit in data.get('hits', []) if hit.get('webformatURL')]
+
+class UnsplashSource(ImageSource):
+    """Unsplash Source (无需API key), 地址本身即图片"""
+
+    name = 'unsplash'
+
+    def __init__(self, client=None, **kwargs):
+        kwargs.setdefault('min_bytes', 5000)
+        super().__init__(client, **kwargs)
+
+    def search(self, species, budget=None):
+        return [f"{UNSPLASH_SOURCE}/400x300/?{quote(species['search_term'])}"]
+
+class WikimediaSource(ImageSource):
+    """Wikimedia Commons (CC协议), 搜索不到时改用学名的属名"""
+
+    name = 'wikimedia'
+
+    def _search_title(self, term, budget=None):
+        url = f"{COMMONS_API}?action=query&list=search&srsearch={quote(term)}&srnamespace=6&format=json&srlimit=5"
+        with self.client.get(url, timeout=min(15, self.timeout), hedge_after=self.hedge_after,
+                             budget=budget) as response:
+            data = json.loads(response.read().decode('utf-8'))
+        for result in data.get('query', {}).get('search', []):
+            title = result.get('title', '')
+            if title.startswith('File:') and any(ext in title.lower() for ext in ['.jpg', '.jpeg', '.png']):
+                return title
+        return None
+
+    def search(self, species, budget=None):
+        title = self._search_title(species['search_term'], budget)
+        if not title and species.get('scientific_name'):
+            title = self._search_title(species['scientific_name'].split()[0].capitalize(), budget)
+        if not title:
+            return []
+        url = f"{COMMONS_API}?action=query&titles={quote(title)}&prop=imageinfo&iiprop=url&format=json"
+        with self.client.get(url, timeout=min(15, self.timeout), hedge_after=self.hedge_after,
+                             budget=budget) as response:
+            data = json.loads(response.read().decode('utf-8'))
+        urls = []
+        for page_data in data.get('query', {}).get('pages', {}).values():
+            imageinfo = page_data.get('imageinfo', [])
+            if imageinfo:
+                urls.append(imageinfo[0].get('url'))
+        return urls
+
+class LocalDirSource(ImageSource):
+    """本地目录 (人工整理的图片或测试替身), 按文件名或学名查找"""
+
+    name = 'local'
+
+    def __init__(self, directory, **kwargs):
+        super().__init__(None, **kwargs)
+        self.directory = directory
+
+    def search(self, species, budget=None):
+        if not os.path.isdir(self.directory):
+            return []
+        names = [species['filename']]
+        if species.get('scientific_name'):
+            genus = species['scientific_name'].split()[0].lower()
+            names += [f for f in sorted(os.listdir(self.directory)) if genus in f.lower()]
+        return [os.path.join(self.directory, n) for n in names
+                if os.path.isfile(os.path.join(self.directory, n))]
+
+    def fetch(self, candidate, tmp_path, budget=None):
+        with open(candidate, 'rb') as f:
+            if sniff_image_type(f.read(16)) is None:
+                raise DownloadError(f"不是 JPEG/PNG 图片: {candidate}")
+        if os.path.getsize(candidate) < self.min_bytes:
+            raise DownloadError(f"文件过小: {candidate}")
+        shutil.copyfile(candidate, tmp_path)
+
+class ImageResolver:
+    """多来源解析器: mode 为 fallback (按优先级依次) 或 race (并发竞速)"""
+
+    def __init__(self, sources, store, mode='fallback'):
+        self.sources = sorted(sources, key=lambda s: s.priority)
+        self.store = store
+        self.mode = mode
+
+    def _new_tmp(self):
+        os.makedirs(self.store.objects_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.store.objects_dir, prefix='.incoming_', suffix='.part')
+        os.close(fd)
+        return tmp_path
+
+    def _try_source(self, source, species, cancel, errors):
+        """在一个来源内依次尝试候选图片, 返回 (来源, 地址, 临时文件) 或 None"""
+        if not source.breaker.allow():
+            errors.append(f"{source.name}: 熔断中, 跳过")
+            return None
+        with run_report.span(f"source.{source.name}", species=species['name']) as span:
+            result = self._try_candidates(source, species, cancel, errors)
+            span.set(found=result is not None)
+        return result
+
+    def _try_candidates(self, source, species, cancel, errors):
+        # search() 可能是生成器 (出错在 next 时) 也可能直接返回列表 (出错在调用时)
+        breaker = source.breaker
+        # 重试等待不超过该来源的 timeout, cancel 置位后不再等待
+        budget = Budget(source.timeout, cancel)
+        try:
+            candidates = iter(source.search(species, budget))
+        except Exception as e:
+            errors.append(f"{source.name}: 搜索失败 {e}")
+            if is_transient(e):
+                breaker.record_failure()
+            return None
+        tried = 0
+        while not cancel.is_set():
+            try:
+                candidate = next(candidates)
+            except StopIteration:
+                break
+            except Exception as e:
+                errors.append(f"{source.name}: 搜索失败 {e}")
+                if is_transient(e):
+                    breaker.record_failure()
+                return None
+            if not source.own_hosts:
+                breaker.record_success()
+            tried += 1
+            # 已下载过的地址直接复用
+            key = self.store.urls.get(candidate)
+            if key and os.path.exists(self.store.object_path(key)):
+                run_report.count('resolver.url_hit')
+                return source, candidate, None
+            tmp_path = self._new_tmp()
+            try:
+                source.fetch(candidate, tmp_path, budget)
+                if source.own_hosts:
+                    breaker.record_success()
+                return source, candidate, tmp_path
+            except Exception as e:
+                os.remove(tmp_path)
+                errors.append(f"{source.name}: {e}")
+                if source.own_hosts and is_transient(e):
+                    breaker.record_failure()
+                    if breaker.state == 'open':
+                        break
+        if cancel.is_set():
+            errors.append(f"{source.name}: 已取消")
+        elif not tried:
+            errors.append(f"{source.name}: 无结果")
+        return None
+
+    def _accept(self, species, result):
+        source, candidate, tmp_path = result
+        if tmp_path is None:
+            path = self.store.fetch(None, candidate, species['filename'])
+        else:
+            path, _ = self.store.add_file(tmp_path, species['filename'], url=candidate)
+        return {'source': source.name, 'url': candidate, 'path': path}
+
+    def resolve(self, species, cancel=None):
+        """返回 (结果, 错误列表); 结果为 {'source', 'url', 'path'}, 全部失败时为 None
+
+        cancel 为外部的 threading.Event (如调用方的截止时间), 置位后不再尝试新的候选;
+        竞速模式由各来源自己的 timeout 约束, 不使用 cancel。
+        """
+        errors = []
+        if self.mode == 'race' and len(self.sources) > 1:
+            result = self._race(species, errors)
+        else:
+            result = None
+            cancel = cancel or threading.Event()
+            for source in self.sources:
+                if cancel.is_set():
+                    break
+                result = self._try_source(source, species, cancel, errors)
+                if result:
+                    break
+        if not result:
+            return None, errors
+        return self._accept(species, result), errors
+
+    def _race(self, species, errors):
+        """同时查询所有来源, 取最先成功者; 同时完成时按优先级, 超时的来源视为失败"""
+        cancel = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=len(self.sources))
+        futures = {executor.submit(self._try_source, s, species, cancel, errors): s for s in self.sources}
+        deadline = max(s.timeout for s in self.sources)
+        winner = None
+        try:
+            pending = set(futures)
+            waited = 0.0
+            while pending and winner is None:
+                # 等到下一个来源完成, 或最早到期的来源超时
+                limits = [futures[f].timeout - waited for f in pending]
+                step = max(0.0, min(limits))
+                start = time.monotonic()
+                done, pending = wait(pending, timeout=step, return_when=FIRST_COMPLETED)
+                waited += time.monotonic() - start
+                finished = sorted((f for f in done if _outcome(f, futures[f], errors)), key=lambda f: futures[f].priority)
+                if finished:
+                    winner = finished[0].result()
+                    for f in finished[1:]:
+                        _discard(f)
+                for f in list(pending):
+                    if waited >= futures[f].timeout or waited >= deadline:
+                        errors.append(f"{futures[f].name}: 超过 {futures[f].timeout}s 未完成")
+                        pending.discard(f)
+                        f.add_done_callback(_discard)
+            for f in pending:
+                f.add_done_callback(_discard)
+        finally:
+            cancel.set()
+            executor.shutdown(wait=False)
+        return winner
+
+def _outcome(future, source, errors):
+    """来源线程的结果; 线程内抛出的异常记为该来源失败, 不让它中断竞速"""
+    try:
+        return future.result()
+    except Exception as e:
+        errors.append(f"{source.name}: {e}")
+        return None
+
+def _discard(future):
+    """丢弃落选来源的临时文件"""
+    result = future.result() if not future.cancelled() and future.exception() is None else None
+    if result and result[2] and os.path.exists(result[2]):
+        os.remove(result[2])
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内容寻址图片库 - 相同内容的图片只存一份
+
+图片按 SHA-256 存放在 images/objects/<前两位>/<哈希>.<扩展名>,
+image_index.json 记录 文件名 -> 对象 和 来源URL -> 对象 两张表:
+  - 不同鱼种下载到相同图片时只保存一份
+  - 来源URL已下载过时直接复用, 不再请求网络
+  - images/<文件名> 是指向对象的硬链接 (不支持时为副本), CSV 的 localImagePath、
+    image_mapping.json 与上传脚本仍按文件名使用, 相同内容在磁盘上只占一份
+
+用法:
+    python image_store.py            # 统计 images/ 中的重复图片
+    python image_store.py --import   # 把 images/ 中的旧图片登记进索引
+    python image_store.py --mapping  # 同内容图片在 image_mapping.json 中共用云端地址
+"""
+
+import os
+import sys
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+
+from http_client import sniff_image_type
+import run_report
+
+BASE_DIR = "/Users/wanshuiwanqigaozhishang/Downloads/MINIAPP"
+DATABASE_DIR = f"{BASE_DIR}/database"
+IMAGES_DIR = f"{BASE_DIR}/images"
+INDEX_FILE = f"{DATABASE_DIR}/image_index.json"
+MAPPING_FILE = f"{DATABASE_DIR}/image_mapping.json"
+
+EXTENSIONS = {'jpeg': '.jpg', 'png': '.png'}
+
+def file_sha256(path, chunk_size=64 * 1024):
+    """分块计算文件哈希"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def write_json_atomic(path, data):
+    """先写临时文件再替换, 避免中断时留下半个JSON"""
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp_', suffix='.json')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+class ImageStore:
+    """内容寻址图片库 (线程安全)"""
+
+    def __init__(self, images_dir=IMAGES_DIR, index_file=INDEX_FILE):
+        self.images_dir = images_dir
+        self.objects_dir = os.path.join(images_dir, 'objects')
+        self.index_file = index_file
+        self.lock = threading.Lock()
+        self.names = {}
+        self.urls = {}
+        if os.path.exists(index_file):
+            with open(index_file, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            self.names = index.get('names', {})
+            self.urls = index.get('urls', {})
+
+    def save(self):
+        with self.lock:
+            index = {'names': dict(sorted(self.names.items())), 'urls': dict(sorted(self.urls.items()))}
+        write_json_atomic(self.index_file, index)
+
+    def object_path(self, key):
+        return os.path.join(self.objects_dir, key[:2], key)
+
+    def name_path(self, name):
+        return os.path.join(self.images_dir, name)
+
+    def _link(self, key, name):
+        """让 images/<文件名> 指向对象 (硬链接, 不支持时复制), 返回该路径"""
+        target = self.object_path(key)
+        path = self.name_path(name)
+        if os.path.exists(path) and os.path.samefile(path, target):
+            return path
+        tmp_path = f"{path}.link"
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        try:
+            os.link(target, tmp_path)
+        except OSError:
+            shutil.copyfile(target, tmp_path)
+        os.replace(tmp_path, path)
+        return path
+
+    def resolve(self, name):
+        """文件名 -> 图片路径: 优先 images/<文件名>, 没有链接时为对象路径, 都不存在时返回 None"""
+        path = self.name_path(name)
+        if os.path.exists(path):
+            return path
+        key = self.names.get(name)
+        if key and os.path.exists(self.object_path(key)):
+            return self.object_path(key)
+        return None
+
+    def has(self, name):
+        return self.resolve(name) is not None
+
+    def digest(self, name):
+        """文件名对应图片的 SHA-256, 未入库时返回 None"""
+        key = self.names.get(name)
+        return key.split('.')[0] if key else None
+
+    def add_file(self, path, name, url=None, move=True, save=True):
+        """登记图片, 返回 (图片路径, 是否新内容)
+
+        move=True 时文件被移动进库 (内容已存在则直接删除) 并链接为 images/<文件名>,
+        否则保留原文件仅登记索引; 批量登记时传 save=False, 结束后调用一次 save()。
+        """
+        with open(path, 'rb') as f:
+            kind = sniff_image_type(f.read(16))
+        key = file_sha256(path) + EXTENSIONS.get(kind, os.path.splitext(name)[1] or '.jpg')
+        target = self.object_path(key)
+
+        with self.lock:
+            is_new = not os.path.exists(target)
+            if move:
+                if is_new:
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    os.replace(path, target)
+                else:
+                    os.remove(path)
+            self.names[name] = key
+            if url:
+                self.urls[url] = key
+            if move:
+                target = self._link(key, name)
+        if save:
+            self.save()
+        return (target if move or not is_new else path), is_new
+
+    def fetch(self, client, url, name, **download_kwargs):
+        """下载图片入库并返回路径; 该URL下载过时直接复用已有对象"""
+        key = self.urls.get(url)
+        if key and os.path.exists(self.object_path(key)):
+            run_report.count('store.url_hit')
+            with self.lock:
+                self.names[name] = key
+                path = self._link(key, name)
+            self.save()
+            return path
+
+        os.makedirs(self.objects_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.objects_dir, prefix='.incoming_', suffix='.part')
+        os.close(fd)
+        try:
+            client.download(url, tmp_path, **download_kwargs)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        path, _ = self.add_file(tmp_path, name, url=url)
+        return path
+
+    def import_existing(self, move=False):
+        """登记 images/ 下尚未入库的图片, 返回 {对象: [文件名, ...]}"""
+        groups = {}
+        for filename in sorted(os.listdir(self.images_dir)):
+            path = os.path.join(self.images_dir, filename)
+            if not os.path.isfile(path) or filename.startswith('.'):
+                continue
+            if filename not in self.names:
+                self.add_file(path, filename, move=move, save=False)
+            groups.setdefault(self.names[filename], []).append(filename)
+        self.save()
+        return groups
+
+    def dedupe_mapping(self, mapping):
+        """同内容的文件名共用已上传的云端地址, 返回补全的条目数"""
+        uploaded = {}
+        for name, cloud_url in mapping.items():
+            key = self.names.get(name)
+            if key and cloud_url:
+                uploaded.setdefault(key, cloud_url)
+
+        filled = 0
+        for name, key in self.names.items():
+            if key in uploaded and mapping.get(name) != uploaded[key]:
+                mapping[name] = uploaded[key]
+                filled += 1
+        return filled
+
+def scan_duplicates(images_dir=IMAGES_DIR):
+    """不改动任何文件, 统计 images/ 中内容重复的图片"""
+    groups = {}
+    for filename in sorted(os.listdir(images_dir)):
+        path = os.path.join(images_dir, filename)
+        if os.path.isfile(path) and not filename.startswith('.'):
+            groups.setdefault(file_sha256(path), []).append(filename)
+    return groups
+
+def wasted_bytes(images_dir, names):
+    """同内容的一组文件中, 除第一份外不是硬链接的副本所占字节数"""
+    inodes = {os.stat(os.path.join(images_dir, name)).st_ino for name in names}
+    return os.path.getsize(os.path.join(images_dir, names[0])) * (len(inodes) - 1)
+
+def main():
+    store = ImageStore()
+
+    if '--import' in sys.argv:
+        groups = store.import_existing(move='--move' in sys.argv)
+        print(f"已登记 {sum(len(v) for v in groups.values())} 个文件, 实际内容 {len(groups)} 份")
+        return
+
+    if '--mapping' in sys.argv:
+        with open(MAPPING_FILE, 'r', encoding='utf-8') as f:
+            mapping = json.load(f)
+        filled = store.dedupe_mapping(mapping)
+        write_json_atomic(MAPPING_FILE, mapping)
+        print(f"image_mapping.json 补全 {filled} 条共用地址")
+        return
+
+    groups = scan_duplicates()
+    total = sum(len(v) for v in groups.values())
+    wasted = 0
+    for digest, names in groups.items():
+        if len(names) > 1:
+            wasted += wasted_bytes(IMAGES_DIR, names)
+            print(f"  {digest[:12]}: {', '.join(names)}")
+    print(f"共 {total} 个文件, 不同内容 {len(groups)} 份, 重复占用 {wasted / 1024 / 1024:.1f} MB")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+水质区间索引 - 按实测水温/pH 查找适合的品种
+
+对 tempMin/tempMax 与 phMin/phMax 各建一份有序端点索引:
+  - 下限升序排列, prefix_low[k] 为下限最小的前 k 个品种的位集
+  - 上限升序排列, prefix_high[k] 为上限最小的前 k 个品种的位集
+温度 t 落在区间内的品种 = prefix_low[下限 <= t 的个数] 去掉 prefix_high[上限 < t 的个数],
+两次二分查找加一次整数位运算, 不再逐行比较。
+温度与 pH 的结果再按位与即可; 读数缺少某项 (null) 时不按该项筛选。
+缺少上下限的品种不会出现在按该项筛选的结果中。
+
+批量查询 (如 water-quality-record 导出的上千条记录) 按二分后的位置去重,
+落在同一组端点之间的读数只计算一次。
+
+用法:
+    python interval_index.py 26 7.0                   # 单个读数
+    python interval_index.py --range 24 28 6.5 7.5    # 与给定区间有重叠的品种
+    python interval_index.py --batch records.json     # 批量: [{"temperature":..,"ph":..}, ...]
+    python interval_index.py --bench                  # 与逐行扫描对比
+"""
+
+import sys
+import csv
+import json
+import math
+import time
+import random
+from bisect import bisect_left, bisect_right
+
+from catalog_snapshot import parse_number
+
+BASE_DIR = "/Users/wanshuiwanqigaozhishang/Downloads/MINIAPP"
+DATABASE_DIR = f"{BASE_DIR}/database"
+CSV_FILE = f"{DATABASE_DIR}/Fish_Database_Enhanced_v2.csv"
+
+BENCH_READINGS = 2000
+
+class EndpointIndex:
+    """单个维度 ([low, high] 闭区间) 的有序端点索引"""
+
+    def __init__(self, lows, highs):
+        valid = [i for i, (lo, hi) in enumerate(zip(lows, highs))
+                 if not math.isnan(lo) and not math.isnan(hi) and lo <= hi]
+        by_low = sorted(valid, key=lambda i: lows[i])
+        by_high = sorted(valid, key=lambda i: highs[i])
+        self.lows = [lows[i] for i in by_low]
+        self.highs = [highs[i] for i in by_high]
+        self.prefix_low = _prefix_bits(by_low)
+        self.prefix_high = _prefix_bits(by_high)
+
+    def positions(self, lo, hi):
+        """查询区间 [lo, hi] 对应的两个前缀位置"""
+        return bisect_right(self.lows, hi), bisect_left(self.highs, lo)
+
+    def mask_at(self, positions):
+        started, ended = positions
+        return self.prefix_low[started] & ~self.prefix_high[ended]
+
+    def overlap(self, lo, hi):
+        """与 [lo, hi] 有重叠的品种位集; lo == hi 即为包含该点"""
+        return self.mask_at(self.positions(lo, hi))
+
+def _prefix_bits(order):
+    prefix = [0]
+    for i in order:
+        prefix.append(prefix[-1] | (1 << i))
+    return prefix
+
+class WaterIndex:
+    """水温 + pH 两个维度的区间索引"""
+
+    def __init__(self, rows):
+        self.names = [r['name'] for r in rows]
+        self.temp = EndpointIndex([parse_number(r.get('tempMin')) for r in rows],
+                                  [parse_number(r.get('tempMax')) for r in rows])
+        self.ph = EndpointIndex([parse_number(r.get('phMin')) for r in rows],
+                                [parse_number(r.get('phMax')) for r in rows])
+        self.everyone = (1 << len(rows)) - 1
+
+    @classmethod
+    def load(cls, csv_file=CSV_FILE):
+        with open(csv_file, 'r', encoding='utf-8-sig') as f:
+            return cls(list(csv.DictReader(f)))
+
+    def range_mask(self, temp=None, ph=None):
+        """temp / ph 为 (下限, 上限) 或 None; 返回区间有重叠的品种位集"""
+        mask = self.everyone
+        if temp is not None:
+            mask &= self.temp.overlap(*temp)
+        if ph is not None:
+            mask &= self.ph.overlap(*ph)
+        return mask
+
+    def stab_mask(self, temperature=None, ph=None):
+        return self.range_mask(None if temperature is None else (temperature, temperature),
+                               None if ph is None else (ph, ph))
+
+    def names_of(self, mask):
+        result = []
+        while mask:
+            low = mask & -mask
+            result.append(self.names[low.bit_length() - 1])
+            mask ^= low
+        return result
+
+    def stab(self, temperature=None, ph=None):
+        return self.names_of(self.stab_mask(temperature, ph))
+
+    def overlapping(self, temp=None, ph=None):
+        return self.names_of(self.range_mask(temp, ph))
+
+    def batch(self, readings):
+        """批量单点查询: readings 为 [{'temperature', 'ph'}, ...], 返回等长的位集列表"""
+        cache = {}
+        masks = []
+        for reading in readings:
+            t, p = reading.get('temperature'), reading.get('ph')
+            key = (None if t is None else self.temp.positions(t, t),
+                   None if p is None else self.ph.positions(p, p))
+            mask = cache.get(key)
+            if mask is None:
+                mask = self.everyone
+                if key[0] is not None:
+                    mask &= self.temp.mask_at(key[0])
+                if key[1] is not None:
+                    mask &= self.ph.mask_at(key[1])
+                cache[key] = mask
+            masks.append(mask)
+        return masks
+
+def linear_scan(rows, temperature, ph):
+    """对照实现: 逐行比较"""
+    result = []
+    for r in rows:
+        t_min, t_max = parse_number(r.get('tempMin')), parse_number(r.get('tempMax'))
+        p_min, p_max = parse_number(r.get('phMin')), parse_number(r.get('phMax'))
+        if t_min <= temperature <= t_max and p_min <= ph <= p_max:
+            result.append(r['name'])
+    return result
+
+def benchmark(scale=1, readings=BENCH_READINGS, csv_file=CSV_FILE):
+    """scale > 1 时把目录复制多份模拟更大的品种库; 读数为随机的水温/pH"""
+    with open(csv_file, 'r', encoding='utf-8-sig') as f:
+        rows = list(csv.DictReader(f))
+    rows = [dict(r, name=f"{r['name']}#{k}" if k else r['name']) for k in range(scale) for r in rows]
+    rng = random.Random(0)
+    tank = [{'temperature': round(rng.uniform(18, 30), 1), 'ph': round(rng.uniform(6.0, 8.5), 1)}
+            for _ in range(readings)]
+
+    results = {}
+    start = time.perf_counter()
+    index = WaterIndex(rows)
+    results['建索引'] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    expected = [linear_scan(rows, r['temperature'], r['ph']) for r in tank]
+    results['逐行扫描'] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    got = [index.stab(r['temperature'], r['ph']) for r in tank]
+    results['逐条索引查询'] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    masks = index.batch(tank)
+    results['批量位集'] = (time.perf_counter() - start) * 1000
+
+    same = [sorted(e) for e in expected] == [sorted(g) for g in got]
+    same = same and [sorted(e) for e in expected] == [sorted(index.names_of(m)) for m in masks]
+    return results, same
+
+def main():
+    args = sys.argv[1:]
+
+    if '--bench' in args:
+        scale = int(args[args.index('--scale') + 1]) if '--scale' in args else 1
+        results, same = benchmark(scale)
+        print(f"{BENCH_READINGS} 条读数, 品种库 x{scale} (ms):")
+        for label, ms in results.items():
+            print(f"  {label}: {ms:.2f}")
+        print(f"  结果{'一致' if same else '不一致!'}")
+        return
+
+    index = WaterIndex.load()
+
+    if '--batch' in args:
+        with open(args[args.index('--batch') + 1], 'r', encoding='utf-8') as f:
+            readings = json.load(f)
+        for reading, mask in zip(readings, index.batch(readings)):
+            print(f"{reading.get('temperature')}°C pH {reading.get('ph')}: {bin(mask).count('1')} 种")
+        return
+
+    if '--range' in args:
+        t_lo, t_hi, p_lo, p_hi = map(float, args[args.index('--range') + 1:][:4])
+        names = index.overlapping((t_lo, t_hi), (p_lo, p_hi))
+        print(f"水温 {t_lo}-{t_hi}°C, pH {p_lo}-{p_hi} 有重叠的品种 ({len(names)}):")
+    else:
+        temperature, ph = map(float, args[:2])
+        names = index.stab(temperature, ph)
+        print(f"适合 {temperature}°C, pH {ph} 的品种 ({len(names)}):")
+    for name in names:
+        print(f"  {name}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片获取流水线基准 - 本地替身服务 + 可复现的吞吐/尾延迟/内存测量
+
+FakeWeb 在本机启动一个 HTTP 服务, 模拟各图片来源的接口:
+  /bing/images/search   必应结果页, 内含 "murl":"..." 原图地址 (可配置页面大小与候选数)
+  /pixabay/api/         Pixabay JSON (hits[].webformatURL)
+  /unsplash/400x300/    Unsplash Source, 302 跳转到图片
+  /commons/w/api.php    Commons query/search 与 imageinfo (支持 | 分隔的多标题)
+  /img/...              JPEG 图片 (可配置大小, 每个地址内容不同)
+延迟 (中位数 + 长尾)、错误率 (503, 可带 Retry-After) 按请求路径与第几次请求确定性生成,
+同样的参数每次结果相同, 重试同一地址可能成功; dead 中的路径前缀不响应 (模拟已下线的来源)。
+
+场景直接调用各脚本的代码路径, 图片写入临时目录:
+  bing     enhance_fish_database: BingSource 解析, 串行
+  pixabay  download_fish_images: Pixabay -> Unsplash 回退, 串行
+  wiki     download_wiki_images.download_all: 并发搜索 + 批量 imageinfo + 并发下载
+每个场景在独立子进程中运行, 峰值内存 (RSS) 互不影响; 替身服务不限速。
+
+用法:
+    python pipeline_bench.py                              # 三个场景 x 30/300/3000 种
+    python pipeline_bench.py --scales 30 300 --latency 20 --error-rate 0.05
+    python pipeline_bench.py --json bench.json            # 保存结果
+    python pipeline_bench.py --baseline bench.json        # 与上次结果对比
+    python pipeline_bench.py --bing-parse [页面.html ...]  # 必应结果页解析: 整页正则 vs 流式扫描
+"""
+
+import io
+import os
+import re
+import sys
+import json
+import time
+import zlib
+import random
+import argparse
+import tempfile
+import threading
+import subprocess
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs, quote
+
+SCENARIOS = ('bing', 'pixabay', 'wiki')
+SCALES = (30, 300, 3000)
+
+# 替身服务默认参数
+LATENCY_MS = 5.0
+JITTER = 0.5
+ERROR_RATE = 0.0
+IMAGE_BYTES = 40 * 1024
+PAGE_BYTES = 150 * 1024
+CANDIDATES = 30
+
+JPEG_HEADER = b'\xff\xd8\xff\xe0\x00\x10JFIF\x00'
+
+class _QuietServer(ThreadingHTTPServer):
+    """客户端提前断开 (如必应结果页读到够用即关闭) 是正常情况, 不打印堆栈"""
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+def bing_page(base_url, query, candidates=CANDIDATES, page_bytes=PAGE_BYTES):
+    """必应结果页: 每个结果带 murl 与 "宽 x 高 · 格式" 说明, 结果位于页面中部"""
+    rng = random.Random(zlib.crc32(query.encode('utf-8')))
+    items = []
+    for i in range(candidates):
+        ext = 'gif' if i % 7 == 3 else 'png' if i % 5 == 4 else 'jpg'  # 混入不支持与次选的格式
+        width, height = rng.choice([(160, 120), (640, 480), (1024, 768), (1920, 1280), (4000, 3000)])
+        murl = f"{base_url}/img/bing/{quote(query)}/{i}.{ext}"
+        items.append(f'<li><a class="iusc" m="{{&quot;cid&quot;:&quot;{i}&quot;}}" '
+                     f'data-m=\'{{"cid":"{i}","murl":"{murl}","turl":"{base_url}/th/{i}"}}\'></a>'
+                     f'<div class="img_info"><span class="nowrap">{width} x {height} · {ext}</span></div></li>')
+    head = '<!DOCTYPE html><html><head><title>必应图片</title></head><body>'
+    results = ''.join(items)
+    filler = '<div class="pad">' + 'x' * max(0, page_bytes - len(head) - len(results)) + '</div>'
+    half = len(filler) // 2
+    return (head + filler[:half] + results + filler[half:] + '</body></html>').encode('utf-8')
+
+class FakeWeb:
+    """本地替身服务; url 为根地址, close() 停止"""
+
+    def __init__(self, latency_ms=LATENCY_MS, jitter=JITTER, error_rate=ERROR_RATE,
+                 image_bytes=IMAGE_BYTES, page_bytes=PAGE_BYTES, candidates=CANDIDATES, seed=0,
+                 retry_after=None, dead=(), hang=60):
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.dead = tuple(dead)
+        self.hang = hang
+        self.hits = {}
+        self.image_bytes = image_bytes
+        self.page_bytes = page_bytes
+        self.candidates = candidates
+        self.seed = seed
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.server = _QuietServer(('127.0.0.1', 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def delay(self, path):
+        """中位数 latency_ms, jitter 越大长尾越重 (对数正态)"""
+        rng = random.Random(zlib.crc32(f"{self.seed}:{path}".encode('utf-8')))
+        return self.latency_ms * rng.lognormvariate(0, self.jitter) / 1000
+
+    def fails(self, path, attempt):
+        key = f"{self.seed}:err:{path}:{attempt}".encode('utf-8')
+        return zlib.crc32(key) % 10000 < self.error_rate * 10000
+
+    def image(self, path):
+        body = JPEG_HEADER + path.encode('utf-8')
+        return body + b'\x00' * max(0, self.image_bytes - len(body))
+
+    def commons(self, params):
+        if params.get('list') == ['search']:
+            term = params['srsearch'][0]
+            return {'query': {'search': [{'title': f"File:{term}.jpg"}, {'title': f"File:{term} map.svg"}]}}
+        titles = params['titles'][0].split('|')
+        pages = {}
+        for i, title in enumerate(titles):
+            pages[str(-1 - i)] = {'title': title,
+                                  'imageinfo': [{'url': f"{self.url}/img/commons/{quote(title)}"}]}
+        return {'query': {'pages': pages}}
+
+    def respond(self, path):
+        """返回 (状态码, 头, 内容)"""
+        parts = urlsplit(path)
+        params = parse_qs(parts.query)
+        if parts.path.startswith('/img/'):
+            return 200, {'Content-Type': 'image/jpeg'}, self.image(parts.path)
+        if parts.path == '/bing/images/search':
+            page = bing_page(self.url, params['q'][0], self.candidates, self.page_bytes)
+            return 200, {'Content-Type': 'text/html; charset=utf-8'}, page
+        if parts.path == '/pixabay/api/':
+            term = quote(params['q'][0])
+            hits = [{'id': i, 'webformatURL': f"{self.url}/img/pixabay/{term}/{i}.jpg"} for i in range(5)]
+            body = json.dumps({'total': len(hits), 'totalHits': len(hits), 'hits': hits})
+            return 200, {'Content-Type': 'application/json'}, body.encode('utf-8')
+        if parts.path.startswith('/unsplash/'):
+            return 302, {'Location': f"/img/unsplash/{quote(parts.query)}.jpg"}, b''
+        if parts.path == '/commons/w/api.php':
+            body = json.dumps(self.commons(params), ensure_ascii=False)
+            return 200, {'Content-Type': 'application/json'}, body.encode('utf-8')
+        return 404, {'Content-Type': 'text/plain'}, b'not found'
+
+    def _handler(self):
+        web = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # 头与内容分两次写出, 不关闭 Nagle 时每个响应会多等一次延迟确认 (~40ms)
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with web.lock:
+                    web.requests += 1
+                    attempt = web.hits[self.path] = web.hits.get(self.path, 0) + 1
+                if self.path.startswith(web.dead):
+                    time.sleep(web.hang)
+                    return
+                time.sleep(web.delay(self.path))
+                if web.fails(self.path, attempt):
+                    status, headers, body = 503, {'Content-Type': 'text/plain'}, b'unavailable'
+                    if web.retry_after is not None:
+                        headers['Retry-After'] = str(web.retry_after)
+                else:
+                    status, headers, body = web.respond(self.path)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+def fake_species(count):
+    """合成品种: (中文名, 英文搜索词, 属名)"""
+    return [(f"测试鱼{i:04d}", f"test fish {i}", f"genus{i % 50}") for i in range(count)]
+
+def peak_rss_mb():
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == 'darwin' else rss / 1024
+
+# ============ 场景 (在子进程中执行) ============
+
+def _resolve_all(resolver, journal, species_list):
+    """与 enhance_fish_database / download_fish_images 相同的逐种解析, 返回 (成功数, 每种耗时)"""
+    ok = 0
+    latencies = []
+    for fish_name, search_term, sci_name in species_list:
+        filename = f"fish_new_{fish_name}_{sci_name}.jpg"
+        species = {'name': fish_name, 'search_term': search_term,
+                   'scientific_name': sci_name, 'filename': filename}
+        start = time.perf_counter()
+        result, errors = resolver.resolve(species)
+        if result:
+            journal.record_success(filename, result['source'], result['url'], result['path'],
+                                   resolver.store.digest(filename))
+            ok += 1
+        else:
+            journal.record_failure(filename, '; '.join(errors))
+        latencies.append(time.perf_counter() - start)
+    return ok, latencies
+
+def run_scenario(name, count, base_url, workdir):
+    """返回结果字典: 成功数、耗时、每种耗时分位数、峰值内存、各类请求的 p95"""
+    import image_sources
+    import run_report
+    from http_client import HttpClient
+    from image_store import ImageStore
+    from download_journal import DownloadJournal
+
+    image_sources.BING_SEARCH = f"{base_url}/bing/images/search"
+    image_sources.PIXABAY_API = f"{base_url}/pixabay/api/"
+    image_sources.UNSPLASH_SOURCE = f"{base_url}/unsplash"
+
+    images_dir = os.path.join(workdir, 'images')
+    os.makedirs(images_dir, exist_ok=True)
+    store = ImageStore(images_dir, os.path.join(workdir, 'image_index.json'))
+    journal = DownloadJournal(os.path.join(workdir, 'download_journal.jsonl'))
+    client = HttpClient(headers={'User-Agent': 'FishBench/1.0'})
+    species_list = fake_species(count)
+
+    run_report.enable(f"bench_{name}")
+    start = time.perf_counter()
+    if name == 'bing':
+        resolver = image_sources.ImageResolver([image_sources.BingSource(client, timeout=15)], store)
+        ok, latencies = _resolve_all(resolver, journal, species_list)
+    elif name == 'pixabay':
+        resolver = image_sources.ImageResolver([
+            image_sources.PixabaySource(client, priority=0, timeout=20),
+            image_sources.UnsplashSource(client, priority=1, timeout=20),
+        ], store)
+        ok, latencies = _resolve_all(resolver, journal, species_list)
+    else:
+        import download_wiki_images as wiki
+        wiki.COMMONS_API = f"{base_url}/commons/w/api.php"
+        wiki.IMAGES_DIR = images_dir
+        wiki.client, wiki.store, wiki.journal = client, store, journal
+        results = wiki.download_all(species_list, wiki.MAX_WORKERS)
+        ok = sum(1 for _, status, _ in results if status == 'success')
+        # 批量流水线没有单种耗时, 用每种的搜索 + 下载片段之和
+        per_species = {}
+        for item in run_report.build_report()['spans']:
+            if item['name'] in ('search', 'fetch'):
+                per_species[item['species']] = per_species.get(item['species'], 0) + item['ms'] / 1000
+        latencies = list(per_species.values())
+    elapsed = time.perf_counter() - start
+
+    report = run_report.build_report()
+    latencies.sort()
+    result = {
+        'scenario': name,
+        'species': count,
+        'ok': ok,
+        'seconds': round(elapsed, 3),
+        'throughput': round(count / elapsed, 2),
+        'requests': sum(c['requests'] for c in client.stats().values()),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+    for p in run_report.PERCENTILES:
+        result[f"p{p}_ms"] = round(run_report.percentile(latencies, p) * 1000, 1)
+    for span_name in ('http.ttfb', 'http.download', 'bing.parse'):
+        if span_name in report['summary']:
+            result[f"{span_name}.p95_ms"] = report['summary'][span_name]['p95_ms']
+    return result
+
+# ============ 必应结果页解析 ============
+
+# 原先的做法: 读完整页、解码, 对全文 findall 后只取前 3 个
+OLD_MURL = r'"murl":"(https?://[^"]+\.(?:jpg|jpeg|png))"'
+
+def bench_bing_parse(pages, repeat=20, scan=10, keep=3):
+    """pages 为 [字节串]; 返回 (旧方法 读取字节/毫秒, 新方法 读取字节/毫秒), 均为每页平均值"""
+    from image_sources import scan_bing_page, rank_candidates
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            re.findall(OLD_MURL, io.BytesIO(page).read().decode('utf-8', errors='ignore'), re.IGNORECASE)[:keep]
+    old_ms = (time.perf_counter() - start) / (repeat * len(pages)) * 1000
+    old_bytes = sum(len(page) for page in pages) / len(pages)
+
+    read = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            found, n = scan_bing_page(io.BytesIO(page), scan)
+            rank_candidates(found)[:keep]
+            read += n
+    new_ms = (time.perf_counter() - start) / (repeat * len(pages)) * 1000
+    new_bytes = read / (repeat * len(pages))
+    return (old_bytes, old_ms), (new_bytes, new_ms)
+
+def fixture_pages(files):
+    """读取保存的结果页; 未指定时生成 20 个 50-500KB 的页面"""
+    if files:
+        pages = []
+        for path in files:
+            with open(path, 'rb') as f:
+                pages.append(f.read())
+        return pages
+    return [bing_page('http://127.0.0.1:8000', f"test fish {i}", page_bytes=(50 + i * 24) * 1024) for i in range(20)]
+
+# ============ 汇总 ============
+
+COLUMNS = [('scenario', '场景', 9), ('species', '品种', 7), ('ok', '成功', 7), ('seconds', '耗时s', 9),
+           ('throughput', '种/秒', 9), ('p50_ms', 'p50ms', 9), ('p95_ms', 'p95ms', 9),
+           ('p99_ms', 'p99ms', 9), ('requests', '请求', 8), ('peak_rss_mb', '内存MB', 9)]
+
+def format_results(results, baseline=None):
+    lines = [''.join(f"{title:>{width}}" for _, title, width in COLUMNS)]
+    previous = {(r['scenario'], r['species']): r for r in baseline or []}
+    for r in results:
+        lines.append(''.join(f"{r[key]:>{width}}" for key, _, width in COLUMNS))
+        old = previous.get((r['scenario'], r['species']))
+        if old:
+            changes = []
+            for key, label in (('throughput', '吞吐'), ('p95_ms', 'p95'), ('peak_rss_mb', '内存')):
+                if old[key]:
+                    changes.append(f"{label} {(r[key] - old[key]) / old[key] * 100:+.0f}%")
+            lines.append(f"{'':>9}对比上次: {', '.join(changes)}")
+    return "\n".join(lines)
+
+def run_in_subprocess(name, count, base_url):
+    with tempfile.TemporaryDirectory(prefix='fish_bench_') as workdir:
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), '--scenario', name,
+                                 str(count), base_url, workdir],
+                                capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        if output.returncode != 0:
+            raise RuntimeError(f"{name} x {count} 失败:\n{output.stderr}")
+        return json.loads(output.stdout.strip().splitlines()[-1])
+
+def main():
+    if len(sys.argv) == 6 and sys.argv[1] == '--scenario':
+        name, count, base_url, workdir = sys.argv[2], int(sys.argv[3]), sys.argv[4], sys.argv[5]
+        with open(os.devnull, 'w') as devnull:
+            stdout, sys.stdout = sys.stdout, devnull  # 屏蔽脚本自身的进度输出
+            try:
+                result = run_scenario(name, count, base_url, workdir)
+            finally:
+                sys.stdout = stdout
+        print(json.dumps(result, ensure_ascii=False))
+        return
+
+    parser = argparse.ArgumentParser(description='Offline benchmark for the image acquisition pipeline')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--scales', nargs='+', type=int, default=list(SCALES), help='品种数')
+    parser.add_argument('--latency', type=float, default=LATENCY_MS, help='替身服务延迟中位数 (毫秒)')
+    parser.add_argument('--jitter', type=float, default=JITTER, help='延迟长尾程度 (对数正态 sigma)')
+    parser.add_argument('--error-rate', type=float, default=ERROR_RATE, help='返回 503 的请求比例')
+    parser.add_argument('--image-kb', type=int, default=IMAGE_BYTES // 1024, help='图片大小 (KB)')
+    parser.add_argument('--page-kb', type=int, default=PAGE_BYTES // 1024, help='必应结果页大小 (KB)')
+    parser.add_argument('--json', metavar='PATH', help='保存结果')
+    parser.add_argument('--baseline', metavar='PATH', help='与之前保存的结果对比')
+    parser.add_argument('--bing-parse', nargs='*', metavar='HTML', help='只比较必应结果页的解析 (可指定保存的页面)')
+    args = parser.parse_args()
+
+    if args.bing_parse is not None:
+        pages = fixture_pages(args.bing_parse)
+        (old_bytes, old_ms), (new_bytes, new_ms) = bench_bing_parse(pages)
+        print(f"结果页 {len(pages)} 个, 平均 {old_bytes / 1024:.0f} KB")
+        print(f"  整页正则: 读取 {old_bytes / 1024:.0f} KB, {old_ms:.3f} ms/页")
+        print(f"  流式扫描: 读取 {new_bytes / 1024:.0f} KB, {new_ms:.3f} ms/页")
+        return
+
+    web = FakeWeb(latency_ms=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                  image_bytes=args.image_kb * 1024, page_bytes=args.page_kb * 1024)
+    print(f"替身服务: {web.url} (延迟 {args.latency}ms, 长尾 {args.jitter}, 错误率 {args.error_rate})")
+    results = []
+    try:
+        for count in args.scales:
+            for name in args.scenarios:
+                results.append(run_in_subprocess(name, count, web.url))
+                print(f"  {name} x {count}: {results[-1]['seconds']}s")
+    finally:
+        web.close()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+    print()
+    print(format_results(results, baseline))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'config': vars(args), 'results': results}, f, ensure_ascii=False, indent=1)
+        print(f"\n结果: {args.json}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+容错层 - 重试退避 / Retry-After / 熔断 / 对冲请求
+
+  RetryPolicy     429/5xx 与连接类错误按指数退避 + 全抖动重试, 服务端给出 Retry-After 时照办
+                  (要求等待过久时不再重试, 超时不重试); HttpClient(retry=...) 对每个 GET 生效
+  Budget          调用方剩余的时间与取消事件; 重试前的等待超出预算或等待中被取消时不再重试
+  CircuitBreaker  每个图片来源一个: 连续失败 threshold 次后熔断, cooldown 秒内直接跳过该来源,
+                  到期后放行一个探测请求, 成功即恢复; 只统计网络/服务端错误, 图片不合格不算
+  hedged()        慢主机的对冲请求: delay 秒内没有返回就再发一份, 取先成功的结果
+
+用法:
+    client = HttpClient(headers=HEADERS, retry=RetryPolicy())
+    python resilience.py --bench    # 本地故障注入服务上比较有无容错层的耗时
+"""
+
+import sys
+import time
+import random
+import socket
+import threading
+import http.client
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, TimeoutError as FuturesTimeout
+from urllib.error import HTTPError, URLError
+
+import run_report
+
+# 可重试的状态码
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# 连接失败、超时、连接被重置等网络错误
+NETWORK_ERRORS = (URLError, ConnectionError, TimeoutError, socket.gaierror, http.client.HTTPException)
+
+def is_transient(exc):
+    """是否为来源方面的临时故障 (值得重试, 也计入熔断)"""
+    if isinstance(exc, HTTPError):
+        return exc.code in RETRY_STATUSES
+    return isinstance(exc, NETWORK_ERRORS)
+
+def is_timeout(exc):
+    return isinstance(exc, (TimeoutError, socket.timeout)) or isinstance(getattr(exc, 'reason', None), TimeoutError)
+
+def parse_retry_after(value):
+    """Retry-After 头: 秒数或 HTTP 日期, 返回秒数; 无法解析时返回 None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+class Budget:
+    """一次操作剩余的时间: seconds 秒后用完 (None 为不限), cancel 置位即视为用完"""
+
+    def __init__(self, seconds=None, cancel=None):
+        self.deadline = None if seconds is None else time.monotonic() + seconds
+        self.cancel = cancel
+
+    def remaining(self):
+        if self.cancel is not None and self.cancel.is_set():
+            return 0.0
+        if self.deadline is None:
+            return float('inf')
+        return max(0.0, self.deadline - time.monotonic())
+
+    def sleep(self, seconds):
+        """等待 seconds 秒; 剩余时间不够或等待中被取消时返回 False"""
+        if seconds > self.remaining():
+            return False
+        if self.cancel is not None:
+            return not self.cancel.wait(seconds)
+        time.sleep(seconds)
+        return True
+
+class RetryPolicy:
+    """指数退避 + 全抖动: 第 n 次重试前等待 uniform(0, min(cap, base * 2^(n-1))) 秒"""
+
+    def __init__(self, attempts=3, base=0.5, cap=8.0, max_retry_after=30.0):
+        self.attempts = attempts
+        self.base = base
+        self.cap = cap
+        self.max_retry_after = max_retry_after
+
+    def delay(self, attempt, exc):
+        """返回重试前的等待秒数; 服务端要求等待超过 max_retry_after 时返回 None (放弃重试)"""
+        if isinstance(exc, HTTPError) and exc.headers is not None:
+            retry_after = parse_retry_after(exc.headers.get('Retry-After'))
+            if retry_after is not None:
+                return retry_after if retry_after <= self.max_retry_after else None
+        return random.uniform(0, min(self.cap, self.base * 2 ** (attempt - 1)))
+
+    def call(self, func, *args, budget=None, **kwargs):
+        """budget 为调用方的 Budget: 重试前的等待不超过其剩余时间, 取消后立即放弃"""
+        for attempt in range(1, self.attempts + 1):
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                # 超时已经等满了整个 timeout, 不再重试, 交给熔断处理
+                if attempt == self.attempts or not is_transient(e) or is_timeout(e):
+                    raise
+                wait_seconds = self.delay(attempt, e)
+                if wait_seconds is None:
+                    raise
+                if budget is None:
+                    time.sleep(wait_seconds)
+                elif not budget.sleep(wait_seconds):
+                    run_report.count('retry.out_of_budget')
+                    raise
+                run_report.count('retry')
+
+class CircuitBreaker:
+    """连续失败计数熔断器 (线程安全); state 为 closed / open / half-open"""
+
+    def __init__(self, name, threshold=3, cooldown=300.0):
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.skipped = 0
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self.lock:
+            if self.opened_at is None:
+                return 'closed'
+            return 'half-open' if self.probing else 'open'
+
+    def allow(self):
+        """是否放行一次请求; 熔断期内返回 False, 每过 cooldown 秒放行一个探测"""
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.cooldown:
+                # 探测期间其余请求仍跳过; 探测没有结论 (如图片不合格) 时下个周期再探测
+                self.opened_at = time.monotonic()
+                self.probing = True
+                return True
+            self.skipped += 1
+        run_report.count(f"breaker.skip.{self.name}")
+        return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.probing or (self.opened_at is None and self.failures >= self.threshold):
+                self.opened_at = time.monotonic()
+                self.probing = False
+                tripped = True
+            else:
+                tripped = False
+        if tripped:
+            run_report.count(f"breaker.open.{self.name}")
+            print(f"  [熔断] {self.name} 连续失败 {self.failures} 次, {self.cooldown:.0f} 秒内跳过")
+
+# 对冲请求使用的线程池
+_hedge_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix='hedge')
+
+def hedged(func, delay, discard=None):
+    """先发一份, delay 秒内未返回再发一份; 返回先成功的结果, 落选结果交给 discard (如关闭响应)"""
+    first = _hedge_pool.submit(func)
+    try:
+        return first.result(timeout=delay)
+    except FuturesTimeout:
+        pass
+    run_report.count('hedge.sent')
+    pending = {first, _hedge_pool.submit(func)}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if discard:
+                    for other in pending:
+                        other.add_done_callback(lambda f: f.exception() is None and discard(f.result()))
+                return future.result()
+            error = future.exception()
+    raise error
+
+# ============ 故障注入对比 ============
+
+def benchmark(species=20, timeout=1.0):
+    """Pixabay 不响应, Unsplash 偶发 503 (带 Retry-After): 比较有无容错层时的耗时与成功数"""
+    import tempfile
+    import image_sources
+    from http_client import HttpClient
+    from image_store import ImageStore
+    from pipeline_bench import FakeWeb, fake_species
+
+    web = FakeWeb(latency_ms=5, error_rate=0.3, retry_after=0, dead=('/pixabay/',))
+    image_sources.PIXABAY_API = f"{web.url}/pixabay/api/"
+    image_sources.UNSPLASH_SOURCE = f"{web.url}/unsplash"
+    rows = []
+    try:
+        for label, retry, threshold in (('无容错', None, None), ('重试+熔断', RetryPolicy(base=0.05), 3)):
+            with tempfile.TemporaryDirectory() as workdir:
+                client = HttpClient(retry=retry)
+                store = ImageStore(workdir, f"{workdir}/image_index.json")
+                sources = [image_sources.PixabaySource(client, priority=0, timeout=timeout),
+                           image_sources.UnsplashSource(client, priority=1, timeout=timeout)]
+                for source in sources:
+                    source.breaker = CircuitBreaker(source.name, threshold=threshold or 10 ** 9)
+                resolver = image_sources.ImageResolver(sources, store)
+                run_report.enable('resilience_bench')
+                start = time.perf_counter()
+                ok = 0
+                for fish_name, term, sci in fake_species(species):
+                    result, _ = resolver.resolve({'name': fish_name, 'search_term': term, 'scientific_name': sci,
+                                                  'filename': f"{fish_name}.jpg"})
+                    ok += result is not None
+                elapsed = time.perf_counter() - start
+                counters = run_report.build_report()['counters']
+                rows.append((label, ok, elapsed, counters.get('retry', 0), sources[0].breaker.skipped))
+    finally:
+        run_report.disable()
+        web.close()
+    return rows
+
+def main():
+    if '--bench' in sys.argv:
+        print("故障注入: Pixabay 不响应 (超时 1s), 其余请求 30% 返回 503 (Retry-After: 0)")
+        print(f"{'':<10}{'成功':>6}{'耗时s':>9}{'重试':>6}{'跳过Pixabay':>13}")
+        for label, ok, elapsed, retries, skipped in benchmark():
+            print(f"{label:<10}{ok:>6}{elapsed:>9.1f}{retries:>6}{skipped:>13}")
+        return
+    print(__doc__)
+
+if __name__ == '__main__':
+    main()
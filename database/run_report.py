@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行剖析 - 按阶段/按请求记录耗时, 生成可比较的 JSON 运行报告
+
+各脚本加 --profile (或设置环境变量 FISH_PROFILE=1) 时启用:
+  - span(name, **attrs)   计时片段, 如 stage.load / http.dns / http.tls / http.ttfb / http.download
+  - count(name)           计数器, 如 store.url_hit (URL 复用) / journal.skip / http.stale_retry
+  - annotate(key, value)  附加到报告的其他信息 (如连接复用统计)
+未启用时 span() 返回共用的空对象, 几乎没有额外开销。
+
+报告写到 run_reports/<脚本>_<时间>.json (目录可用 FISH_PROFILE_DIR 覆盖):
+  spans    每个片段的开始时间、耗时与属性 (bytes / host / cache / error 等)
+  summary  按名称汇总: 次数、总耗时、p50/p95/p99/最大值、字节数
+  counters 计数器
+
+用法:
+    python download_wiki_images.py --profile
+    python run_report.py run_reports/a.json run_reports/b.json   # 比较两次运行
+    python run_report.py --bench                                 # 未启用时的开销
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from datetime import datetime
+
+BASE_DIR = "/Users/wanshuiwanqigaozhishang/Downloads/MINIAPP"
+DATABASE_DIR = f"{BASE_DIR}/database"
+REPORT_DIR = os.environ.get('FISH_PROFILE_DIR', f"{DATABASE_DIR}/run_reports")
+
+VERSION = 1
+
+# 汇总中列出的分位数
+PERCENTILES = (50, 95, 99)
+
+_enabled = False
+_lock = threading.Lock()
+_spans = []
+_counters = {}
+_meta = {}
+_origin = 0.0
+
+def enabled():
+    return _enabled
+
+class _NoopSpan:
+    """未启用时 span() 返回的共用对象"""
+
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NOOP = _NoopSpan()
+
+class Span:
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        """片段结束前补充属性, 如下载字节数、结果状态"""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        _add(self.name, self.start, time.perf_counter() - self.start, self.attrs)
+        return False
+
+def span(name, **attrs):
+    """with span('http.ttfb', host=host) as s: ...; s.set(bytes=n)"""
+    if not _enabled:
+        return _NOOP
+    return Span(name, attrs)
+
+def record(name, start, seconds, **attrs):
+    """记录已在别处计时的片段; start 为 time.perf_counter() 读数"""
+    if _enabled:
+        _add(name, start, seconds, attrs)
+
+def count(name, n=1):
+    if _enabled:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + n
+
+def annotate(key, value):
+    if _enabled:
+        with _lock:
+            _meta[key] = value
+
+def _add(name, start, seconds, attrs):
+    item = {'name': name, 'start_ms': round((start - _origin) * 1000, 3),
+            'ms': round(seconds * 1000, 3), 'thread': threading.current_thread().name}
+    item.update(attrs)
+    with _lock:
+        _spans.append(item)
+
+def enable(script, argv=None):
+    """开始记录; 重复调用会清空已有记录"""
+    global _enabled, _origin
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+        _meta.clear()
+        _meta.update({'script': script, 'argv': list(sys.argv[1:] if argv is None else argv),
+                      'started': datetime.now().isoformat(timespec='seconds')})
+        _origin = time.perf_counter()
+    _enabled = True
+
+def disable():
+    global _enabled
+    _enabled = False
+
+def setup(script, profile=False):
+    """脚本入口调用: --profile 或 FISH_PROFILE=1 时启用, 返回是否启用"""
+    if profile or os.environ.get('FISH_PROFILE', '') not in ('', '0'):
+        enable(script)
+    return _enabled
+
+def percentile(sorted_values, p):
+    """最近秩分位数"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+def summarize(spans):
+    """按片段名称汇总, 返回 {名称: {count, errors, total_ms, p50_ms, p95_ms, p99_ms, max_ms, bytes}}"""
+    groups = {}
+    for item in spans:
+        groups.setdefault(item['name'], []).append(item)
+    summary = {}
+    for name, items in sorted(groups.items()):
+        durations = sorted(item['ms'] for item in items)
+        stats = {'count': len(items), 'errors': sum(1 for item in items if 'error' in item),
+                 'total_ms': round(sum(durations), 3)}
+        for p in PERCENTILES:
+            stats[f"p{p}_ms"] = percentile(durations, p)
+        stats['max_ms'] = durations[-1]
+        sizes = [item['bytes'] for item in items if isinstance(item.get('bytes'), int)]
+        if sizes:
+            stats['bytes'] = sum(sizes)
+        summary[name] = stats
+    return summary
+
+def build_report():
+    with _lock:
+        spans = sorted(_spans, key=lambda item: item['start_ms'])
+        counters = dict(sorted(_counters.items()))
+        meta = dict(_meta)
+    meta['wall_ms'] = round((time.perf_counter() - _origin) * 1000, 3)
+    return {'version': VERSION, **meta, 'summary': summarize(spans), 'counters': counters, 'spans': spans}
+
+def format_summary(report):
+    lines = [f"{'片段':<24}{'次数':>6}{'总计ms':>11}{'p50':>9}{'p95':>9}{'p99':>9}{'最大':>9}{'KB':>9}"]
+    for name, stats in report['summary'].items():
+        kb = f"{stats['bytes'] / 1024:.0f}" if 'bytes' in stats else '-'
+        lines.append(f"{name:<24}{stats['count']:>6}{stats['total_ms']:>11.1f}{stats['p50_ms']:>9.1f}"
+                     f"{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}{stats['max_ms']:>9.1f}{kb:>9}")
+    for name, value in report['counters'].items():
+        lines.append(f"  {name}: {value}")
+    lines.append(f"总耗时 {report['wall_ms'] / 1000:.2f}s")
+    return "\n".join(lines)
+
+def finish(report_dir=None):
+    """写出报告并打印汇总, 返回报告路径; 未启用时什么也不做"""
+    if not _enabled:
+        return None
+    report = build_report()
+    report_dir = report_dir or REPORT_DIR
+    os.makedirs(report_dir, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    path = os.path.join(report_dir, f"{report['script']}_{stamp}.json")
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+    print("\n运行剖析:")
+    print(format_summary(report))
+    print(f"报告: {path}")
+    return path
+
+def compare(old, new):
+    """两次报告的逐项对比, 返回文本行"""
+    lines = [f"{'片段':<24}{'次数':>11}{'p50 ms':>20}{'p95 ms':>20}{'变化(p95)':>11}"]
+    for name in sorted(set(old['summary']) | set(new['summary'])):
+        a, b = old['summary'].get(name), new['summary'].get(name)
+        if a is None or b is None:
+            lines.append(f"{name:<24}{'仅新报告' if a is None else '仅旧报告':>11}")
+            continue
+        change = f"{(b['p95_ms'] - a['p95_ms']) / a['p95_ms'] * 100:+.0f}%" if a['p95_ms'] else '-'
+        lines.append(f"{name:<24}{a['count']:>5} ->{b['count']:>4}"
+                     f"{a['p50_ms']:>9.1f} ->{b['p50_ms']:>8.1f}{a['p95_ms']:>9.1f} ->{b['p95_ms']:>8.1f}{change:>11}")
+    for name in sorted(set(old['counters']) | set(new['counters'])):
+        lines.append(f"  {name}: {old['counters'].get(name, 0)} -> {new['counters'].get(name, 0)}")
+    lines.append(f"总耗时 {old['wall_ms'] / 1000:.2f}s -> {new['wall_ms'] / 1000:.2f}s")
+    return lines
+
+def benchmark(n=1000000):
+    """未启用时每个 span 的开销 (纳秒)"""
+    disable()
+    start = time.perf_counter()
+    for _ in range(n):
+        with span('bench', host='example'):
+            pass
+    with_span = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(n):
+        pass
+    bare = time.perf_counter() - start
+    return (with_span - bare) / n * 1e9
+
+def main():
+    args = sys.argv[1:]
+    if '--bench' in args:
+        print(f"未启用时每个 span 的开销: {benchmark():.0f} ns")
+        return
+    if len(args) != 2:
+        print("用法: python run_report.py 旧报告.json 新报告.json")
+        return
+    reports = []
+    for path in args:
+        with open(path, 'r', encoding='utf-8') as f:
+            reports.append(json.load(f))
+    for line in compare(*reports):
+        print(line)
+
+if __name__ == '__main__':
+    main()
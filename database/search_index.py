@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+物种搜索索引 - 中文名 / 英文名 / 学名的全文与模糊查找
+
+为每个品种生成检索词:
+  - 中文名的单字与二元组 (鹤顶红 -> 鹤 顶 红 鹤顶 顶红)
+  - 中文名拼音全拼与首字母 (需 pypinyin)
+  - 英文名单词, 学名的属名与种加词
+模糊查找对整名/单词做编辑距离: 先用带首尾标记的二元组筛出候选, 再逐个计算距离。
+
+索引写成紧凑 JSON, 由 fish-species-query 云函数的 searchIndex.js 加载 (实现相同的打分规则);
+search_index.json 是生成文件, 不入库, 部署云函数前在装有 pypinyin 的环境运行本脚本生成。
+也供 enhance_fish_database 在精确匹配不到时给出相近的鱼名。
+
+依赖: pip install pypinyin (生成索引必需; 未安装时 write_index 报错而不是写出不含拼音的索引,
+      enhance_fish_database 则跳过索引并给出警告)
+
+用法:
+    python search_index.py              # 由 v2 CSV 生成索引
+    python search_index.py --no-pinyin  # 确需在没有 pypinyin 的环境生成 (索引标记 pinyin=false)
+    python search_index.py 鹤顶红        # 查询
+    python search_index.py --bench      # 查询耗时
+"""
+
+import re
+import sys
+import csv
+import json
+import time
+import unicodedata
+
+try:
+    from pypinyin import lazy_pinyin
+except ImportError:
+    lazy_pinyin = None
+
+BASE_DIR = "/Users/wanshuiwanqigaozhishang/Downloads/MINIAPP"
+DATABASE_DIR = f"{BASE_DIR}/database"
+CSV_FILE = f"{DATABASE_DIR}/Fish_Database_Enhanced_v2.csv"
+INDEX_FILE = f"{BASE_DIR}/cloudfunctions/fish-species-query/search_index.json"
+
+VERSION = 1
+
+PINYIN_HINT = "未安装 pypinyin, 索引将不支持拼音搜索: pip install pypinyin (确需跳过拼音时加 --no-pinyin)"
+
+# 各类命中的得分, 同一品种取最高分
+SCORE_EXACT = 1.0
+SCORE_PREFIX = 0.9
+SCORE_GRAMS = 0.8
+SCORE_FUZZY = 0.6
+
+def normalize(text):
+    """全角转半角, 小写, 合并空白"""
+    text = unicodedata.normalize('NFKC', text or '').lower()
+    return ' '.join(text.split())
+
+def is_cjk(ch):
+    return '一' <= ch <= '鿿'
+
+def cjk_grams(text):
+    """中文单字 + 二元组; 只取汉字部分"""
+    chars = ''.join(ch for ch in text if is_cjk(ch))
+    grams = list(chars)
+    grams += [chars[i:i + 2] for i in range(len(chars) - 1)]
+    return grams
+
+def words(text):
+    return re.findall(r'[a-z0-9]+', normalize(text))
+
+def pinyin_terms(name):
+    """全拼与首字母, 如 红龙 -> honglong / hl"""
+    if lazy_pinyin is None:
+        return []
+    syllables = [s for s in lazy_pinyin(''.join(ch for ch in name if is_cjk(ch))) if s]
+    if not syllables:
+        return []
+    return [''.join(syllables), ''.join(s[0] for s in syllables)]
+
+def query_grams(query):
+    """查询的 n-gram: 多字时用二元组, 单字时用单字"""
+    chars = ''.join(ch for ch in query if is_cjk(ch))
+    if len(chars) >= 2:
+        return [chars[i:i + 2] for i in range(len(chars) - 1)]
+    return list(chars)
+
+def edge_bigrams(term):
+    padded = f"^{term}$"
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+def edit_distance(a, b, limit):
+    """Levenshtein 距离, 超过 limit 时提前返回 limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+def max_distance(query):
+    return 1 if len(query) <= 4 else 2 if len(query) <= 10 else 3
+
+def build_index(rows):
+    """返回可直接写成 JSON 的索引:
+    docs      [[中文名, 英文名, 学名], ...]
+    postings  {检索词: [品种序号, ...]}   精确命中的 n-gram / 单词 / 拼音
+    terms     [[整名或单词, [品种序号, ...]], ...]   前缀与模糊匹配的对象
+    """
+    docs = []
+    postings = {}
+    terms = {}
+
+    def post(table, key, doc_id):
+        ids = table.setdefault(key, [])
+        if not ids or ids[-1] != doc_id:
+            ids.append(doc_id)
+
+    for doc_id, row in enumerate(rows):
+        name = row.get('name') or ''
+        english = row.get('englishName') or ''
+        scientific = row.get('scientificName') or ''
+        docs.append([name, english, scientific])
+
+        tokens = cjk_grams(name) + words(english) + words(scientific) + pinyin_terms(name)
+        for token in tokens:
+            post(postings, token, doc_id)
+
+        whole = [normalize(name), normalize(english), normalize(scientific)] + pinyin_terms(name)
+        whole += [w for w in words(english) + words(scientific) if len(w) >= 3]
+        for term in whole:
+            if term:
+                post(terms, term, doc_id)
+
+    return {
+        'version': VERSION,
+        'pinyin': lazy_pinyin is not None,
+        'docs': docs,
+        'postings': postings,
+        'terms': [[term, ids] for term, ids in sorted(terms.items())],
+    }
+
+class SearchIndex:
+    """加载后的索引; search() 返回按得分排序的 [(得分, 品种序号), ...]"""
+
+    def __init__(self, data):
+        self.docs = data['docs']
+        self.postings = data['postings']
+        self.terms = data['terms']
+        self.by_bigram = {}
+        for term_id, (term, _) in enumerate(self.terms):
+            for gram in edge_bigrams(term):
+                self.by_bigram.setdefault(gram, []).append(term_id)
+
+    @classmethod
+    def from_rows(cls, rows):
+        return cls(build_index(rows))
+
+    @classmethod
+    def load(cls, path=INDEX_FILE):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def search(self, query, limit=10):
+        query = normalize(query)
+        if not query:
+            return []
+        scores = {}
+
+        def hit(doc_ids, score):
+            for doc_id in doc_ids:
+                if score > scores.get(doc_id, 0):
+                    scores[doc_id] = score
+
+        # 中文 n-gram 覆盖率
+        grams = query_grams(query)
+        if grams:
+            counts = {}
+            for gram in grams:
+                for doc_id in self.postings.get(gram, []):
+                    counts[doc_id] = counts.get(doc_id, 0) + 1
+            for doc_id, count in counts.items():
+                hit([doc_id], SCORE_GRAMS * count / len(grams))
+
+        # 英文/学名/拼音单词全部命中
+        query_words = words(query)
+        if query_words:
+            matched = None
+            for word in query_words:
+                ids = set(self.postings.get(word, []))
+                matched = ids if matched is None else matched & ids
+            hit(sorted(matched), SCORE_GRAMS)
+
+        # 整名精确 / 前缀 / 编辑距离
+        # 每次编辑最多破坏两个二元组, 共有二元组太少的词不可能在距离内, 不必计算
+        limit_distance = max_distance(query)
+        query_bigrams = edge_bigrams(query)
+        shared = {}
+        for gram in query_bigrams:
+            for term_id in self.by_bigram.get(gram, []):
+                shared[term_id] = shared.get(term_id, 0) + 1
+        need = len(query_bigrams) - 2 * limit_distance
+        prefix = query_bigrams - {query[-1] + '$'}
+        for term_id, count in shared.items():
+            term, doc_ids = self.terms[term_id]
+            if term == query:
+                hit(doc_ids, SCORE_EXACT)
+            elif len(query) >= 2 and count >= len(prefix) and term.startswith(query):
+                hit(doc_ids, SCORE_PREFIX)
+            elif count >= need:
+                distance = edit_distance(query, term, limit_distance)
+                if distance <= limit_distance:
+                    hit(doc_ids, SCORE_FUZZY * (1 - distance / max(len(query), len(term))))
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], len(self.docs[item[0]][0]), item[0]))
+        return [(round(score, 4), doc_id) for doc_id, score in ranked[:limit]]
+
+    def names(self, query, limit=10):
+        return [self.docs[doc_id][0] for _, doc_id in self.search(query, limit)]
+
+def has_pinyin():
+    return lazy_pinyin is not None
+
+def write_index(rows, path=INDEX_FILE, require_pinyin=True):
+    """require_pinyin 为真且未安装 pypinyin 时抛 RuntimeError, 不写出缺拼音的索引"""
+    if require_pinyin and not has_pinyin():
+        raise RuntimeError(PINYIN_HINT)
+    data = build_index(rows)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    return data
+
+def load_rows(csv_file=CSV_FILE):
+    with open(csv_file, 'r', encoding='utf-8-sig') as f:
+        return list(csv.DictReader(f))
+
+BENCH_QUERIES = ['鹤顶红', '红帽', '孔雀', 'neon tetra', 'Paracheirodon innesi', 'Betta splendns',
+                 'goldfsh', 'Corydoras', '斑马', 'discus']
+
+def benchmark(index, repeat=200):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in BENCH_QUERIES:
+            index.search(query)
+    return (time.perf_counter() - start) / (repeat * len(BENCH_QUERIES)) * 1000
+
+def main():
+    args = sys.argv[1:]
+    queries = [a for a in args if not a.startswith('--')]
+
+    if not queries:
+        try:
+            data = write_index(load_rows(), require_pinyin='--no-pinyin' not in args)
+        except RuntimeError as e:
+            print(f"错误: {e}")
+            sys.exit(1)
+        print(f"搜索索引: {INDEX_FILE}")
+        print(f"  品种 {len(data['docs'])}, 检索词 {len(data['postings'])}, 整名/单词 {len(data['terms'])}")
+        if not data['pinyin']:
+            print("  警告: 索引不含拼音 (--no-pinyin)")
+
+    index = SearchIndex.load()
+    if '--bench' in args:
+        print(f"平均每次查询: {benchmark(index):.3f} ms")
+    for query in queries:
+        print(f"{query}:")
+        for score, doc_id in index.search(query):
+            name, english, scientific = index.docs[doc_id]
+            print(f"  {score:.2f}  {name}  {english}  {scientific}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+物种记录 - 带类型的紧凑行对象与批量校验
+
+FIELDNAMES 是各脚本共用的输出列顺序。SpeciesRecord 用 __slots__ 保存一行, 不再为每行建字典:
+  - 每个字段保存读入的原文, 下标与 get() 原样返回 ('7.50'、'15 - 30' 写回CSV时不变)
+  - 数值与范围字段写入时解析一次, 结果另存一份, 属性直接返回: tempMin / tempMax / phMin / phMax
+    为 int / float, size / lifespan ('15-30'、'10') 为 (最小, 最大) 元组
+  - from_rows() 批量读入时, 分类、产地、环境/饲养/备注、数值等重复的文本及其解析结果在本批记录间共用
+    (TextPool 随这批记录一起释放, 不在模块级累积)
+所以原有按字典处理行的函数、csv.DictWriter 都可以直接使用; 未设置的字段与缺列的CSV行一样视为不存在。
+无法解析的值原样保留, 由 validate_records() 一次列出所有问题。
+
+用法:
+    record = SpeciesRecord.from_row(row)
+    for problem in validate_records(records): print(problem)
+    python species_record.py [CSV]       # 校验CSV (默认 Fish_Database_Enhanced_v2.csv)
+    python species_record.py --bench     # 与字典行比较内存占用
+"""
+
+import io
+import re
+import sys
+import csv
+import tracemalloc
+from collections.abc import MutableMapping
+
+BASE_DIR = "/Users/wanshuiwanqigaozhishang/Downloads/MINIAPP"
+DATABASE_DIR = f"{BASE_DIR}/database"
+CSV_FILE = f"{DATABASE_DIR}/Fish_Database_Enhanced_v2.csv"
+
+# 输出CSV的列顺序
+FIELDNAMES = [
+    'name', 'englishName', 'scientificName', 'categoryName', 'subcategoryName',
+    'origin', 'difficulty', 'tempMin', 'tempMax', 'phMin', 'phMax',
+    'description', 'careTip', 'environment', 'husbandry_features', 'notes',
+    'localImagePath', 'size', 'lifespan', 'diet', 'compatibility'
+]
+FIELD_SET = frozenset(FIELDNAMES)
+
+NUMBER_FIELDS = ('tempMin', 'tempMax', 'phMin', 'phMax')
+RANGE_FIELDS = ('size', 'lifespan')
+REQUIRED_FIELDS = ('name', 'scientificName', 'categoryName', 'subcategoryName')
+DIFFICULTIES = ('easy', 'medium', 'hard')
+# 取值大量重复的文本字段 (环境/饲养/备注按分类套用同一段文字, 数值与范围只有几十种写法)
+SHARED_FIELDS = ('scientificName', 'categoryName', 'subcategoryName', 'origin', 'difficulty',
+                 'environment', 'husbandry_features', 'notes', 'diet', 'compatibility') + NUMBER_FIELDS + RANGE_FIELDS
+
+# 数值字段的合理取值范围
+LIMITS = {'tempMin': (0, 40), 'tempMax': (0, 40), 'phMin': (0, 14), 'phMax': (0, 14)}
+# 需满足 最小 <= 最大 的字段对
+ORDERED_PAIRS = (('tempMin', 'tempMax'), ('phMin', 'phMax'))
+
+NUMBER_PATTERN = re.compile(r'-?\d+(?:\.\d+)?')
+RANGE_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*(?:[-~～–—]\s*(\d+(?:\.\d+)?))?')
+
+def _to_number(text):
+    return float(text) if '.' in text else int(text)
+
+def parse_number(value):
+    """'4.5' -> 4.5, '7' -> 7, 空值 -> None; 无法解析时返回原文本"""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    text = value.strip()
+    if not text:
+        return None
+    if NUMBER_PATTERN.fullmatch(text):
+        return _to_number(text)
+    return value
+
+def parse_range(value):
+    """'15-30' -> (15, 30), '10' -> (10, 10), 空值 -> None; 无法解析时返回原文本"""
+    if value is None or isinstance(value, tuple):
+        return value
+    if isinstance(value, (int, float)):
+        return (value, value)
+    text = value.strip()
+    if not text:
+        return None
+    match = RANGE_PATTERN.fullmatch(text)
+    if not match:
+        return value
+    low = _to_number(match.group(1))
+    high = _to_number(match.group(2)) if match.group(2) else low
+    return (low, high)
+
+def format_number(value):
+    return str(value)
+
+def format_range(value):
+    low, high = value
+    return str(low) if low == high else f"{low}-{high}"
+
+def _text(value):
+    """写入的值转为CSV文本; 元组按范围格式, 数值按 str()"""
+    if value is None:
+        return ''
+    if isinstance(value, tuple):
+        return format_range(value)
+    return value if isinstance(value, str) else format_number(value)
+
+_PARSERS = dict.fromkeys(NUMBER_FIELDS, parse_number) | dict.fromkeys(RANGE_FIELDS, parse_range)
+_SHARED = frozenset(SHARED_FIELDS)
+
+class TextPool:
+    """一批记录共用的文本与解析结果; 相同文本只存一份、只解析一次"""
+
+    __slots__ = ('texts', 'parsed')
+
+    def __init__(self):
+        self.texts = {}
+        self.parsed = {}
+
+    def text(self, value):
+        return self.texts.setdefault(value, value)
+
+    def parse(self, key, text):
+        cache_key = (_PARSERS[key], text)
+        try:
+            return self.parsed[cache_key]
+        except KeyError:
+            value = self.parsed[cache_key] = _PARSERS[key](text)
+            return value
+
+class SpeciesRecord(MutableMapping):
+    """一行物种数据; 下标为CSV原文, 属性为解析后的值 (按字段生成, 见类定义之后)"""
+
+    # _字段 存原文, _字段_value 存数值/范围字段的解析结果
+    __slots__ = tuple(f"_{key}" for key in FIELDNAMES) + tuple(f"_{key}_value" for key in _PARSERS)
+
+    def __init__(self, **fields):
+        for key, value in fields.items():
+            self[key] = value
+
+    @classmethod
+    def from_row(cls, row, default=None, pool=None):
+        """由CSV行或字典构建, 只取 FIELDNAMES 中的列; default 不为 None 时缺少的列用它补齐"""
+        record = cls()
+        for key in FIELDNAMES:
+            if key in row:
+                record._store(key, row[key], pool)
+            elif default is not None:
+                record._store(key, default, pool)
+        return record
+
+    @classmethod
+    def from_rows(cls, rows, default=None):
+        """批量构建; 这批记录共用一个 TextPool"""
+        pool = TextPool()
+        return (cls.from_row(row, default, pool) for row in rows)
+
+    def _store(self, key, value, pool=None):
+        text = _text(value)
+        if pool is not None and key in _SHARED:
+            text = pool.text(text)
+        setattr(self, f"_{key}", text)
+        if key in _PARSERS:
+            setattr(self, f"_{key}_value", pool.parse(key, text) if pool is not None else _PARSERS[key](text))
+
+    def __getitem__(self, key):
+        if key not in FIELD_SET:
+            raise KeyError(key)
+        try:
+            return getattr(self, f"_{key}")
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        if key not in FIELD_SET:
+            raise KeyError(f"未知字段: {key}")
+        self._store(key, value)
+
+    def __delitem__(self, key):
+        if key not in FIELD_SET:
+            raise KeyError(key)
+        try:
+            delattr(self, f"_{key}")
+        except AttributeError:
+            raise KeyError(key) from None
+        if key in _PARSERS:
+            delattr(self, f"_{key}_value")
+
+    def __iter__(self):
+        return (key for key in FIELDNAMES if hasattr(self, f"_{key}"))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def copy(self):
+        record = SpeciesRecord()
+        for slot in self.__slots__:
+            if hasattr(self, slot):
+                setattr(record, slot, getattr(self, slot))
+        return record
+
+    def as_row(self):
+        """写入CSV的完整一行 (缺少的字段为空串)"""
+        return {key: self.get(key, '') for key in FIELDNAMES}
+
+    def problems(self):
+        """本行的所有问题"""
+        found = []
+        for key in REQUIRED_FIELDS:
+            if not self.get(key, '').strip():
+                found.append(f"缺少 {key}")
+        difficulty = self.get('difficulty', '')
+        if difficulty and difficulty not in DIFFICULTIES:
+            found.append(f"difficulty 应为 {'/'.join(DIFFICULTIES)}: {difficulty!r}")
+        for key in NUMBER_FIELDS:
+            value = getattr(self, key, None)
+            if isinstance(value, str):
+                found.append(f"{key} 不是数字: {value!r}")
+            elif value is not None and not LIMITS[key][0] <= value <= LIMITS[key][1]:
+                found.append(f"{key}={value} 超出 {LIMITS[key][0]}-{LIMITS[key][1]}")
+        for low_key, high_key in ORDERED_PAIRS:
+            low, high = getattr(self, low_key, None), getattr(self, high_key, None)
+            if isinstance(low, (int, float)) and isinstance(high, (int, float)) and low > high:
+                found.append(f"{low_key}={low} 大于 {high_key}={high}")
+        for key in RANGE_FIELDS:
+            value = getattr(self, key, None)
+            if isinstance(value, str):
+                found.append(f"{key} 不是范围: {value!r}")
+            elif value is not None and value[0] > value[1]:
+                found.append(f"{key} 下限大于上限: {self[key]}")
+        return found
+
+    def __repr__(self):
+        return f"SpeciesRecord(name={self.get('name')!r})"
+
+def _field(key):
+    """字段属性: 数值/范围字段返回写入时解析好的值, 其余返回原文; 赋值与下标相同"""
+    slot = f"_{key}_value" if key in _PARSERS else f"_{key}"
+
+    def get(self):
+        return getattr(self, slot)
+
+    def set(self, value):
+        self[key] = value
+
+    def delete(self):
+        del self[key]
+
+    return property(get, set, delete)
+
+for _key in FIELDNAMES:
+    setattr(SpeciesRecord, _key, _field(_key))
+
+def validate_records(rows, fieldnames=None):
+    """一次检查所有行 (SpeciesRecord 或字典), 返回问题列表; 行号按CSV计 (表头为第1行)"""
+    problems = []
+    if fieldnames is not None:
+        unknown = [key for key in fieldnames if key not in FIELD_SET]
+        if unknown:
+            problems.append(f"表头: 未知列 {', '.join(map(str, unknown))}")
+        missing = [key for key in REQUIRED_FIELDS if key not in fieldnames]
+        if missing:
+            problems.append(f"表头: 缺少列 {', '.join(missing)}")
+    seen = {}
+    for line, row in enumerate(rows, start=2):
+        record = row if isinstance(row, SpeciesRecord) else SpeciesRecord.from_row(row)
+        name = record.get('name', '')
+        label = f"第{line}行 {name or '?'}"
+        for problem in record.problems():
+            problems.append(f"{label}: {problem}")
+        if name in seen:
+            problems.append(f"{label}: 与第{seen[name]}行重名")
+        else:
+            seen.setdefault(name, line)
+    return problems
+
+def load_records(path):
+    """读取CSV, 返回 (记录列表, 表头)"""
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        return list(SpeciesRecord.from_rows(reader)), reader.fieldnames
+
+# ============ 内存对比 ============
+
+def _traced(build):
+    tracemalloc.start()
+    try:
+        rows = build()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return rows, size
+
+def benchmark(path=CSV_FILE):
+    """同一份CSV读成字典行与 SpeciesRecord 时的常驻内存, 返回 (行数, 字典字节数, 记录字节数)"""
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        text = f.read()
+
+    records, record_bytes = _traced(lambda: list(SpeciesRecord.from_rows(csv.DictReader(io.StringIO(text)))))
+    count = len(records)
+    del records
+    rows, dict_bytes = _traced(lambda: list(csv.DictReader(io.StringIO(text))))
+    return count, dict_bytes, record_bytes
+
+def main():
+    args = sys.argv[1:]
+    if '--bench' in args:
+        count, dict_bytes, record_bytes = benchmark()
+        print(f"{count} 行: 字典 {dict_bytes / count:.0f} B/行, SpeciesRecord {record_bytes / count:.0f} B/行 "
+              f"({dict_bytes / record_bytes:.1f}x)")
+        return
+    path = args[0] if args else CSV_FILE
+    records, fieldnames = load_records(path)
+    problems = validate_records(records, fieldnames)
+    for problem in problems:
+        print(f"  [校验] {problem}")
+    print(f"{path}: {len(records)} 行, {len(problems)} 个问题")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+物种表 - 鱼类数据的内存索引
+
+CSV 只读取一次, 按鱼名和学名建立索引;
+各处理步骤写成逐行变换函数, apply() 在一次遍历中依次执行,
+最后只写出一次CSV。
+
+用法:
+    table = SpeciesTable.load(INPUT_FILE)
+    # 或 SpeciesTable.load(INPUT_FILE, record_type=SpeciesRecord), 每行为带类型的紧凑记录 (见 species_record.py)
+    table.apply(fix_category, add_extra)
+    table.save(OUTPUT_FILE, FIELDNAMES)
+"""
+
+import csv
+
+class SpeciesTable:
+    """按鱼名 / 学名索引的物种表"""
+
+    def __init__(self, rows=None, fieldnames=None):
+        self.rows = []
+        self.fieldnames = list(fieldnames or [])
+        self.by_name = {}
+        self.by_scientific = {}
+        for row in rows or []:
+            self.add(row)
+
+    @classmethod
+    def load(cls, path, record_type=None):
+        """record_type 为 None 时每行是字典 (保留所有列), 否则用 record_type.from_rows 批量转换"""
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            rows = reader if record_type is None else record_type.from_rows(reader)
+            return cls(rows, reader.fieldnames)
+
+    def add(self, row):
+        self.rows.append(row)
+        # 重名时保留第一条, 与原先按列表顺序查找的结果一致
+        self.by_name.setdefault(row['name'], row)
+        scientific = (row.get('scientificName') or '').strip().lower()
+        if scientific:
+            self.by_scientific.setdefault(scientific, []).append(row)
+        return row
+
+    def extend(self, rows):
+        for row in rows:
+            self.add(row)
+
+    def get(self, name):
+        return self.by_name.get(name)
+
+    def find_scientific(self, scientific_name):
+        """按学名查找 (不区分大小写), 返回所有匹配行"""
+        return self.by_scientific.get(scientific_name.strip().lower(), [])
+
+    def find_genus(self, genus):
+        """按属名查找"""
+        genus = genus.strip().lower()
+        return [row for key, rows in self.by_scientific.items()
+                if key.split()[0] == genus for row in rows]
+
+    def apply(self, *transforms):
+        """一次遍历中对每行依次执行所有变换; 变换原地修改行, 不得改动鱼名或学名"""
+        for row in self.rows:
+            for transform in transforms:
+                transform(row)
+        return self
+
+    def save(self, path, fieldnames=None):
+        with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames or self.fieldnames)
+            writer.writeheader()
+            writer.writerows(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
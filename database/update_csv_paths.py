@@ -2,11 +2,21 @@
 # -*- coding: utf-8 -*-
 """
 更新CSV中新增记录的图片路径
+
+enhance_fish_database 在生成CSV的同一遍处理中已调用 image_path_updater,
+单独运行本脚本用于图片补下载后刷新路径。
+
+用法:
+    python update_csv_paths.py
+    python update_csv_paths.py --profile   # 生成运行剖析报告
 """
 
-import csv
-import os
 import re
+import sys
+
+from image_store import ImageStore
+from species_table import SpeciesTable
+import run_report
 
 DATABASE_DIR = "/Users/wanshuiwanqigaozhishang/Downloads/MINIAPP/database"
 IMAGES_DIR = "/Users/wanshuiwanqigaozhishang/Downloads/MINIAPP/images"
@@ -47,43 +57,50 @@ NEW_FISH_SCI_NAMES = {
     '缎带孔雀': 'poecilia',
 }
 
+def image_path_updater(store, log=print):
+    """返回逐行变换: 新增鱼类的图片存在时把 localImagePath 指向实际图片; 变换带 updated 计数"""
+    def update_image_path(row):
+        name = row['name']
+        if name not in NEW_FISH_SCI_NAMES:
+            return
+        safe_name = re.sub(r'[^\w\u4e00-\u9fff]', '', name)
+        sci_name = NEW_FISH_SCI_NAMES[name]
+        expected_filename = f"fish_new_{safe_name}_{sci_name}.jpg"
+        # 经内容寻址索引解析实际图片路径
+        expected_path = store.resolve(expected_filename)
+
+        # 检查图片是否存在
+        if expected_path:
+            row['localImagePath'] = expected_path
+            update_image_path.updated += 1
+            log(f"  ✓ {name} -> {expected_filename}")
+        else:
+            log(f"  ✗ {name} 图片不存在: {expected_filename}")
+
+    update_image_path.updated = 0
+    return update_image_path
+
 def main():
+    run_report.setup('update_csv_paths', '--profile' in sys.argv)
     print("更新CSV图片路径...")
 
     # 读取CSV
-    rows = []
-    with open(INPUT_FILE, 'r', encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f)
-        fieldnames = reader.fieldnames
-        for row in reader:
-            rows.append(row)
+    with run_report.span('stage.load'):
+        table = SpeciesTable.load(INPUT_FILE)
 
     # 更新新增记录的图片路径
-    updated = 0
-    for row in rows:
-        name = row['name']
-        if name in NEW_FISH_SCI_NAMES:
-            safe_name = re.sub(r'[^\w\u4e00-\u9fff]', '', name)
-            sci_name = NEW_FISH_SCI_NAMES[name]
-            expected_filename = f"fish_new_{safe_name}_{sci_name}.jpg"
-            expected_path = os.path.join(IMAGES_DIR, expected_filename)
-
-            # 检查图片是否存在
-            if os.path.exists(expected_path):
-                row['localImagePath'] = expected_path
-                updated += 1
-                print(f"  ✓ {name} -> {expected_filename}")
-            else:
-                print(f"  ✗ {name} 图片不存在: {expected_filename}")
+    update_image_path = image_path_updater(ImageStore(IMAGES_DIR))
+    with run_report.span('stage.update_paths', rows=len(table)):
+        table.apply(update_image_path)
+    run_report.count('paths.updated', update_image_path.updated)
 
     # 保存更新后的CSV
-    with open(OUTPUT_FILE, 'w', encoding='utf-8-sig', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rows)
+    with run_report.span('write.csv', rows=len(table)):
+        table.save(OUTPUT_FILE)
 
-    print(f"\n完成! 更新了 {updated} 条记录的图片路径")
+    print(f"\n完成! 更新了 {update_image_path.updated} 条记录的图片路径")
     print(f"输出文件: {OUTPUT_FILE}")
+    run_report.finish()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片上传计划 - 只上传上次同步后新增或变化的图片
+
+上传对象取自 v2 CSV 各品种的 localImagePath (按文件名去重, 云端路径 fish-species/<文件名>),
+CSV 不存在时取 image_index.json 登记的全部图片; 新增品种的图片不必再手动生成清单。
+upload_state.json 记录每个文件上次上传时的 大小 / 修改时间 / SHA-256 / fileID:
+  - 大小和修改时间都没变的文件直接视为未变化, 不读文件内容
+  - 有变化时再算哈希, 内容其实没变 (如只是 touch 过) 只更新记录
+  - 内容与另一个已上传文件相同时直接共用其 fileID, 不重复上传
+  - 没有记录但 image_mapping.json 中已有真实 fileID 的文件视为已上传 (首次启用时不必全部重传)
+  - image_audit 报告中被拒绝的图片不上传
+  - image_variants.json 中有最新主图 (image_normalize 生成, 长边 800px) 时上传主图而不是原图,
+    云端文件名取主图文件名; 映射仍以原图文件名为键
+待上传文件按大小从大到小排列 (大文件先开始, 并发时总耗时更短), 由可替换的上传器并发上传,
+每成功一个就更新 image_mapping.json 与 upload_state.json, 中断后重跑只补传剩余部分。
+
+上传器:
+  WeChatUploader     微信云开发 HTTP API (需要 WX_APPID / WX_SECRET 环境变量)
+  LocalDirUploader   复制到本地目录, 用于测试或离线演练
+
+用法:
+    python upload_planner.py                   # 只列出上传计划
+    python upload_planner.py --upload          # 上传到云存储
+    python upload_planner.py --local /tmp/cos  # 上传到本地目录 (映射与状态写在该目录中, 不动正式文件)
+"""
+
+import os
+import csv
+import json
+import posixpath
+import uuid
+import shutil
+import argparse
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import quote
+
+from image_store import ImageStore, file_sha256, write_json_atomic
+from image_audit import load_rejected
+from image_normalize import VARIANTS_FILE, main_variant
+
+BASE_DIR = "/Users/wanshuiwanqigaozhishang/Downloads/MINIAPP"
+DATABASE_DIR = f"{BASE_DIR}/database"
+IMAGES_DIR = f"{BASE_DIR}/images"
+CSV_FILE = f"{DATABASE_DIR}/Fish_Database_Enhanced_v2.csv"
+MAPPING_FILE = f"{DATABASE_DIR}/image_mapping.json"
+STATE_FILE = f"{DATABASE_DIR}/upload_state.json"
+
+ENV_ID = os.environ.get('TCB_ENV_ID', 'cloudbase-9gnb2cyn0387e399')
+WX_API = os.environ.get('WX_API', 'https://api.weixin.qq.com')
+
+MAX_WORKERS = 4
+CLOUD_PATH_PREFIX = 'fish-species'
+
+def is_real_file_id(file_id):
+    """upload-images.js 的手动上传指南会预填 cloud://<env>.xxxx/... 占位地址, LocalDirUploader 生成 .local/ 地址"""
+    return (bool(file_id) and file_id.startswith('cloud://')
+            and '.xxxx/' not in file_id and '.local/' not in file_id)
+
+class Uploader:
+    """上传器基类: upload() 返回云端 fileID; accepts() 判断已有记录中的 fileID 是否由该上传器产生"""
+
+    def upload(self, local_path, cloud_path):
+        raise NotImplementedError
+
+    def accepts(self, file_id):
+        return is_real_file_id(file_id)
+
+class LocalDirUploader(Uploader):
+    """复制到本地目录, fileID 形如 cloud://<env>.local/<cloudPath>"""
+
+    def __init__(self, root, env_id=ENV_ID):
+        self.root = root
+        self.env_id = env_id
+
+    def accepts(self, file_id):
+        return bool(file_id) and file_id.startswith(f"cloud://{self.env_id}.local/")
+
+    def upload(self, local_path, cloud_path):
+        target = os.path.join(self.root, cloud_path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(local_path, target + '.part')
+        os.replace(target + '.part', target)
+        return f"cloud://{self.env_id}.local/{cloud_path}"
+
+class WeChatUploader(Uploader):
+    """微信云开发 HTTP API: 先取上传链接, 再以表单 POST 到 COS"""
+
+    def __init__(self, appid, secret, env_id=ENV_ID, timeout=60):
+        self.appid = appid
+        self.secret = secret
+        self.env_id = env_id
+        self.timeout = timeout
+        self.token = None
+        self.lock = threading.Lock()
+
+    def _access_token(self):
+        with self.lock:
+            if self.token is None:
+                url = (f"{WX_API}/cgi-bin/token?grant_type=client_credential"
+                       f"&appid={quote(self.appid)}&secret={quote(self.secret)}")
+                with urllib.request.urlopen(url, timeout=self.timeout) as response:
+                    data = json.loads(response.read().decode('utf-8'))
+                if 'access_token' not in data:
+                    raise RuntimeError(f"获取 access_token 失败: {data}")
+                self.token = data['access_token']
+            return self.token
+
+    def upload(self, local_path, cloud_path):
+        body = json.dumps({'env': self.env_id, 'path': cloud_path}).encode('utf-8')
+        request = urllib.request.Request(f"{WX_API}/tcb/uploadfile?access_token={self._access_token()}",
+                                         data=body, headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            info = json.loads(response.read().decode('utf-8'))
+        if info.get('errcode'):
+            raise RuntimeError(f"获取上传链接失败: {info.get('errmsg')}")
+
+        fields = {
+            'key': cloud_path,
+            'Signature': info['authorization'],
+            'x-cos-security-token': info['token'],
+            'x-cos-meta-fileid': info['cos_file_id'],
+        }
+        with open(local_path, 'rb') as f:
+            content = f.read()
+        boundary = uuid.uuid4().hex
+        parts = []
+        for name, value in fields.items():
+            parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode('utf-8'))
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="file"; '
+                     f'filename="{os.path.basename(local_path)}"\r\n'
+                     f'Content-Type: application/octet-stream\r\n\r\n'.encode('utf-8'))
+        parts.append(content)
+        parts.append(f'\r\n--{boundary}--\r\n'.encode('utf-8'))
+        request = urllib.request.Request(info['url'], data=b''.join(parts),
+                                         headers={'Content-Type': f'multipart/form-data; boundary={boundary}'})
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+        return info['file_id']
+
+def load_json(path, default):
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return default
+
+def collect_images(csv_file=CSV_FILE, store=None, prefix=CLOUD_PATH_PREFIX):
+    """上传对象 [{'filename', 'cloudPath'}]: CSV 引用的图片; CSV 不存在时为 store 登记的全部图片"""
+    if os.path.exists(csv_file):
+        with open(csv_file, 'r', encoding='utf-8-sig') as f:
+            names = [os.path.basename(row['localImagePath']) for row in csv.DictReader(f)
+                     if row.get('localImagePath')]
+    else:
+        names = sorted(store.names) if store is not None else []
+    return [{'filename': name, 'cloudPath': f"{prefix}/{name}"} for name in dict.fromkeys(names)]
+
+def plan_uploads(images, state, mapping, store, rejected=(), variants=None, accepts=is_real_file_id):
+    """返回 (待上传, 可共用, 未变化数, 问题列表)
+
+    images 为 collect_images() 的条目 [{'filename', 'cloudPath'}];
+    variants 为 image_variants.json 的内容, 有最新主图的文件改传主图;
+    待上传项为 {'filename', 'cloudPath', 'path', 'size', 'mtime', 'sha256'},
+    可共用项另带已上传文件的 'fileID'。accepts 判断记录中的 fileID 是否算已上传 (默认只认真实云端地址)。
+    """
+    uploads, shared, problems = [], [], []
+    unchanged = 0
+    by_digest = {rec['sha256']: rec['fileID'] for rec in state.values() if accepts(rec.get('fileID'))}
+
+    for image in images:
+        filename = image['filename']
+        if filename in rejected:
+            problems.append(f"{filename}: 审核未通过, 不上传")
+            continue
+        path = store.resolve(filename)
+        if path is None:
+            problems.append(f"{filename}: 本地文件不存在")
+            continue
+
+        cloud_path = image['cloudPath']
+        variant = main_variant(variants, filename, path) if variants else None
+        if variant:
+            path = variant
+            cloud_path = posixpath.join(posixpath.dirname(cloud_path), os.path.basename(variant))
+
+        stat = os.stat(path)
+        item = {'filename': filename, 'cloudPath': cloud_path, 'path': path,
+                'size': stat.st_size, 'mtime': stat.st_mtime}
+        record = state.get(filename)
+        uploaded = record and accepts(record.get('fileID')) and record.get('cloudPath') == cloud_path
+        if uploaded and record['size'] == item['size'] and record['mtime'] == item['mtime']:
+            unchanged += 1
+            continue
+
+        item['sha256'] = file_sha256(path)
+        if uploaded and record['sha256'] == item['sha256']:
+            record['mtime'] = item['mtime']
+            unchanged += 1
+            continue
+        if not record and accepts(mapping.get(filename)) and mapping[filename].endswith('/' + cloud_path):
+            # 首次启用: 沿用已有的云端文件 (原图已传过但现在要传主图时不沿用)
+            state[filename] = dict(item, fileID=mapping[filename])
+            del state[filename]['path']
+            by_digest.setdefault(item['sha256'], mapping[filename])
+            unchanged += 1
+            continue
+        if item['sha256'] in by_digest:
+            shared.append(dict(item, fileID=by_digest[item['sha256']]))
+            continue
+        by_digest[item['sha256']] = None  # 同一批中内容相同的文件只传一次
+        uploads.append(item)
+
+    # 同一批中与待上传文件内容相同的, 等上传完成后共用其 fileID
+    pending = {item['sha256'] for item in uploads}
+    shared = [s for s in shared if s['fileID'] or s['sha256'] in pending]
+    uploads.sort(key=lambda item: (-item['size'], item['filename']))
+    return uploads, shared, unchanged, problems
+
+class UploadRun:
+    """并发执行上传计划, 每完成一个就写回映射与状态"""
+
+    def __init__(self, uploader, state, mapping, state_file=STATE_FILE, mapping_file=MAPPING_FILE):
+        self.uploader = uploader
+        self.state = state
+        self.mapping = mapping
+        self.state_file = state_file
+        self.mapping_file = mapping_file
+        self.lock = threading.Lock()
+
+    def _record(self, item, file_id):
+        with self.lock:
+            record = {k: item[k] for k in ('cloudPath', 'size', 'mtime', 'sha256')}
+            self.state[item['filename']] = dict(record, fileID=file_id)
+            self.mapping[item['filename']] = file_id
+            write_json_atomic(self.mapping_file, self.mapping)
+            write_json_atomic(self.state_file, dict(sorted(self.state.items())))
+
+    def run(self, uploads, shared, workers=MAX_WORKERS, progress=print):
+        """返回 (成功数, 失败列表)"""
+        done = 0
+        failed = []
+        file_ids = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(self.uploader.upload, item['path'], item['cloudPath']): item
+                       for item in uploads}
+            for future in as_completed(futures):
+                item = futures[future]
+                try:
+                    file_id = future.result()
+                except Exception as e:
+                    failed.append(f"{item['filename']}: {e}")
+                    progress(f"  [失败] {item['filename']}: {e}")
+                    continue
+                file_ids[item['sha256']] = file_id
+                self._record(item, file_id)
+                done += 1
+                progress(f"  [{done}/{len(uploads)}] {item['filename']} ({item['size'] / 1024:.0f} KB)")
+
+        for item in shared:
+            file_id = item['fileID'] or file_ids.get(item['sha256'])
+            if file_id:
+                self._record(item, file_id)
+        return done, failed
+
+def main():
+    parser = argparse.ArgumentParser(description='Plan and run incremental image uploads')
+    parser.add_argument('--upload', action='store_true', help='上传到微信云存储')
+    parser.add_argument('--local', metavar='DIR', help='上传到本地目录 (测试用)')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS, help='并发上传数')
+    args = parser.parse_args()
+
+    uploader = None
+    state_file, mapping_file = STATE_FILE, MAPPING_FILE
+    if args.local:
+        # 演练用的假 fileID 只写进目标目录, 不污染正式的映射与状态
+        uploader = LocalDirUploader(args.local)
+        state_file = os.path.join(args.local, 'upload_state.json')
+        mapping_file = os.path.join(args.local, 'image_mapping.json')
+    elif args.upload:
+        appid, secret = os.environ.get('WX_APPID'), os.environ.get('WX_SECRET')
+        if not appid or not secret:
+            print("请设置环境变量 WX_APPID / WX_SECRET")
+            return
+        uploader = WeChatUploader(appid, secret)
+
+    mapping = load_json(mapping_file, {})
+    state = load_json(state_file, {})
+    store = ImageStore(IMAGES_DIR)
+    images = collect_images(CSV_FILE, store)
+
+    uploads, shared, unchanged, problems = plan_uploads(images, state, mapping, store,
+                                                        rejected=load_rejected(),
+                                                        variants=load_json(VARIANTS_FILE, {}),
+                                                        accepts=uploader.accepts if uploader else is_real_file_id)
+    total = sum(item['size'] for item in uploads)
+    print(f"图片 {len(images)} 张: 未变化 {unchanged}, 待上传 {len(uploads)} "
+          f"({total / 1024 / 1024:.1f} MB), 共用已上传内容 {len(shared)}")
+    for problem in problems:
+        print(f"  [跳过] {problem}")
+
+    if uploader is None:
+        for item in uploads:
+            print(f"  {item['filename']} ({item['size'] / 1024:.0f} KB)")
+        return
+
+    os.makedirs(os.path.dirname(state_file), exist_ok=True)
+    done, failed = UploadRun(uploader, state, mapping, state_file=state_file,
+                             mapping_file=mapping_file).run(uploads, shared, workers=args.workers)
+    write_json_atomic(state_file, dict(sorted(state.items())))
+    print(f"\n上传完成: 成功 {done}, 失败 {len(failed)}")
+    print(f"映射文件: {mapping_file}")
+
+if __name__ == '__main__':
+    main()
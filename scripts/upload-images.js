@@ -12,6 +12,9 @@
  * - TCB_SECRET_KEY: 云 API 密钥
  *
  * 注意: 如果没有配置密钥，脚本会生成一个手动上传指南
+ *
+ * 已运行 database/image_normalize.py 时，优先上传 image_variants.json 中的主图
+ * (长边 800px、去掉 EXIF)；映射文件仍以原图文件名为键
  */
 
 const fs = require('fs')
@@ -24,8 +27,29 @@ const SECRET_KEY = process.env.TCB_SECRET_KEY || ''
 
 const DATA_PATH = path.join(__dirname, '..', 'database', 'fish_import_data.json')
 const OUTPUT_PATH = path.join(__dirname, '..', 'database', 'image_mapping.json')
+const VARIANTS_PATH = path.join(__dirname, '..', 'database', 'image_variants.json')
 const CLOUD_PATH_PREFIX = 'fish-species'
 
+/**
+ * 读取 image_normalize.py 的输出记录，没有时返回空对象
+ */
+function loadVariants() {
+  if (!fs.existsSync(VARIANTS_PATH)) return {}
+  return JSON.parse(fs.readFileSync(VARIANTS_PATH, 'utf8'))
+}
+
+/**
+ * 实际上传的文件: 有比原图新的主图时用主图，否则用原图
+ */
+function uploadSource(variants, localPath) {
+  const record = variants[path.basename(localPath)]
+  const main = record && record.main && record.main.path
+  if (main && fs.existsSync(main) && fs.statSync(main).mtimeMs >= fs.statSync(localPath).mtimeMs) {
+    return main
+  }
+  return localPath
+}
+
 /**
  * 使用 SDK 上传图片
  */
@@ -52,6 +76,7 @@ async function uploadWithSDK() {
 
   // 读取数据
   const data = JSON.parse(fs.readFileSync(DATA_PATH, 'utf8'))
+  const variants = loadVariants()
   const imageMapping = {}
 
   console.log(`开始上传 ${data.species.length} 张图片到云存储...`)
@@ -68,13 +93,14 @@ async function uploadWithSDK() {
     }
 
     const filename = path.basename(localPath)
-    const cloudPath = `${CLOUD_PATH_PREFIX}/${filename}`
+    const source = uploadSource(variants, localPath)
+    const cloudPath = `${CLOUD_PATH_PREFIX}/${path.basename(source)}`
 
     try {
       // 上传文件
       const result = await app.uploadFile({
         cloudPath: cloudPath,
-        fileContent: fs.createReadStream(localPath)
+        fileContent: fs.createReadStream(source)
       })
 
       imageMapping[filename] = result.fileID
@@ -116,17 +142,21 @@ function generateManualGuide() {
   console.log('')
 
   // 收集所有需要上传的图片
+  const variants = loadVariants()
   const images = []
   data.species.forEach(species => {
     if (species.localImagePath && fs.existsSync(species.localImagePath)) {
+      const source = uploadSource(variants, species.localImagePath)
       images.push({
-        localPath: species.localImagePath,
-        filename: path.basename(species.localImagePath)
+        localPath: source,
+        filename: path.basename(species.localImagePath),
+        cloudName: path.basename(source)
       })
     }
   })
 
-  console.log(`图片目录: /Users/wanshuiwanqigaozhishang/Downloads/MINIAPP/images/`)
+  const imageDir = Object.keys(variants).length ? 'images/normalized/' : 'images/'
+  console.log(`图片目录: /Users/wanshuiwanqigaozhishang/Downloads/MINIAPP/${imageDir}`)
   console.log(`需要上传: ${images.length} 张图片`)
   console.log('')
 
@@ -134,7 +164,7 @@ function generateManualGuide() {
   const imageMapping = {}
   images.forEach(img => {
     // 微信云开发的 fileID 格式
-    imageMapping[img.filename] = `cloud://${ENV_ID}.xxxx/${CLOUD_PATH_PREFIX}/${img.filename}`
+    imageMapping[img.filename] = `cloud://${ENV_ID}.xxxx/${CLOUD_PATH_PREFIX}/${img.cloudName}`
   })
 
   fs.writeFileSync(OUTPUT_PATH, JSON.stringify(imageMapping, null, 2), 'utf8')
@@ -143,7 +173,7 @@ function generateManualGuide() {
   console.log('1. 访问 https://console.cloud.tencent.com/')
   console.log(`2. 选择环境: ${ENV_ID}`)
   console.log('3. 进入「云存储」')
-  console.log('4. 批量上传 images/ 目录下的所有图片')
+  console.log(`4. 批量上传 ${imageDir} 目录下的所有图片`)
   console.log('')
   console.log('方法三: 配置密钥后运行此脚本自动上传')
   console.log('1. 在云开发控制台获取 API 密钥')
@@ -167,16 +197,18 @@ async function generateCloudFunctionUploader() {
   const data = JSON.parse(fs.readFileSync(DATA_PATH, 'utf8'))
 
   // 收集所有图片信息
+  const variants = loadVariants()
   const images = []
   data.species.forEach((species, index) => {
     if (species.localImagePath && fs.existsSync(species.localImagePath)) {
       const filename = path.basename(species.localImagePath)
+      const source = uploadSource(variants, species.localImagePath)
       images.push({
         index,
         name: species.name,
         filename,
-        localPath: species.localImagePath,
-        cloudPath: `${CLOUD_PATH_PREFIX}/${filename}`
+        localPath: source,
+        cloudPath: `${CLOUD_PATH_PREFIX}/${path.basename(source)}`
       })
     }
   })